@@ -0,0 +1,99 @@
+# Benchmark: latência do autocomplete de /enviarproduto com catálogo grande
+# Compara a varredura linear de todos os produtos a cada tecla com o índice
+# ordenado de tokens (IndiceBusca), e mede a atualização incremental.
+#
+# Uso: python benchmarks/bench_autocomplete.py [produtos] [consultas]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+PALAVRAS = [
+    "conta", "robux", "gamepass", "nitro", "boost", "skin", "vip", "premium",
+    "mensal", "anual", "pacote", "moedas", "gemas", "passe", "fortnite", "valorant",
+    "minecraft", "roblox", "spotify", "netflix", "discord", "steam", "chave", "gift",
+]
+
+
+def percentil(amostras, p):
+    ordenadas = sorted(amostras)
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+
+def medir(funcao, consultas):
+    amostras = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        funcao(consulta)
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    return amostras
+
+
+def resumo(rotulo, amostras):
+    print(f"{rotulo}: p50 {percentil(amostras, 50):.3f} ms | p99 {percentil(amostras, 99):.3f} ms "
+          f"| máx {max(amostras):.3f} ms")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    n_consultas = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    aleatorio = random.Random(42)
+    for i in range(total):
+        titulo = " ".join(aleatorio.sample(PALAVRAS, 3)) + f" {aleatorio.randint(1, 9999)}"
+        mod.produtos[f"prod_{i + 1}"] = {'titulo': titulo, 'descricao': '', 'preco': '9.90', 'imagem_url': None}
+
+    # Consultas como chegam do Discord: prefixos parciais, uma ou duas palavras, IDs
+    consultas = []
+    for _ in range(n_consultas):
+        tipo = aleatorio.random()
+        if tipo < 0.5:
+            palavra = aleatorio.choice(PALAVRAS)
+            consultas.append(palavra[:aleatorio.randint(1, len(palavra))])
+        elif tipo < 0.8:
+            a, b = aleatorio.sample(PALAVRAS, 2)
+            consultas.append(f"{a} {b[:aleatorio.randint(1, len(b))]}")
+        else:
+            consultas.append(f"prod_{aleatorio.randint(1, total)}"[:aleatorio.randint(5, 10)])
+
+    def varredura_linear(consulta):
+        termos = mod.normalizar_busca(consulta).split()
+        resultado = []
+        for prod_id, prod in mod.produtos.items():
+            texto = mod.normalizar_busca(f"{prod['titulo']} {prod_id}")
+            if all(termo in texto for termo in termos):
+                resultado.append(prod_id)
+                if len(resultado) >= mod.AUTOCOMPLETE_MAX:
+                    break
+        return resultado
+
+    print(f"catálogo: {total} produtos | {n_consultas} consultas")
+    resumo("antes (varredura linear)", medir(varredura_linear, consultas[:200]))
+
+    inicio = time.perf_counter()
+    indice = mod.indice_busca(mod.LISTA_PRODUTOS)
+    print(f"montagem do índice: {(time.perf_counter() - inicio) * 1000:.0f} ms ({len(indice.entradas)} entradas)")
+
+    resumo("depois (índice de tokens)", medir(lambda c: mod.escolhas_autocomplete(mod.LISTA_PRODUTOS, c), consultas))
+
+    amostras = []
+    for i in range(200):
+        prod_id = f"prod_{total + i + 1}"
+        mod.produtos[prod_id] = {'titulo': f"produto novo {i}", 'descricao': '', 'preco': '1', 'imagem_url': None}
+        inicio = time.perf_counter()
+        mod.indexar_item(mod.LISTA_PRODUTOS, prod_id)
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    resumo("inserção incremental", amostras)
+    print(f"novo produto encontrado: {mod.indice_busca(mod.LISTA_PRODUTOS).buscar('produto novo 19')[:1]}")
+
+
+if __name__ == "__main__":
+    main()
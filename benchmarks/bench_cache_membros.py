@@ -0,0 +1,135 @@
+# Benchmark: memória e custo de inicialização por tamanho de guild
+# Compara o modo padrão (Intents.all, cache de todos os membros, chunk no login)
+# com o modo enxuto (VIREX_MODO_ENXUTO=1: sem cache de membros, chunk só sob
+# demanda para o índice de admins). Os chunks do gateway são simulados com
+# payloads sintéticos processados pelo próprio ConnectionState do discord.py.
+#
+# Uso: python benchmarks/bench_cache_membros.py [tamanho1,tamanho2,...]
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import discord
+from discord.state import ChunkRequest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+GUILD_ID = 123456789012345678
+CARGO_ADMIN = GUILD_ID + 1
+TAMANHO_CHUNK = 1000
+
+
+def payload_guild():
+    return {
+        'id': str(GUILD_ID),
+        'name': 'guild de teste',
+        'owner_id': str(GUILD_ID + 2),
+        'roles': [
+            {'id': str(GUILD_ID), 'name': '@everyone', 'permissions': '0', 'position': 0,
+             'color': 0, 'hoist': False, 'managed': False, 'mentionable': False},
+            {'id': str(CARGO_ADMIN), 'name': 'admin', 'permissions': '8', 'position': 1,
+             'color': 0, 'hoist': False, 'managed': False, 'mentionable': False},
+        ],
+        'member_count': 0,
+    }
+
+
+def payload_membros(inicio, quantidade):
+    return [
+        {
+            'user': {'id': str(10**17 + i), 'username': f'membro{i}', 'discriminator': '0',
+                     'global_name': f'Membro {i}', 'avatar': None},
+            'roles': [str(CARGO_ADMIN)] if i % 5000 == 0 else [],
+            'joined_at': '2024-01-01T00:00:00+00:00',
+            'deaf': False,
+            'mute': False,
+            'flags': 0,
+        }
+        for i in range(inicio, inicio + quantidade)
+    ]
+
+
+def novo_estado(mod, enxuto):
+    mod.MODO_ENXUTO = enxuto
+    intents = mod.montar_intents()
+    cliente = discord.Client(intents=intents, member_cache_flags=mod.montar_cache_membros(intents))
+    estado = cliente._connection
+    guild = discord.Guild(data=payload_guild(), state=estado)
+    estado._add_guild(guild)
+    return cliente, estado, guild
+
+
+def processar_chunks(estado, guild, membros, cache):
+    # Mesmo caminho do GUILD_MEMBERS_CHUNK do gateway
+    pedido = ChunkRequest(guild.id, None, estado._get_guild, cache=cache)
+    estado._chunk_requests[pedido.nonce] = pedido
+    total_chunks = (membros + TAMANHO_CHUNK - 1) // TAMANHO_CHUNK
+    for indice in range(total_chunks):
+        estado.parse_guild_members_chunk({
+            'guild_id': str(guild.id),
+            'members': payload_membros(indice * TAMANHO_CHUNK, min(TAMANHO_CHUNK, membros - indice * TAMANHO_CHUNK)),
+            'chunk_index': indice,
+            'chunk_count': total_chunks,
+            'nonce': pedido.nonce,
+        })
+    return pedido.buffer
+
+
+def medir(func):
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    resultado = func()
+    duracao = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] - base
+    gc.collect()
+    retido = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return resultado, duracao, pico, retido
+
+
+def mb(valor):
+    return f"{valor / 2**20:8.1f} MB"
+
+
+def main():
+    tamanhos = [int(n) for n in (sys.argv[1] if len(sys.argv) > 1 else "1000,10000,50000").split(",")]
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    print(f"{'membros':>8} | {'modo':<34} | {'tempo':>9} | {'pico':>11} | {'retido':>11}")
+    for membros in tamanhos:
+        # Padrão: o login faz chunk de tudo e guarda cada membro
+        cliente, estado, guild = novo_estado(mod, enxuto=False)
+
+        def login_padrao():
+            processar_chunks(estado, guild, membros, cache=estado.member_cache_flags.joined)
+            return len(guild.members)
+
+        em_cache, duracao, pico, retido = medir(login_padrao)
+        print(f"{membros:>8} | {'padrão: chunk no login':<34} | {duracao * 1000:7.0f}ms | {mb(pico)} | {mb(retido)}  ({em_cache} em cache)")
+        del cliente, estado, guild
+
+        # Enxuto: login sem chunk; o índice de admins faz um chunk sem cache quando necessário
+        cliente, estado, guild = novo_estado(mod, enxuto=True)
+        print(f"{membros:>8} | {'enxuto: login':<34} | {0:7.0f}ms | {mb(0)} | {mb(0)}  (0 em cache)")
+
+        def indice_sob_demanda():
+            membros_chunk = processar_chunks(estado, guild, membros, cache=False)
+            return {m.id for m in membros_chunk if m.guild_permissions.administrator and not m.bot}
+
+        admins, duracao, pico, retido = medir(indice_sob_demanda)
+        print(f"{membros:>8} | {'enxuto: 1º comprovante (índice)':<34} | {duracao * 1000:7.0f}ms | {mb(pico)} | {mb(retido)}  "
+              f"({len(guild.members)} em cache, {len(admins)} admins indexados)")
+        del cliente, estado, guild, admins
+
+
+if __name__ == "__main__":
+    main()
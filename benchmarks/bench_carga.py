@@ -0,0 +1,325 @@
+# Teste de carga offline: tempestades de eventos contra os handlers reais
+# Os payloads entram pelos parsers do ConnectionState do discord.py (como se
+# viessem do gateway) e toda chamada à API (HTTP e respostas de interação) cai
+# num Discord falso com latência configurável, que registra cada requisição.
+#
+# Cenários:
+#   raid         - entradas em massa (on_member_join + resumo do modo raid)
+#   chat         - mensagens comuns (on_message)
+#   exclusao     - exclusão uma a uma das mensagens do chat (on_raw_message_delete + log)
+#   purga        - as mesmas exclusões em purgas de 100 (on_raw_bulk_message_delete)
+#   voz          - membros entrando, trocando de canal, caindo e voltando (sessões de voz)
+#   flash_sale   - cliques em "Comprar" de compradores diferentes (criar_carrinho)
+#   comprovantes - anexos enviados nos carrinhos abertos (menção aos admins)
+#
+# Relata eventos/s, latência p50/p99 do evento até o fim dos handlers, chamadas
+# à API por evento (os logs em lote são drenados antes da contagem) e logs
+# descartados por backpressure. O Discord falso não simula rate limits.
+#
+# Uso: python benchmarks/bench_carga.py [eventos_por_cenario] [latencia_api_ms] [saida.json]
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import discord
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+GUILD_ID = 900000000000000000
+BOT_ID = GUILD_ID + 1
+CARGO_ADMIN = GUILD_ID + 2
+CATEGORIA_CARRINHOS = GUILD_ID + 10
+CANAL_LOJA = GUILD_ID + 11
+CANAIS_LOG = {tipo: GUILD_ID + 20 + i for i, tipo in enumerate(("join", "leave", "delete", "edit", "ban", "voice"))}
+CANAIS_VOZ = [GUILD_ID + 30 + i for i in range(3)]
+ADMINS = 5
+RAJADA = 50  # eventos entregues por volta do loop (o gateway entrega em lotes)
+DATA = '2024-01-01T00:00:00+00:00'
+
+
+def snowflakes(inicio):
+    atual = inicio
+    while True:
+        atual += 1
+        yield atual
+
+
+IDS = snowflakes(10**18)
+
+
+def usuario(user_id, nome, bot=False):
+    return {'id': str(user_id), 'username': nome, 'discriminator': '0', 'global_name': nome, 'avatar': None, 'bot': bot}
+
+
+def membro(user_id, nome, cargos=(), bot=False):
+    return {'user': usuario(user_id, nome, bot), 'roles': [str(c) for c in cargos], 'joined_at': DATA,
+            'deaf': False, 'mute': False, 'flags': 0}
+
+
+def canal(channel_id, nome, tipo=0, parent_id=None):
+    return {'id': str(channel_id), 'type': tipo, 'guild_id': str(GUILD_ID), 'name': nome, 'position': 0,
+            'permission_overwrites': [], 'parent_id': str(parent_id) if parent_id else None, 'nsfw': False}
+
+
+def payload_guild():
+    cargo = lambda cargo_id, nome, permissoes: {
+        'id': str(cargo_id), 'name': nome, 'permissions': permissoes, 'position': 0 if cargo_id == GUILD_ID else 1,
+        'color': 0, 'hoist': False, 'managed': False, 'mentionable': False,
+    }
+    canais = [canal(CATEGORIA_CARRINHOS, "carrinhos", tipo=4), canal(CANAL_LOJA, "loja")]
+    canais += [canal(channel_id, f"logs-{tipo}") for tipo, channel_id in CANAIS_LOG.items()]
+    canais += [dict(canal(channel_id, f"call-{i}", tipo=2), bitrate=64000, user_limit=0) for i, channel_id in enumerate(CANAIS_VOZ)]
+    membros = [membro(BOT_ID, "virex", [CARGO_ADMIN], bot=True)]
+    membros += [membro(GUILD_ID + 100 + i, f"admin{i}", [CARGO_ADMIN]) for i in range(ADMINS)]
+    return {
+        'id': str(GUILD_ID), 'name': 'loja de carga', 'owner_id': str(GUILD_ID + 100),
+        'roles': [cargo(GUILD_ID, '@everyone', '0'), cargo(CARGO_ADMIN, 'admin', '8')],
+        'channels': canais, 'members': membros, 'member_count': len(membros),
+    }
+
+
+def payload_mensagem(message_id, channel_id, autor, conteudo, anexos=0):
+    return {
+        'id': str(message_id), 'channel_id': str(channel_id), 'guild_id': str(GUILD_ID),
+        'author': autor, 'member': {'roles': [], 'joined_at': DATA, 'deaf': False, 'mute': False, 'flags': 0},
+        'content': conteudo, 'timestamp': DATA, 'edited_timestamp': None, 'tts': False,
+        'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'embeds': [], 'pinned': False, 'type': 0,
+        'attachments': [
+            {'id': str(next(IDS)), 'filename': 'comprovante.png', 'size': 1024,
+             'url': 'https://cdn.invalid/comprovante.png', 'proxy_url': 'https://cdn.invalid/comprovante.png'}
+            for _ in range(anexos)
+        ],
+    }
+
+
+def payload_voz(user_id, channel_id):
+    return {
+        'guild_id': str(GUILD_ID), 'channel_id': str(channel_id) if channel_id else None, 'user_id': str(user_id),
+        'member': membro(user_id, f"membro{user_id}"), 'session_id': 'sessao', 'deaf': False, 'mute': False,
+        'self_deaf': False, 'self_mute': False, 'self_video': False, 'suppress': False,
+        'request_to_speak_timestamp': None,
+    }
+
+
+def payload_clique(user_id):
+    return {
+        'id': str(next(IDS)), 'application_id': str(BOT_ID), 'type': 3, 'token': 'token-falso', 'version': 1,
+        'guild_id': str(GUILD_ID), 'channel_id': str(CANAL_LOJA), 'locale': 'pt-BR', 'guild_locale': 'pt-BR',
+        'app_permissions': '8',
+        'member': dict(membro(user_id, f"cliente{user_id}"), permissions='0'),
+        'data': {'custom_id': 'virex:comprar:prod_1', 'component_type': 2},
+    }
+
+
+class DiscordFalso:
+    # Responde como a API e registra cada chamada (rota com parâmetros genéricos)
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.chamadas = Counter()
+
+    async def _chamada(self, route, corpo):
+        self.chamadas[f"{route.method} {route.path}"] += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+        if route.path == '/guilds/{guild_id}/channels':
+            return canal(next(IDS), corpo.get('name', 'canal'), corpo.get('type', 0), corpo.get('parent_id'))
+        if route.path == '/channels/{channel_id}':
+            return canal(route.channel_id, corpo.get('name', 'canal'), parent_id=CATEGORIA_CARRINHOS)
+        if route.path == '/channels/{channel_id}/messages':
+            return payload_mensagem(next(IDS), route.channel_id, usuario(BOT_ID, "virex", bot=True), corpo.get('content') or '')
+        if route.path == '/webhooks/{webhook_id}/{webhook_token}':
+            return payload_mensagem(next(IDS), CANAL_LOJA, usuario(BOT_ID, "virex", bot=True), corpo.get('content') or '')
+        return None
+
+    def instalar(self, bot):
+        falso = self
+
+        async def request(route, **kwargs):
+            return await falso._chamada(route, kwargs.get('json') or {})
+
+        async def request_webhook(adapter, route, session, *, payload=None, **kwargs):
+            return await falso._chamada(route, payload or {})
+
+        bot.http.request = request
+        AsyncWebhookAdapter.request = request_webhook
+
+
+class Injetor:
+    # Entrega payloads aos parsers e mede do evento até o fim de todos os handlers disparados
+    def __init__(self, bot):
+        self.bot = bot
+        self.parsers = bot._connection.parsers
+        self.tarefas = []
+        self.erros = []
+        agendar = bot._schedule_event
+
+        def agendar_medido(coro, nome, *args, **kwargs):
+            tarefa = agendar(coro, nome, *args, **kwargs)
+            self.tarefas.append(tarefa)
+            return tarefa
+
+        async def on_error(evento, *args, **kwargs):
+            self.erros.append((evento, sys.exc_info()[1]))
+
+        bot._schedule_event = agendar_medido
+        bot.on_error = on_error
+
+    async def tempestade(self, evento, payloads):
+        latencias = []
+        pendentes = []
+
+        for i, payload in enumerate(payloads):
+            self.tarefas = []
+            inicio = time.perf_counter()
+            self.parsers[evento](payload)
+            if self.tarefas:
+                self._medir(inicio, self.tarefas, latencias)
+                pendentes.extend(self.tarefas)
+            else:
+                latencias.append(time.perf_counter() - inicio)
+            if (i + 1) % RAJADA == 0:
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*pendentes, return_exceptions=True)
+        return latencias
+
+    @staticmethod
+    def _medir(inicio, tarefas, latencias):
+        # O evento termina quando o último handler que ele disparou termina
+        restantes = [len(tarefas)]
+
+        def concluida(_):
+            restantes[0] -= 1
+            if not restantes[0]:
+                latencias.append(time.perf_counter() - inicio)
+
+        for tarefa in tarefas:
+            tarefa.add_done_callback(concluida)
+
+
+def percentil(amostras, p):
+    ordenadas = sorted(amostras)
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+
+async def main():
+    eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latencia_api = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    saida = sys.argv[3] if len(sys.argv) > 3 else None
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    bot = mod.bot
+    await bot._async_setup_hook()
+    estado = bot._connection
+    estado.user = discord.ClientUser(state=estado, data=usuario(BOT_ID, "virex", bot=True))
+    guild = discord.Guild(data=payload_guild(), state=estado)
+    estado._add_guild(guild)
+
+    discord_falso = DiscordFalso(latencia_api)
+    discord_falso.instalar(bot)
+    injetor = Injetor(bot)
+    mod.iniciar_persistencia()
+
+    for tipo, channel_id in CANAIS_LOG.items():
+        mod.set_log_channel(GUILD_ID, tipo, guild.get_channel(channel_id))
+    mod.config_da_guild(GUILD_ID)['categoria_id'] = CATEGORIA_CARRINHOS
+    mod.produtos['prod_1'] = {'titulo': 'VIP', 'descricao': 'Produto de teste', 'preco': '29.90', 'imagem_url': None}
+
+    base = 2 * 10**17
+    mensagens = [next(IDS) for _ in range(eventos)]
+
+    def voz():
+        # Cada membro: entra, troca de canal, cai, volta e sai (5 mudanças de estado)
+        mod.VOZ_DEBOUNCE = 0.5
+        roteiro = (CANAIS_VOZ[0], CANAIS_VOZ[1], None, CANAIS_VOZ[1], None)
+        membros = range(base + 3 * 10**6, base + 3 * 10**6 + max(1, eventos // len(roteiro)))
+        return [payload_voz(user_id, channel_id) for channel_id in roteiro for user_id in membros]
+
+    def purgas():
+        # Repõe no armazém as mensagens apagadas no cenário anterior
+        armazem = mod._armazens_conteudo[GUILD_ID]
+        for i, message_id in enumerate(mensagens):
+            armazem.guardar(message_id, base + i % 500, CANAL_LOJA, f"mensagem {i}")
+        return [
+            {'ids': [str(message_id) for message_id in mensagens[i:i + 100]],
+             'channel_id': str(CANAL_LOJA), 'guild_id': str(GUILD_ID)}
+            for i in range(0, len(mensagens), 100)
+        ]
+    cenarios = [
+        ("raid", 'GUILD_MEMBER_ADD', lambda: [
+            dict(membro(base + i, f"raider{i}"), guild_id=str(GUILD_ID)) for i in range(eventos)
+        ]),
+        ("chat", 'MESSAGE_CREATE', lambda: [
+            payload_mensagem(message_id, CANAL_LOJA, usuario(base + i % 500, f"membro{i % 500}"), f"mensagem {i}")
+            for i, message_id in enumerate(mensagens)
+        ]),
+        ("exclusao", 'MESSAGE_DELETE', lambda: [
+            {'id': str(message_id), 'channel_id': str(CANAL_LOJA), 'guild_id': str(GUILD_ID)} for message_id in mensagens
+        ]),
+        ("purga", 'MESSAGE_DELETE_BULK', purgas),
+        ("voz", 'VOICE_STATE_UPDATE', voz),
+        ("flash_sale", 'INTERACTION_CREATE', lambda: [payload_clique(base + 10**6 + i) for i in range(eventos)]),
+        ("comprovantes", 'MESSAGE_CREATE', lambda: [
+            payload_mensagem(next(IDS), channel_id, usuario(registro['comprador_id'], "cliente"), "", anexos=1)
+            for channel_id, registro in list(mod.carrinhos.items())[:eventos]
+        ]),
+    ]
+
+    print(f"{eventos} eventos por cenário | latência da API falsa: {latencia_api * 1000:.0f} ms\n")
+    print(f"{'cenário':<13} | {'eventos':>7} | {'eventos/s':>9} | {'p50':>9} | {'p99':>9} | {'API/evento':>10} | "
+          f"{'descartes':>9} | rotas mais chamadas")
+    resultados = {}
+    for nome, evento, gerar in cenarios:
+        payloads = gerar()
+        discord_falso.chamadas.clear()
+        erros_antes = len(injetor.erros)
+
+        inicio = time.perf_counter()
+        latencias = await injetor.tempestade(evento, payloads)
+        await mod.drenar_raids()
+        if mod._sessoes_voz:
+            await asyncio.sleep(mod.VOZ_DEBOUNCE + 0.1)  # sessões encerram depois do debounce
+        descartados = sum(fila['descartados'] for fila in mod.estatisticas_logs().values())
+        await mod.drenar_filas_logs()
+        duracao = time.perf_counter() - inicio
+
+        chamadas = sum(discord_falso.chamadas.values())
+        rotas = ", ".join(f"{rota} x{n}" for rota, n in discord_falso.chamadas.most_common(2))
+        resultados[nome] = {
+            'eventos': len(payloads),
+            'eventos_s': len(payloads) / duracao,
+            'p50_ms': percentil(latencias, 50) * 1000,
+            'p99_ms': percentil(latencias, 99) * 1000,
+            'chamadas_api': chamadas,
+            'api_por_evento': chamadas / len(payloads),
+            'logs_descartados': descartados,
+            'rotas': dict(discord_falso.chamadas),
+            'erros': len(injetor.erros) - erros_antes,
+        }
+        r = resultados[nome]
+        print(f"{nome:<13} | {r['eventos']:>7} | {r['eventos_s']:>9.0f} | {r['p50_ms']:>7.1f}ms | {r['p99_ms']:>7.1f}ms | "
+              f"{r['api_por_evento']:>10.2f} | {descartados:>9} | {rotas or '-'}")
+
+    if injetor.erros:
+        evento, erro = injetor.erros[0]
+        print(f"\n⚠️ {len(injetor.erros)} erros nos handlers (primeiro em {evento}: {erro!r})")
+
+    if saida:
+        with open(os.path.join(RAIZ, saida) if not os.path.isabs(saida) else saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    await mod.parar_persistencia()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
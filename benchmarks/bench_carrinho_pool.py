@@ -0,0 +1,201 @@
+# Benchmark: latência de criar_carrinho com e sem o pool de canais
+# Simula uma rajada de cliques em "Comprar" contra um Discord falso com
+# latência de API e limite de criação de canais, e mede:
+#   - resposta: até a primeira resposta à interação (prazo de 3s do Discord)
+#   - pronto:   até o carrinho estar postado e o comprador avisado
+#
+# Uso: python benchmarks/bench_carrinho_pool.py [cliques] [tamanho_pool]
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Parâmetros simulados (segundos "reais"); ESCALA acelera a execução
+ESCALA = float(os.getenv("ESCALA", "0.05"))
+LAT_CRIAR = 0.35
+LAT_EDITAR = 0.15
+LAT_ENVIAR = 0.12
+CRIACOES_POR_JANELA = 5
+JANELA_CRIACAO = 5.0
+DURACAO_RAJADA = 3.0
+
+
+async def dormir(segundos):
+    await asyncio.sleep(segundos * ESCALA)
+
+
+class LimiteFake:
+    def __init__(self, por_janela, janela):
+        self.por_janela = por_janela
+        self.janela = janela * ESCALA
+        self.usos = []
+        self.lock = asyncio.Lock()
+
+    async def aguardar(self):
+        async with self.lock:
+            agora = time.perf_counter()
+            self.usos = [t for t in self.usos if agora - t < self.janela]
+            if len(self.usos) >= self.por_janela:
+                await asyncio.sleep(self.usos[0] + self.janela - agora)
+                self.usos.pop(0)
+            self.usos.append(time.perf_counter())
+
+
+class Fake:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class CanalFake:
+    proximo_id = 1000
+
+    def __init__(self, guild, categoria, name):
+        CanalFake.proximo_id += 1
+        self.id = CanalFake.proximo_id
+        self.guild = guild
+        self.category_id = categoria.id
+        self.name = name
+        self.mention = f"<#{self.id}>"
+
+    async def edit(self, name=None, overwrites=None):
+        await dormir(LAT_EDITAR)
+        self.name = name
+
+    async def send(self, *args, **kwargs):
+        await dormir(LAT_ENVIAR)
+
+
+class CategoriaFake:
+    def __init__(self, guild):
+        self.id = 500
+        self.guild = guild
+        self.name = "carrinhos"
+        self.text_channels = []
+        self.limite = LimiteFake(CRIACOES_POR_JANELA, JANELA_CRIACAO)
+        self.criados = 0
+
+    async def create_text_channel(self, name, overwrites=None):
+        await self.limite.aguardar()
+        await dormir(LAT_CRIAR)
+        canal = CanalFake(self.guild, self, name)
+        self.guild.canais[canal.id] = canal
+        self.text_channels.append(canal)
+        self.criados += 1
+        return canal
+
+
+class GuildFake:
+    def __init__(self):
+        self.id = 1
+        self.canais = {}
+        self.default_role = Fake(id=1)
+        self.me = Fake(id=2)
+
+    def get_channel(self, channel_id):
+        return self.canais.get(channel_id)
+
+
+class RespostaFake:
+    def __init__(self, amostra):
+        self.amostra = amostra
+        self.feita = False
+
+    def is_done(self):
+        return self.feita
+
+    async def _responder(self):
+        await dormir(LAT_ENVIAR)
+        self.feita = True
+        self.amostra.setdefault('resposta', time.perf_counter())
+
+    async def defer(self, **kwargs):
+        await self._responder()
+
+    async def send_message(self, *args, **kwargs):
+        await self._responder()
+        self.amostra['pronto'] = time.perf_counter()
+
+
+class InteracaoFake:
+    def __init__(self, guild, n, amostra):
+        self.guild = guild
+        self.user = Fake(id=10_000 + n, name=f"cliente{n}", mention=f"<@{10_000 + n}>")
+        self.response = RespostaFake(amostra)
+        self.followup = Fake(send=self._followup)
+        self.amostra = amostra
+
+    async def _followup(self, *args, **kwargs):
+        await dormir(LAT_ENVIAR)
+        self.amostra['pronto'] = time.perf_counter()
+
+
+def percentis(valores):
+    valores = sorted(v / ESCALA * 1000 for v in valores)
+    p = lambda q: valores[min(len(valores) - 1, int(q * len(valores)))]
+    return f"p50={p(0.50):7.0f}ms  p95={p(0.95):7.0f}ms  p99={p(0.99):7.0f}ms  max={valores[-1]:7.0f}ms"
+
+
+async def rodada(mod, cliques, tamanho_pool):
+    guild = GuildFake()
+    categoria = CategoriaFake(guild)
+    guild.canais[categoria.id] = categoria
+    mod.config_da_guild(guild.id)['categoria_id'] = categoria.id
+    mod._pool_carrinhos.clear()
+
+    if tamanho_pool:
+        mod.CART_POOL_SIZE = tamanho_pool
+        mod._categorias_pool = lambda: [categoria]
+        mod._pool_task = None
+        mod.iniciar_pool_carrinhos()
+        while len(mod._pool_carrinhos.get(categoria.id, ())) < tamanho_pool:
+            await asyncio.sleep(0.01)
+    criados_antes = categoria.criados
+
+    produto = {'titulo': 'VIP', 'descricao': 'Produto de teste', 'preco': '29.90', 'imagem_url': None}
+    amostras = []
+
+    async def clique(n):
+        await asyncio.sleep(DURACAO_RAJADA * ESCALA * n / cliques)
+        amostra = {}
+        amostras.append(amostra)
+        inicio = time.perf_counter()
+        await mod.criar_carrinho(InteracaoFake(guild, n, amostra), produto, 'prod_1')
+        amostra['resposta'] -= inicio
+        amostra['pronto'] -= inicio
+
+    await asyncio.gather(*(clique(n) for n in range(cliques)))
+
+    if mod._pool_task is not None:
+        mod._pool_task.cancel()
+        mod._pool_task = None
+
+    return amostras, categoria.criados - criados_antes
+
+
+async def main():
+    cliques = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    tamanho_pool = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+    mod.iniciar_persistencia()
+
+    print(f"rajada de {cliques} cliques em {DURACAO_RAJADA:.0f}s | criação: {LAT_CRIAR * 1000:.0f}ms, "
+          f"{CRIACOES_POR_JANELA} por {JANELA_CRIACAO:.0f}s | edição: {LAT_EDITAR * 1000:.0f}ms")
+
+    for nome, pool in (("frio (sem pool)", 0), (f"pool={tamanho_pool}", tamanho_pool)):
+        amostras, criados = await rodada(mod, cliques, pool)
+        print(f"\n{nome}: {criados} canais criados durante a rajada")
+        print(f"  resposta: {percentis([a['resposta'] for a in amostras])}")
+        print(f"  pronto:   {percentis([a['pronto'] for a in amostras])}")
+
+    await mod.parar_persistencia()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+# Benchmark: cobertura dos logs de apagadas/editadas por MB de RAM
+# Compara o cache de mensagens do discord.py (objetos Message completos, criados
+# pelo próprio ConnectionState a partir de payloads MESSAGE_CREATE) com o
+# armazém de conteúdo do bot (autor, canal, texto e anexos), com e sem zlib.
+# A memória é medida com tracemalloc; a cobertura é a fração das últimas N
+# mensagens de um canal movimentado que ainda teriam log se fossem apagadas.
+#
+# Uso: python benchmarks/bench_conteudo.py [mensagens] [orcamento_mb]
+
+import gc
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_carga as carga  # noqa: E402
+
+PALAVRAS = ("oi", "alguém", "sabe", "se", "o", "vip", "ainda", "tem", "estoque", "paguei", "pix", "mandei",
+            "comprovante", "obrigado", "mano", "quando", "volta", "drop", "hoje", "kkkk", "valeu", "preço",
+            "link", "aqui", "demora", "muito", "entrega", "funcionou", "não", "sim", "pedido", "carrinho")
+
+
+def gerar_mensagens(quantidade):
+    aleatorio = random.Random(42)
+    mensagens = []
+    for i in range(quantidade):
+        # Maioria curta, algumas longas (cópias de texto, regras, etc.)
+        tamanho = aleatorio.choice((3, 5, 8, 12, 20, 40)) if aleatorio.random() < 0.95 else 150
+        conteudo = " ".join(aleatorio.choice(PALAVRAS) for _ in range(tamanho))
+        anexos = 1 if aleatorio.random() < 0.05 else 0
+        autor = carga.usuario(10**17 + i % 300, f"membro{i % 300}")
+        mensagens.append(carga.payload_mensagem(next(carga.IDS), carga.CANAL_LOJA, autor, conteudo, anexos))
+    return mensagens
+
+
+def medir(funcao):
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    resultado = funcao()
+    gc.collect()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return depois - antes, resultado
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    orcamento = float(sys.argv[2]) * 1024 * 1024 if len(sys.argv) > 2 else 2 * 1024 * 1024
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    payloads = gerar_mensagens(quantidade)
+
+    def cache_discord():
+        cliente = discord.Client(intents=discord.Intents.all(), max_messages=quantidade)
+        estado = cliente._connection
+        estado._add_guild(discord.Guild(data=carga.payload_guild(), state=estado))
+        for payload in payloads:
+            estado.parse_message_create(payload)
+        return cliente
+
+    def armazem():
+        armazem = mod.ArmazemConteudo(float('inf'))
+        for payload in payloads:
+            armazem.guardar(int(payload['id']), int(payload['author']['id']), int(payload['channel_id']),
+                            payload['content'], [anexo['url'] for anexo in payload['attachments']])
+        return armazem
+
+    linhas = []
+    bytes_cache, cliente = medir(cache_discord)
+    assert len(cliente._connection._messages) == quantidade
+    linhas.append(("cache do discord.py", bytes_cache / quantidade, None))
+    del cliente
+
+    for nome, zlib_ativo in (("armazém", False), ("armazém + zlib", True)):
+        mod.CONTEUDO_ZLIB = zlib_ativo
+        bytes_reais, resultado = medir(armazem)
+        linhas.append((nome, bytes_reais / quantidade, resultado.bytes / quantidade))
+        del resultado
+
+    # Conferência: o limite em bytes do armazém é respeitado e as mais antigas saem primeiro
+    limitado = mod.ArmazemConteudo(orcamento)
+    for payload in payloads:
+        limitado.guardar(int(payload['id']), 1, 1, payload['content'])
+    assert limitado.bytes <= orcamento and next(reversed(limitado.mensagens)) == int(payload['id'])
+
+    print(f"{quantidade} mensagens sintéticas | orçamento: {orcamento / 1024 / 1024:.1f} MB\n")
+    print(f"{'armazenamento':<20} | {'bytes/msg (real)':>16} | {'bytes/msg (contabilizado)':>25} | "
+          f"{'msgs no orçamento':>17} | cobertura das últimas {quantidade}")
+    for nome, por_mensagem, contabilizado in linhas:
+        cabem = int(orcamento // por_mensagem)
+        print(f"{nome:<20} | {por_mensagem:>16.0f} | {(f'{contabilizado:.0f}' if contabilizado else '-'):>25} | "
+              f"{cabem:>17} | {min(1.0, cabem / quantidade) * 100:5.1f}%")
+    print(f"\nPadrão do discord.py (max_messages=1000): cobertura de {min(1.0, 1000 / quantidade) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
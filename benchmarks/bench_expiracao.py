@@ -0,0 +1,119 @@
+# Benchmark: fechamento e expiração de carrinhos pelo agendador central
+# 1) Memória de N fechamentos pendentes: uma corrotina parada em
+#    asyncio.sleep(5) por carrinho (como o botão Fechar fazia) contra uma
+#    entrada na heap de prazos.
+# 2) Carrinhos abandonados de uma venda relâmpago (criados pelo fluxo real, via
+#    bench_carga) vencendo ao mesmo tempo: avisos, fechamentos e quantos
+#    fechamentos ficam em voo ao mesmo tempo no Discord falso.
+#
+# Uso: python benchmarks/bench_expiracao.py [pendentes] [carrinhos] [latencia_api_ms]
+
+import asyncio
+import gc
+import heapq
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_carga as carga  # noqa: E402
+
+
+async def memoria(mod, pendentes):
+    async def fechar_antigo():
+        await asyncio.sleep(5)
+
+    gc.collect()
+    tracemalloc.start()
+    tarefas = [asyncio.create_task(fechar_antigo()) for _ in range(pendentes)]
+    await asyncio.sleep(0)
+    por_tarefa = tracemalloc.get_traced_memory()[0] / pendentes
+    tracemalloc.stop()
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+
+    gc.collect()
+    tracemalloc.start()
+    heap = []
+    agora = time.time()
+    for channel_id in range(pendentes):
+        heapq.heappush(heap, (agora + 5, 10**17 + channel_id))
+    por_entrada = tracemalloc.get_traced_memory()[0] / pendentes
+    tracemalloc.stop()
+    return por_tarefa, por_entrada
+
+
+async def main():
+    pendentes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    quantidade = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    latencia_api = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.05
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    por_tarefa, por_entrada = await memoria(mod, pendentes)
+    print(f"{pendentes} fechamentos pendentes")
+    print(f"  sleep(5) por carrinho: {por_tarefa:6.0f} bytes cada ({por_tarefa * pendentes / 1024 / 1024:5.1f} MB)")
+    print(f"  heap de prazos:        {por_entrada:6.0f} bytes cada ({por_entrada * pendentes / 1024 / 1024:5.1f} MB)\n")
+
+    bot = mod.bot
+    await bot._async_setup_hook()
+    estado = bot._connection
+    estado.user = discord.ClientUser(state=estado, data=carga.usuario(carga.BOT_ID, "virex", bot=True))
+    guild = discord.Guild(data=carga.payload_guild(), state=estado)
+    estado._add_guild(guild)
+
+    discord_falso = carga.DiscordFalso(latencia_api)
+    discord_falso.instalar(bot)
+    chamada = discord_falso._chamada
+    em_voo = {'agora': 0, 'maximo': 0}
+
+    async def chamada_contada(route, corpo):
+        if route.method != 'DELETE':
+            return await chamada(route, corpo)
+        em_voo['agora'] += 1
+        em_voo['maximo'] = max(em_voo['maximo'], em_voo['agora'])
+        try:
+            return await chamada(route, corpo)
+        finally:
+            em_voo['agora'] -= 1
+
+    discord_falso._chamada = chamada_contada
+    injetor = carga.Injetor(bot)
+    mod.iniciar_persistencia()
+    mod.config_da_guild(carga.GUILD_ID)['categoria_id'] = carga.CATEGORIA_CARRINHOS
+    mod.produtos['prod_1'] = {'titulo': 'VIP', 'descricao': 'Produto de teste', 'preco': '29.90', 'imagem_url': None}
+
+    await injetor.tempestade('INTERACTION_CREATE', [carga.payload_clique(3 * 10**17 + i) for i in range(quantidade)])
+    abertos = len(mod.carrinhos)
+
+    # Todos vencem juntos: aviso 0.5s antes do prazo e fechamento no prazo
+    mod.CARRINHO_AVISO_MIN = 0.5 / 60
+    prazo = time.time() + 1.0
+    for registro in mod.carrinhos.values():
+        registro['expira_em'] = prazo
+    await mod.iniciar_expiracao_carrinhos()
+
+    discord_falso.chamadas.clear()
+    inicio = time.perf_counter()
+    while mod.carrinhos and time.perf_counter() - inicio < 120:
+        await asyncio.sleep(0.05)
+    duracao = time.perf_counter() - inicio
+
+    avisos = discord_falso.chamadas['POST /channels/{channel_id}/messages']
+    fechados = discord_falso.chamadas['DELETE /channels/{channel_id}']
+    print(f"{abertos} carrinhos abandonados | API: {latencia_api * 1000:.0f} ms")
+    print(f"  avisos enviados: {avisos} | fechados: {fechados} | restantes: {len(mod.carrinhos)}")
+    print(f"  tudo resolvido {duracao:.2f}s após o início (prazo em 1.0s) | "
+          f"fechamentos simultâneos no máximo: {em_voo['maximo']} (limite {mod.CARRINHO_FECHAMENTOS_SIMULTANEOS})")
+
+    await mod.parar_persistencia()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
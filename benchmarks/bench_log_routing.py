@@ -0,0 +1,70 @@
+# Micro-benchmark: custo por evento de get_log_channel
+# Compara a leitura do logs_config.json a cada evento (comportamento antigo)
+# com a tabela de roteamento em memória.
+#
+# Uso: python benchmarks/bench_log_routing.py [guilds] [eventos]
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+TIPOS = ["join", "leave", "message", "edit", "delete", "ban", "role", "channel", "voice"]
+
+
+class CanalFake:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+def get_log_channel_antigo(mod, guild_id, log_type):
+    data = mod.load_logs_config()
+    guild_data = data.get(str(guild_id), {})
+    channel_id = guild_data.get(log_type)
+    if channel_id:
+        return mod.bot.get_channel(channel_id)
+    return None
+
+
+def medir(func, consultas):
+    inicio = time.perf_counter()
+    for guild_id, tipo in consultas:
+        func(guild_id, tipo)
+    return (time.perf_counter() - inicio) / len(consultas)
+
+
+def main():
+    n_guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_eventos = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    config = {
+        str(1000 + g): {tipo: 10_000 + g * 10 + i for i, tipo in enumerate(TIPOS)}
+        for g in range(n_guilds)
+    }
+    with open("logs_config.json", "w") as f:
+        json.dump(config, f, indent=4)
+
+    import bot_virex_store as mod
+
+    canais = {}
+    mod.bot.get_channel = lambda cid: canais.setdefault(cid, CanalFake(cid))
+    mod.recarregar_rotas_logs()
+
+    consultas = [(1000 + (i * 7919) % n_guilds, TIPOS[i % len(TIPOS)]) for i in range(n_eventos)]
+
+    antigo = medir(lambda g, t: get_log_channel_antigo(mod, g, t), consultas)
+    novo = medir(mod.get_log_channel, consultas)
+
+    print(f"guilds={n_guilds} eventos={n_eventos} tamanho_config={os.path.getsize('logs_config.json')} bytes")
+    print(f"antes (load_logs_config por evento): {antigo * 1e6:10.2f} µs/evento")
+    print(f"depois (tabela em memória):          {novo * 1e6:10.2f} µs/evento")
+    print(f"ganho: {antigo / novo:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
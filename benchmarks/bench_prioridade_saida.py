@@ -0,0 +1,111 @@
+# Benchmark: uma venda relâmpago no meio de uma tempestade de logs
+# Usa o Discord falso e o injetor de bench_carga.py, com o agendador de saída
+# instalado (orçamento global de VIREX_HTTP_RPS chamadas/s). Várias guilds
+# sofrem raid ao mesmo tempo (cada uma com seu canal de log de entradas) e uma
+# delas faz uma venda relâmpago. O modo raid fica desligado nessas guilds para
+# que cada entrada gere seu log, como no pior caso. Compara a fila única (todas as chamadas na
+# mesma classe, ordem de chegada) com as classes de prioridade.
+#
+# Uso: python benchmarks/bench_prioridade_saida.py [guilds_em_raid] [entradas_por_guild] [cliques] [latencia_api_ms]
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_carga as carga  # noqa: E402
+
+
+def guild_extra(n):
+    # Cópia da guild de bench_carga com outros IDs
+    deslocamento = n * 10**6
+    dados = carga.payload_guild()
+    texto = json.dumps(dados)
+    for antigo in sorted({int(c['id']) for c in dados['channels']} | {carga.GUILD_ID}, reverse=True):
+        texto = texto.replace(f'"{antigo}"', f'"{antigo + deslocamento}"')
+    return json.loads(texto), carga.CANAIS_LOG['join'] + deslocamento
+
+
+async def rodada(mod, injetor, guilds_raid, entradas, cliques, prioridades, base):
+    agendador = mod._agendador_saida
+    adquirir = type(agendador).adquirir
+    if prioridades:
+        agendador.adquirir = adquirir.__get__(agendador)
+    else:
+        agendador.adquirir = lambda classe: adquirir(agendador, mod.PRIORIDADE_NOTIFICACAO)
+
+    async def logs():
+        # Entradas intercaladas entre as guilds, como chegariam do gateway
+        await injetor.tempestade('GUILD_MEMBER_ADD', [
+            dict(carga.membro(base + i, f"raider{i}"), guild_id=str(guilds_raid[i % len(guilds_raid)]))
+            for i in range(entradas * len(guilds_raid))
+        ])
+
+    async def venda():
+        # A venda começa com a fila de logs já cheia
+        await asyncio.sleep(1.0)
+        return await injetor.tempestade('INTERACTION_CREATE', [
+            carga.payload_clique(base + 10**6 + i) for i in range(cliques)
+        ])
+
+    inicio = time.perf_counter()
+    _, latencias = await asyncio.gather(logs(), venda())
+    descartados = sum(fila['descartados'] for fila in mod.estatisticas_logs().values())
+    await mod.drenar_filas_logs()
+    duracao = time.perf_counter() - inicio
+    return latencias, descartados, duracao
+
+
+async def main():
+    n_guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    entradas = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    cliques = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    latencia_api = float(sys.argv[4]) / 1000 if len(sys.argv) > 4 else 0.02
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    bot = mod.bot
+    await bot._async_setup_hook()
+    estado = bot._connection
+    estado.user = discord.ClientUser(state=estado, data=carga.usuario(carga.BOT_ID, "virex", bot=True))
+    guild = discord.Guild(data=carga.payload_guild(), state=estado)
+    estado._add_guild(guild)
+
+    discord_falso = carga.DiscordFalso(latencia_api)
+    discord_falso.instalar(bot)
+    mod.instalar_agendador_saida()
+    injetor = carga.Injetor(bot)
+    mod.iniciar_persistencia()
+
+    for tipo, channel_id in carga.CANAIS_LOG.items():
+        mod.set_log_channel(carga.GUILD_ID, tipo, guild.get_channel(channel_id))
+    mod.config_da_guild(carga.GUILD_ID)['categoria_id'] = carga.CATEGORIA_CARRINHOS
+    guilds_raid = []
+    for n in range(1, n_guilds + 1):
+        dados, canal_join = guild_extra(n)
+        extra = discord.Guild(data=dados, state=estado)
+        estado._add_guild(extra)
+        mod.set_log_channel(extra.id, "join", extra.get_channel(canal_join))
+        mod.config_da_guild(extra.id)['raid_limite'] = 0
+        guilds_raid.append(extra.id)
+    mod.produtos['prod_1'] = {'titulo': 'VIP', 'descricao': 'Produto de teste', 'preco': '29.90', 'imagem_url': None}
+
+    print(f"orçamento: {mod.SAIDA_POR_SEGUNDO:.0f} chamadas/s | raid em {n_guilds} guilds x {entradas} entradas "
+          f"| {cliques} cliques em Comprar | API: {latencia_api * 1000:.0f} ms\n")
+    for nome, prioridades, base in (("fila única", False, 3 * 10**17), ("prioridades", True, 4 * 10**17)):
+        latencias, descartados, duracao = await rodada(mod, injetor, guilds_raid, entradas, cliques, prioridades, base)
+        print(f"{nome:<12} | compra p50 {carga.percentil(latencias, 50) * 1000:7.0f} ms | "
+              f"p99 {carga.percentil(latencias, 99) * 1000:7.0f} ms | logs descartados: {descartados:>5} | "
+              f"total {duracao:5.1f}s")
+
+    await mod.parar_persistencia()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
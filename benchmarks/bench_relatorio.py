@@ -0,0 +1,120 @@
+# Benchmark: /relatorio com centenas de milhares de vendas no livro
+# Gera um livro sintético (aberturas, aprovações e expirações espalhadas por
+# um ano, vários produtos) e compara montar os totais relendo o histórico
+# inteiro com ler os totais mantidos incrementalmente, nos dois backends.
+# Também mede o início do bot no modo JSON com e sem o resumo salvo.
+#
+# Uso: python benchmarks/bench_relatorio.py [carrinhos]
+
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+GUILD_ID = 900000000000000000
+PRODUTOS = [f"prod_{i}" for i in range(1, 41)]
+
+
+def gerar_livro(carrinhos):
+    aleatorio = random.Random(7)
+    agora = time.time()
+    linhas = []
+    for i in range(carrinhos):
+        ts = agora - aleatorio.random() * 365 * 86400
+        base = {'guild_id': GUILD_ID, 'channel_id': 10**17 + i, 'produto_id': aleatorio.choice(PRODUTOS),
+                'comprador_id': 10**17 + aleatorio.randrange(20000)}
+        linhas.append(dict(base, ts=ts, evento="aberto", valor_centavos=None))
+        sorteio = aleatorio.random()
+        if sorteio < 0.6:
+            linhas.append(dict(base, ts=ts + 600, evento="aprovado", valor_centavos=aleatorio.choice((990, 2990, 4990, 12990))))
+            linhas.append(dict(base, ts=ts + 900, evento="fechado", valor_centavos=None))
+        elif sorteio < 0.9:
+            linhas.append(dict(base, ts=ts + 86400, evento="expirado", valor_centavos=None))
+    return linhas
+
+
+def medir(funcao, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def rescan(mod, dia_inicial):
+    # O que um relatório sem totais mantidos precisaria fazer a cada chamada
+    totais = {}
+    with open(mod.VENDAS_LIVRO_FILE, 'rb') as f:
+        for bruta in f:
+            linha = json.loads(bruta)
+            deltas = mod.deltas_venda(linha['evento'], linha['valor_centavos'])
+            if deltas is None or linha['guild_id'] != GUILD_ID:
+                continue
+            for chave in mod.chaves_resumo(linha):
+                if chave[0] == 'dia' and chave[1] < dia_inicial:
+                    continue
+                atual = totais.setdefault(chave, [0, 0, 0, 0])
+                for i, delta in enumerate(deltas):
+                    atual[i] += delta
+    return totais
+
+
+def main():
+    carrinhos = int(sys.argv[1]) if len(sys.argv) > 1 else 150000
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    linhas = gerar_livro(carrinhos)
+
+    import bot_virex_store as mod
+
+    with open(mod.VENDAS_LIVRO_FILE, 'wb') as f:
+        for linha in linhas:
+            f.write(json.dumps(linha).encode('utf-8') + b"\n")
+    tamanho = os.path.getsize(mod.VENDAS_LIVRO_FILE)
+
+    inicio = time.perf_counter()
+    mod.carregar_livro_vendas()  # sem resumo salvo: soma o livro inteiro uma vez
+    sem_resumo = time.perf_counter() - inicio
+    mod.flush_persistencia_sync()
+
+    mod._resumo_vendas.clear()
+    inicio = time.perf_counter()
+    mod.carregar_livro_vendas()  # com o resumo salvo: só o trecho novo (vazio)
+    com_resumo = time.perf_counter() - inicio
+
+    dia_inicial = (mod.now().date() - mod.timedelta(days=29)).isoformat()
+    t_rescan, esperado = medir(lambda: rescan(mod, dia_inicial), repeticoes=1)
+    t_json, obtido = medir(lambda: asyncio.run(mod.resumo_vendas(GUILD_ID, dia_inicial)))
+    assert obtido == esperado
+
+    # SQLite: mesmo livro importado pela migração, totais lidos por índice
+    mod.STORAGE_BACKEND = "sqlite"
+    inicio = time.perf_counter()
+    db = mod.conectar_db()
+    mod.migrar_json_para_sqlite()
+    importacao = time.perf_counter() - inicio
+    t_sqlite, obtido_sqlite = medir(lambda: mod._db_resumo_vendas(db, GUILD_ID, dia_inicial))
+    assert obtido_sqlite == esperado
+    t_rescan_sqlite, _ = medir(lambda: db.execute(
+        "SELECT produto_id, SUM(valor_centavos) FROM vendas WHERE guild_id = ? AND evento = 'aprovado' GROUP BY produto_id",
+        (GUILD_ID,)
+    ).fetchall(), repeticoes=1)
+
+    print(f"\n{carrinhos} carrinhos -> {len(linhas)} registros no livro ({tamanho / 1024 / 1024:.1f} MB)\n")
+    print(f"relatório relendo o livro (JSONL):        {t_rescan * 1000:9.1f} ms")
+    print(f"relatório pelos totais (JSON, memória):   {t_json * 1000:9.3f} ms")
+    print(f"GROUP BY sobre a tabela vendas (SQLite):  {t_rescan_sqlite * 1000:9.1f} ms  (só receita por produto)")
+    print(f"relatório pelos totais (SQLite, índice):  {t_sqlite * 1000:9.3f} ms")
+    print(f"\ninício no modo JSON: {sem_resumo * 1000:.0f} ms sem resumo salvo, {com_resumo * 1000:.1f} ms com resumo")
+    print(f"importação do livro para o SQLite: {importacao:.1f}s")
+    mod.fechar_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Benchmark: cache de renderização de painéis e carrinhos
+# Renderiza repetidamente o painel de produto, o painel drop, o embed do
+# carrinho e a lista de produtos do /setup, com o cache e reconstruindo do zero
+# (o que acontecia antes; o item é invalidado antes de cada chamada). Confere
+# pelos contadores do cache (os mesmos exportados em /metrics) que só a
+# primeira renderização de cada item e a primeira depois de uma alteração são
+# reconstruídas.
+#
+# Uso: python benchmarks/bench_render.py [renderizacoes] [produtos]
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import discord
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+class Usuario:
+    mention = "<@1>"
+
+
+def cronometrar(funcao, vezes):
+    inicio = time.perf_counter()
+    for _ in range(vezes):
+        funcao()
+    return (time.perf_counter() - inicio) / vezes * 1e6
+
+
+async def main():
+    vezes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    quantidade = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    for i in range(1, quantidade + 1):
+        mod.produtos[f"prod_{i}"] = {'titulo': f"Produto {i}", 'descricao': "Descrição " * 20, 'preco': "29.90",
+                                     'imagem_url': "https://cdn.invalid/produto.png"}
+    mod.produtos_drop['drop_1'] = {
+        'titulo_painel': "Drop", 'descricao_painel': "Escolha " * 20, 'emoji_painel': "🔥", 'imagem_url': None,
+        'opcoes': [{'nome': f"Opção {i}", 'descricao': "Detalhe", 'preco': "9.90", 'emoji': "⭐"} for i in range(25)],
+    }
+    produto = mod.produtos['prod_1']
+    usuario = Usuario()
+
+    # (nome, renderização, item cuja alteração a invalida)
+    casos = [
+        ("painel de produto", lambda: mod.montar_painel_produto('prod_1'), 'prod_1'),
+        ("painel drop", lambda: mod.montar_painel_drop('drop_1'), 'drop_1'),
+        ("embed do carrinho", lambda: mod.embed_carrinho(produto, 'prod_1', usuario), 'prod_1'),
+        ("lista do /setup", lambda: mod.opcoes_produtos()[:25], 'prod_1'),
+    ]
+
+    print(f"{vezes} renderizações por caso | {quantidade} produtos no catálogo\n")
+    print(f"{'caso':<20} | {'cache (µs)':>10} | {'do zero (µs)':>12} | hits | misses")
+    for nome, renderizar, item_id in casos:
+        antes = mod.estatisticas_render()
+        com_cache = cronometrar(renderizar, vezes)
+        depois = mod.estatisticas_render()
+        hits, misses = depois['hits'] - antes['hits'], depois['misses'] - antes['misses']
+        assert (hits, misses) == (vezes - 1, 1), (nome, hits, misses)
+        # Do zero: o item é invalidado antes de cada chamada, como se não houvesse cache
+        sem_cache = cronometrar(lambda: (mod.invalidar_render(item_id, mod.LISTA_PRODUTOS), renderizar()), max(1, vezes // 10))
+        print(f"{nome:<20} | {com_cache:>10.1f} | {sem_cache:>12.1f} | {hits:>4} | {misses:>6}")
+
+    # Alteração de um produto: só a próxima renderização dele é reconstruída
+    mod.invalidar_render('prod_1', mod.LISTA_PRODUTOS)
+    antes = mod.estatisticas_render()
+    mod.montar_painel_produto('prod_1')
+    mod.montar_painel_produto('prod_1')
+    depois = mod.estatisticas_render()
+    assert (depois['hits'] - antes['hits'], depois['misses'] - antes['misses']) == (1, 1)
+
+    linhas = [linha for linha in mod.exportar_metricas().splitlines() if linha.startswith("virex_render_cache")]
+    print("\n/metrics:\n  " + "\n  ".join(linhas))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
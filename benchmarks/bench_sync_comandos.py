@@ -0,0 +1,55 @@
+# Benchmark: custo de inicialização da sincronização de comandos
+# Compara o sync incondicional (comportamento antigo, a cada on_ready)
+# com o sync controlado pela impressão digital dos comandos.
+# O tree.sync é simulado com a latência informada (padrão: 1.5s).
+#
+# Uso: python benchmarks/bench_sync_comandos.py [latencia_sync_s] [reconexoes]
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+async def main():
+    latencia = float(sys.argv[1]) if len(sys.argv) > 1 else 1.5
+    reconexoes = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    chamadas = []
+
+    async def sync_falso(guild=None):
+        chamadas.append(guild)
+        await asyncio.sleep(latencia)
+
+    mod.bot.tree.sync = sync_falso
+
+    inicio = time.perf_counter()
+    for _ in range(1 + reconexoes):
+        await mod.bot.tree.sync()
+    antigo = time.perf_counter() - inicio
+    print(f"antes (sync em todo on_ready, 1 boot + {reconexoes} reconexões): {antigo:.2f}s, {len(chamadas)} syncs")
+
+    chamadas.clear()
+    for rotulo in ("primeiro boot (sem impressão salva)", "reinício (comandos inalterados)"):
+        inicio = time.perf_counter()
+        await mod.sincronizar_comandos()
+        print(f"depois, {rotulo}: {time.perf_counter() - inicio:.4f}s | {mod._estado_inicializacao['sync']}")
+    print(f"reconexões não sincronizam mais: {reconexoes} x 0s | total de syncs: {len(chamadas)}")
+
+    repeticoes = 1000
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        mod.impressao_digital_comandos()
+    print(f"custo da impressão digital: {(time.perf_counter() - inicio) / repeticoes * 1000:.3f} ms por cálculo "
+          f"({len(mod.bot.tree.get_commands())} comandos)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
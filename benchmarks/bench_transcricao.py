@@ -0,0 +1,160 @@
+# Benchmark: transcrição de carrinhos antes do fechamento
+# Canais falsos entregam o histórico em páginas de 100 (como a API, com
+# latência por página) e anexos de comprovante com bytes aleatórios. Compara o
+# pico de memória da exportação em streaming (gzip sobre arquivo temporário)
+# com juntar o histórico inteiro numa lista e comprimir no fim, e mede quantas
+# exportações rodam juntas quando muitos carrinhos fecham ao mesmo tempo.
+#
+# Uso: python benchmarks/bench_transcricao.py [mensagens_por_carrinho] [carrinhos_fechando] [latencia_pagina_ms]
+
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+GUILD_ID = 900000000000000000
+CANAL_ARQUIVO = GUILD_ID + 50
+PAGINA = 100
+
+
+class Autor:
+    def __init__(self, user_id):
+        self.id = user_id
+
+    def __str__(self):
+        return f"cliente{self.id % 1000}"
+
+
+class Anexo:
+    def __init__(self, tamanho, latencia):
+        self.filename = "comprovante.png"
+        self.url = "https://cdn.invalid/comprovante.png"
+        self.size = tamanho
+        self.content_type = "image/png"
+        self.latencia = latencia
+
+    async def read(self):
+        await asyncio.sleep(self.latencia)
+        return random.randbytes(self.size)
+
+
+class Mensagem:
+    def __init__(self, message_id, autor, conteudo, anexos):
+        self.id = message_id
+        self.created_at = datetime.now(timezone.utc)
+        self.author = autor
+        self.content = conteudo
+        self.embeds = []
+        self.attachments = anexos
+
+
+class CanalArquivo:
+    def __init__(self):
+        self.enviados = []
+
+    async def send(self, embed, file):
+        # Lê em blocos, como o upload multipart faz com arquivos
+        tamanho = 0
+        while bloco := file.fp.read(64 * 1024):
+            tamanho += len(bloco)
+        self.enviados.append(tamanho)
+
+
+class Guild:
+    def __init__(self, arquivo):
+        self.id = GUILD_ID
+        self.filesize_limit = 25 * 1024 * 1024
+        self.arquivo = arquivo
+
+    def get_channel(self, channel_id):
+        return self.arquivo if channel_id == CANAL_ARQUIVO else None
+
+
+class Carrinho:
+    # Histórico gerado página a página: nada além da página atual existe em memória
+    def __init__(self, channel_id, guild, mensagens, latencia, ativos):
+        self.id = channel_id
+        self.name = f"carrinho-{channel_id}"
+        self.guild = guild
+        self.total = mensagens
+        self.latencia = latencia
+        self.ativos = ativos
+
+    async def history(self, limit=None, oldest_first=True):
+        self.ativos['agora'] += 1
+        self.ativos['maximo'] = max(self.ativos['maximo'], self.ativos['agora'])
+        try:
+            for inicio in range(0, self.total, PAGINA):
+                await asyncio.sleep(self.latencia)
+                for i in range(inicio, min(inicio + PAGINA, self.total)):
+                    anexos = [Anexo(200 * 1024, self.latencia)] if i % 50 == 49 else []
+                    conteudo = " ".join(random.choice(("oi", "paguei", "pix", "vip", "entrega", "obrigado")) for _ in range(12))
+                    yield Mensagem(self.id * 10**4 + i, Autor(self.id + i % 2), conteudo, anexos)
+        finally:
+            self.ativos['agora'] -= 1
+
+
+async def exportar_ingenuo(canal):
+    # Referência: junta tudo na memória e comprime no fim
+    mensagens = []
+    async for message in canal.history(limit=None, oldest_first=True):
+        anexos = [await anexo.read() for anexo in message.attachments]
+        mensagens.append({'id': message.id, 'conteudo': message.content, 'anexos': anexos})
+    texto = "\n".join(json.dumps({**m, 'anexos': [a.hex() for a in m['anexos']]}) for m in mensagens)
+    return len(gzip.compress(texto.encode('utf-8')))
+
+
+async def medir_pico(coro):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = await coro
+    duracao = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return pico, duracao, resultado
+
+
+async def main():
+    por_carrinho = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    fechando = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latencia = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.02
+
+    os.chdir(tempfile.mkdtemp(prefix="virex_bench_"))
+    import bot_virex_store as mod
+
+    arquivo = CanalArquivo()
+    guild = Guild(arquivo)
+    mod.config_da_guild(GUILD_ID)['canal_arquivo_id'] = CANAL_ARQUIVO
+    ativos = {'agora': 0, 'maximo': 0}
+    registro = {'guild_id': GUILD_ID, 'comprador_id': 1, 'produto_id': 'prod_1', 'status': mod.CARRINHO_APROVADO}
+
+    random.seed(1)
+    pico_ingenuo, t_ingenuo, tamanho_ingenuo = await medir_pico(exportar_ingenuo(Carrinho(1, guild, por_carrinho, 0, ativos)))
+    random.seed(1)
+    pico_stream, t_stream, _ = await medir_pico(mod.arquivar_transcricao(Carrinho(1, guild, por_carrinho, 0, ativos), registro))
+
+    print(f"{por_carrinho} mensagens por carrinho (1 comprovante de 200 KB a cada 50)\n")
+    print(f"{'exportação':<24} | {'pico de memória':>15} | {'tempo':>7} | arquivo")
+    print(f"{'lista + gzip no fim':<24} | {pico_ingenuo / 1024 / 1024:>12.1f} MB | {t_ingenuo:>6.2f}s | {tamanho_ingenuo / 1024 / 1024:.1f} MB")
+    print(f"{'streaming (bot)':<24} | {pico_stream / 1024 / 1024:>12.1f} MB | {t_stream:>6.2f}s | {arquivo.enviados[-1] / 1024 / 1024:.1f} MB")
+
+    ativos['maximo'] = 0
+    carrinhos = [Carrinho(100 + i, guild, 500, latencia, ativos) for i in range(fechando)]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(mod.arquivar_transcricao(carrinho, registro) for carrinho in carrinhos))
+    print(f"\n{fechando} carrinhos de 500 mensagens fechando juntos (página: {latencia * 1000:.0f} ms): "
+          f"{time.perf_counter() - inicio:.1f}s, no máximo {ativos['maximo']} exportações simultâneas "
+          f"(limite {mod.TRANSCRICOES_SIMULTANEAS})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,27 +2,602 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ui import Button, View, Select, Modal, TextInput
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 import json
+import hashlib
 import os
+import time
+import atexit
+import signal
+import sqlite3
+import struct
+import sys
+import tempfile
 import asyncio
+import base64
+import bisect
+import contextlib
+import contextvars
+import functools
+import gzip
+import heapq
+import io
+import itertools
+import logging
+import re
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # ==========================================
 # CONFIGURAÇÕES E VARIÁVEIS GLOBAIS
 # ==========================================
 
 TOKEN = os.getenv("DISCORD_TOKEN")
+INICIO_PROCESSO = time.monotonic()
 TIMEZONE = pytz.timezone("America/Sao_Paulo")
 
-intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Sharding opcional. VIREX_SHARDS=auto: um processo com a quantidade de shards
+# recomendada pelo Discord. VIREX_SHARDS=<total> + VIREX_SHARD_IDS=<faixa>: este
+# processo roda só a faixa indicada (é assim que o lançador do cluster sobe cada worker)
+SHARDS_ENV = os.getenv("VIREX_SHARDS", "").strip().lower()
+SHARD_IDS_ENV = os.getenv("VIREX_SHARD_IDS", "").strip()
+CLUSTER_PROCESSOS = int(os.getenv("VIREX_PROCESSOS", "1"))
+
+def faixa_shards(texto):
+    # "0-3,6" -> [0, 1, 2, 3, 6]
+    shards = []
+    for parte in texto.split(','):
+        inicio, _, fim = parte.strip().partition('-')
+        shards.extend(range(int(inicio), int(fim or inicio) + 1))
+    return shards
+
+MODO_SHARDED = bool(SHARDS_ENV or SHARD_IDS_ENV)
+MODO_CLUSTER = bool(SHARD_IDS_ENV)
+SHARD_COUNT = int(SHARDS_ENV) if SHARDS_ENV.isdigit() else None
+SHARD_IDS = faixa_shards(SHARD_IDS_ENV) if MODO_CLUSTER else None
+
+class VirexStoreBot(commands.AutoShardedBot if MODO_SHARDED else commands.Bot):
+    async def setup_hook(self):
+        iniciar_persistencia()
+        instalar_agendador_saida()
+        await sincronizar_comandos()
+        await iniciar_metricas()
+        # Railway encerra com SIGTERM: fecha o bot direito para o último flush acontecer
+        try:
+            self.loop.add_signal_handler(signal.SIGTERM, lambda: self.loop.create_task(self.close()))
+        except NotImplementedError:
+            pass
+
+    async def close(self):
+        # Garante que nada pendente no write-behind se perca no desligamento
+        await drenar_raids()
+        await drenar_filas_logs()
+        await parar_persistencia()
+        fechar_db()
+        await parar_metricas()
+        await super().close()
+
+# Modo enxuto: intents explícitos, sem cache de membros e sem chunk no login;
+# quem precisa da lista de membros (índice de admins) pede sob demanda
+MODO_ENXUTO = os.getenv("VIREX_MODO_ENXUTO") == "1"
+
+def montar_intents():
+    if not MODO_ENXUTO:
+        return discord.Intents.all()
+
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.members = True          # entradas/saídas e chunk sob demanda
+    intents.moderation = True       # bans
+    intents.guild_messages = True   # comprovantes e logs de mensagem
+    intents.message_content = True
+    intents.voice_states = True     # log de voz e /botvoz
+    return intents
+
+def montar_cache_membros(intents):
+    if not MODO_ENXUTO:
+        return discord.MemberCacheFlags.from_intents(intents)
+
+    # Só quem está em call fica em cache (conjunto pequeno, usado pelo log de voz)
+    flags = discord.MemberCacheFlags.none()
+    flags.voice = True
+    return flags
+
+def opcoes_shards():
+    if not MODO_SHARDED:
+        return {}
+    return {'shard_count': SHARD_COUNT, 'shard_ids': SHARD_IDS}
+
+intents = montar_intents()
+bot = VirexStoreBot(
+    command_prefix="!",
+    intents=intents,
+    member_cache_flags=montar_cache_membros(intents),
+    chunk_guilds_at_startup=not MODO_ENXUTO,
+    # Os logs de mensagem usam o armazém de conteúdo, não o cache do discord.py
+    max_messages=int(os.getenv("VIREX_MAX_MESSAGES", "1000")) or None,
+    **opcoes_shards()
+)
 
 # Arquivos de configuração
 CONFIG_FILE = "logs_config.json"
-VENDAS_CONFIG_FILE = "config.json"
+VENDAS_CONFIG_FILE = "config.json"  # legado: config global, usada só para semear as configs por guild
+GUILD_CONFIG_DIR = os.getenv("VIREX_GUILD_CONFIG_DIR", "configs")
 PRODUTOS_FILE = "produtos.json"
 PRODUTOS_DROP_FILE = "produtos_drop.json"
+CARRINHOS_FILE = "carrinhos.json"
+VENDAS_LIVRO_FILE = "vendas.jsonl"
+VENDAS_RESUMO_FILE = "vendas_resumo.json"
+COMMAND_SYNC_FILE = "comandos_sync.json"
+
+# Backend de armazenamento do catálogo e contadores: "json" (padrão) ou "sqlite"
+STORAGE_BACKEND = os.getenv("VIREX_STORAGE", "json").lower()
+SQLITE_FILE = os.getenv("VIREX_SQLITE_FILE", "virex_store.db")
+
+# ==========================================
+# PERSISTÊNCIA (WRITE-BEHIND ATÔMICO)
+# ==========================================
+
+# Alterações só marcam o arquivo como sujo; um flush por intervalo grava
+# tudo fora do event loop (arquivo temporário + fsync + rename)
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "2"))
+
+_arquivos_sujos = {}  # caminho -> função que devolve os dados atuais
+_marcas_sujas = {}    # caminho -> marca da última alteração (detecta alterações durante a escrita)
+_contador_marcas = itertools.count()
+_persistencia_task = None
+_persistencia_lock = None
+
+def serializar_json(dados):
+    return json.dumps(dados, ensure_ascii=False)
+
+def escrever_arquivo_atomico(caminho, conteudo):
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    fd, temporario = tempfile.mkstemp(prefix=".tmp_", dir=diretorio)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+        raise
+
+def marcar_sujo(caminho, obter_dados):
+    _arquivos_sujos[caminho] = obter_dados
+    _marcas_sujas[caminho] = next(_contador_marcas)
+    if _persistencia_task is None:
+        # Fora do bot (scripts, migrações) grava na hora
+        flush_persistencia_sync()
+
+def _marcar_gravado(caminho, marca):
+    # O arquivo só deixa de ser sujo depois do os.replace, e só se não foi
+    # alterado de novo enquanto era gravado
+    if _marcas_sujas.get(caminho) == marca:
+        del _arquivos_sujos[caminho]
+        del _marcas_sujas[caminho]
+
+def flush_persistencia_sync():
+    while _arquivos_sujos:
+        caminho, obter_dados = next(iter(_arquivos_sujos.items()))
+        marca = _marcas_sujas[caminho]
+        escrever_arquivo_atomico(caminho, serializar_json(obter_dados()))
+        _marcar_gravado(caminho, marca)
+
+async def flush_persistencia():
+    if not _arquivos_sujos:
+        return
+
+    async with _persistencia_lock:
+        loop = asyncio.get_running_loop()
+
+        # Nada sai de _arquivos_sujos antes de estar no disco: um cancelamento
+        # no meio do flush deixa os restantes para o próximo flush (ou o atexit)
+        for caminho, obter_dados in list(_arquivos_sujos.items()):
+            marca = _marcas_sujas[caminho]
+            # Serializa no loop para ter um snapshot consistente; só o I/O vai pro executor
+            conteudo = serializar_json(obter_dados())
+            try:
+                await loop.run_in_executor(None, escrever_arquivo_atomico, caminho, conteudo)
+            except OSError as e:
+                print(f"❌ Erro ao salvar {caminho}: {e}")
+                continue
+            _marcar_gravado(caminho, marca)
+
+async def _loop_persistencia():
+    while True:
+        await asyncio.sleep(PERSIST_FLUSH_INTERVAL)
+        await flush_persistencia()
+
+def iniciar_persistencia():
+    global _persistencia_task, _persistencia_lock
+    if _persistencia_task is None:
+        _persistencia_lock = asyncio.Lock()
+        _persistencia_task = asyncio.create_task(_loop_persistencia())
+
+async def parar_persistencia():
+    global _persistencia_task
+    if _persistencia_task is None:
+        return
+    task, _persistencia_task = _persistencia_task, None
+    # Espera um flush em andamento terminar em vez de cancelá-lo no meio
+    async with _persistencia_lock:
+        task.cancel()
+    await flush_persistencia()
+
+atexit.register(flush_persistencia_sync)
+
+# ==========================================
+# AGENDADOR DE SAÍDA (PRIORIDADES)
+# ==========================================
+
+# Toda chamada REST passa por um orçamento global (token bucket, abaixo dos 50/s
+# do Discord). Quando falta orçamento, quem espera é atendido por classe:
+# carrinho antes de notificação, notificação antes de log. Respostas de
+# interação não entram aqui: o Discord não as conta no limite global, então
+# nunca esperam. Logs que esperam demais são descartados.
+PRIORIDADE_INTERACAO = 0
+PRIORIDADE_CARRINHO = 1
+PRIORIDADE_NOTIFICACAO = 2
+PRIORIDADE_LOG = 3
+NOMES_PRIORIDADE = ("interacao", "carrinho", "notificacao", "log")
+
+# O limite do Discord é por bot, não por processo: no cluster o lançador divide
+# VIREX_HTTP_RPS entre os workers e cada um recebe só a sua parte
+SAIDA_POR_SEGUNDO = float(os.getenv("VIREX_HTTP_RPS", "45"))  # 0 desliga o agendador
+SAIDA_ESPERA_MAX_LOG = 30.0  # segundos que um lote de log pode esperar antes de ser descartado
+SAIDA_FILA_MAX_LOG = 100     # lotes de log esperando ao mesmo tempo; acima disso, descarta na hora
+
+_prioridade_saida = contextvars.ContextVar('prioridade_saida', default=PRIORIDADE_NOTIFICACAO)
+
+class SaidaDescartada(Exception):
+    pass
+
+@contextlib.contextmanager
+def prioridade_saida(classe):
+    token = _prioridade_saida.set(classe)
+    try:
+        yield
+    finally:
+        _prioridade_saida.reset(token)
+
+def com_prioridade(classe):
+    # As chamadas REST feitas dentro da corrotina (e das tarefas que ela criar) usam a classe
+    def decorador(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with prioridade_saida(classe):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorador
+
+class AgendadorSaida:
+    def __init__(self, por_segundo):
+        self.taxa = por_segundo
+        self.tokens = por_segundo  # rajada de até 1s de orçamento
+        self.atualizado = time.monotonic()
+        self.espera = []           # heap de (classe, ordem, future)
+        self.ordem = itertools.count()
+        self.acordar = None
+        self.esperando = [0] * len(NOMES_PRIORIDADE)
+        self.atendidas = [0] * len(NOMES_PRIORIDADE)
+        self.descartadas = [0] * len(NOMES_PRIORIDADE)
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.tokens = min(self.taxa, self.tokens + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+
+    async def adquirir(self, classe):
+        self._repor()
+        if not self.espera and self.tokens >= 1:
+            self.tokens -= 1
+            self.atendidas[classe] += 1
+            return
+
+        if classe == PRIORIDADE_LOG and self.esperando[classe] >= SAIDA_FILA_MAX_LOG:
+            self.descartadas[classe] += 1
+            raise SaidaDescartada()
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.espera, (classe, next(self.ordem), future))
+        self.esperando[classe] += 1
+        self._agendar()
+        try:
+            if classe == PRIORIDADE_LOG:
+                await asyncio.wait_for(future, SAIDA_ESPERA_MAX_LOG)
+            else:
+                await future
+        except asyncio.TimeoutError:
+            self.descartadas[classe] += 1
+            raise SaidaDescartada() from None
+        finally:
+            self.esperando[classe] -= 1
+        self.atendidas[classe] += 1
+
+    def _liberar(self):
+        self.acordar = None
+        self._repor()
+        while self.espera and self.tokens >= 1:
+            _, _, future = heapq.heappop(self.espera)
+            if future.done():  # cancelado ou descartado por tempo
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+        self._agendar()
+
+    def _agendar(self):
+        if self.espera and self.acordar is None:
+            atraso = max(0.0, (1 - self.tokens) / self.taxa)
+            self.acordar = asyncio.get_running_loop().call_later(atraso, self._liberar)
+
+_agendador_saida = None
+
+def instalar_agendador_saida():
+    global _agendador_saida
+    if SAIDA_POR_SEGUNDO <= 0 or _agendador_saida is not None:
+        return
+    _agendador_saida = AgendadorSaida(SAIDA_POR_SEGUNDO)
+    requisitar = bot.http.request
+
+    async def request(route, **kwargs):
+        await _agendador_saida.adquirir(_prioridade_saida.get())
+        return await requisitar(route, **kwargs)
+
+    bot.http.request = request
+
+def estatisticas_saida():
+    if _agendador_saida is None:
+        return {}
+    return {
+        nome: {
+            'esperando': _agendador_saida.esperando[classe],
+            'atendidas': _agendador_saida.atendidas[classe],
+            'descartadas': _agendador_saida.descartadas[classe],
+        }
+        for classe, nome in enumerate(NOMES_PRIORIDADE)
+    }
+
+# ==========================================
+# MÉTRICAS (OPCIONAL)
+# ==========================================
+
+# Com VIREX_METRICAS_PORTA definida, o bot mede handlers, chamadas HTTP, filas e
+# gateway e expõe tudo em http://<host>:<porta>/metrics (formato texto do Prometheus).
+# Desligado, medido() devolve a própria função: nenhum custo por evento.
+METRICAS_PORTA = int(os.getenv("VIREX_METRICAS_PORTA", "0"))
+METRICAS_HOST = os.getenv("VIREX_METRICAS_HOST", "127.0.0.1")
+METRICAS_ATIVAS = METRICAS_PORTA > 0
+LOOP_ATRASO_INTERVALO = 0.5  # segundos entre amostras do atraso do event loop
+
+BUCKETS_LATENCIA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histograma:
+    __slots__ = ('contagens', 'soma', 'total')
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS_LATENCIA) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(BUCKETS_LATENCIA, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+_hist_handlers = {}     # handler -> Histograma
+_erros_handlers = {}    # handler -> exceções
+_hist_http = {}         # "MÉTODO /rota/{param}" -> Histograma
+_http_rate_limits = {'bucket': 0, 'global': 0}
+_uso_por_guild = {}     # guild_id -> [handlers executados, segundos gastos]
+_eventos_por_tipo = {}  # tipo de evento do gateway -> contagem
+_hist_loop = Histograma()
+_metricas_runner = None
+_metricas_tasks = []
+
+def _guild_do_evento(args):
+    # Interaction, Message, Member, canais e payloads raw: todos levam à guild
+    if not args:
+        return None
+    primeiro = args[0]
+    if isinstance(primeiro, discord.Guild):
+        return primeiro.id
+    guild = getattr(primeiro, 'guild', None)
+    if guild is not None:
+        return guild.id
+    return getattr(primeiro, 'guild_id', None)
+
+def medido(func, nome=None):
+    if not METRICAS_ATIVAS:
+        return func
+    nome = nome or func.__name__
+    hist = _hist_handlers.setdefault(nome, Histograma())
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            _erros_handlers[nome] = _erros_handlers.get(nome, 0) + 1
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            hist.observar(duracao)
+            guild_id = _guild_do_evento(args)
+            if guild_id is not None:
+                uso = _uso_por_guild.setdefault(guild_id, [0, 0.0])
+                uso[0] += 1
+                uso[1] += duracao
+    return wrapper
+
+class _ContadorRateLimit(logging.Handler):
+    # O discord.py só sinaliza 429 em log: conta os avisos em vez de reimplementar o HTTP
+    def emit(self, record):
+        mensagem = str(record.msg)
+        if mensagem.startswith('We are being rate limited'):
+            _http_rate_limits['bucket'] += 1
+        elif mensagem.startswith('Global rate limit has been hit'):
+            # Vem logo depois do aviso acima, para o mesmo 429 e sem await no
+            # meio: o que já foi contado como bucket passa a contar só como global
+            _http_rate_limits['bucket'] -= 1
+            _http_rate_limits['global'] += 1
+
+def _instrumentar_http():
+    requisitar = bot.http.request
+
+    async def request(route, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await requisitar(route, **kwargs)
+        finally:
+            chave = f"{route.method} {route.path}"
+            hist = _hist_http.get(chave)
+            if hist is None:
+                hist = _hist_http[chave] = Histograma()
+            hist.observar(time.perf_counter() - inicio)
+
+    bot.http.request = request
+    logging.getLogger('discord.http').addHandler(_ContadorRateLimit(logging.WARNING))
+
+def _instrumentar_comandos():
+    for comando in bot.tree.walk_commands():
+        if isinstance(comando, app_commands.Command):
+            comando._callback = medido(comando._callback, f"comando.{comando.qualified_name}")
+
+async def contar_evento_gateway(tipo):
+    _eventos_por_tipo[tipo] = _eventos_por_tipo.get(tipo, 0) + 1
+
+async def _loop_atraso():
+    # Quanto o sleep atrasa é quanto o loop ficou ocupado com outra coisa
+    while True:
+        inicio = time.perf_counter()
+        await asyncio.sleep(LOOP_ATRASO_INTERVALO)
+        _hist_loop.observar(max(0.0, time.perf_counter() - inicio - LOOP_ATRASO_INTERVALO))
+
+def _escapar_rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"')
+
+def _rotulos(**rotulos):
+    return ','.join(f'{chave}="{_escapar_rotulo(valor)}"' for chave, valor in rotulos.items())
+
+def _linhas_histograma(linhas, nome, hist, rotulos=''):
+    separador = ',' if rotulos else ''
+    acumulado = 0
+    for limite, contagem in zip(BUCKETS_LATENCIA, hist.contagens):
+        acumulado += contagem
+        linhas.append(f'{nome}_bucket{{{rotulos}{separador}le="{limite}"}} {acumulado}')
+    linhas.append(f'{nome}_bucket{{{rotulos}{separador}le="+Inf"}} {hist.total}')
+    rotulos = f'{{{rotulos}}}' if rotulos else ''
+    linhas.append(f'{nome}_sum{rotulos} {hist.soma:.6f}')
+    linhas.append(f'{nome}_count{rotulos} {hist.total}')
+
+def _cabecalho(linhas, nome, tipo, ajuda):
+    linhas.append(f"# HELP {nome} {ajuda}")
+    linhas.append(f"# TYPE {nome} {tipo}")
+
+def exportar_metricas():
+    linhas = []
+
+    _cabecalho(linhas, "virex_handler_segundos", "histogram", "Latência dos handlers (eventos, comandos, componentes, /setup)")
+    for nome, hist in sorted(_hist_handlers.items()):
+        _linhas_histograma(linhas, "virex_handler_segundos", hist, _rotulos(handler=nome))
+    _cabecalho(linhas, "virex_handler_erros_total", "counter", "Exceções por handler")
+    for nome, erros in sorted(_erros_handlers.items()):
+        linhas.append(f"virex_handler_erros_total{{{_rotulos(handler=nome)}}} {erros}")
+
+    _cabecalho(linhas, "virex_guild_handlers_total", "counter", "Handlers executados por guild")
+    _cabecalho(linhas, "virex_guild_handler_segundos_total", "counter", "Tempo gasto em handlers por guild")
+    for guild_id, (execucoes, segundos) in _uso_por_guild.items():
+        linhas.append(f"virex_guild_handlers_total{{{_rotulos(guild=guild_id)}}} {execucoes}")
+        linhas.append(f"virex_guild_handler_segundos_total{{{_rotulos(guild=guild_id)}}} {segundos:.6f}")
+
+    _cabecalho(linhas, "virex_http_segundos", "histogram", "Duração das chamadas à API do Discord, incluindo esperas de rate limit")
+    for chave, hist in sorted(_hist_http.items()):
+        metodo, _, rota = chave.partition(' ')
+        _linhas_histograma(linhas, "virex_http_segundos", hist, _rotulos(metodo=metodo, rota=rota))
+    _cabecalho(linhas, "virex_http_rate_limits_total", "counter", "Respostas 429 recebidas")
+    for escopo, total in _http_rate_limits.items():
+        linhas.append(f"virex_http_rate_limits_total{{{_rotulos(escopo=escopo)}}} {total}")
+
+    _cabecalho(linhas, "virex_gateway_latencia_segundos", "gauge", "Latência do heartbeat por shard")
+    _cabecalho(linhas, "virex_gateway_eventos_total", "counter", "Eventos recebidos do gateway por shard")
+    for info in estatisticas_shards():
+        if info['latencia_ms'] is not None:
+            linhas.append(f"virex_gateway_latencia_segundos{{{_rotulos(shard=info['shard'])}}} {info['latencia_ms'] / 1000:.6f}")
+        linhas.append(f"virex_gateway_eventos_total{{{_rotulos(shard=info['shard'])}}} {info['eventos']}")
+    _cabecalho(linhas, "virex_gateway_eventos_tipo_total", "counter", "Eventos recebidos do gateway por tipo")
+    for tipo, total in sorted(_eventos_por_tipo.items()):
+        linhas.append(f"virex_gateway_eventos_tipo_total{{{_rotulos(tipo=tipo)}}} {total}")
+
+    _cabecalho(linhas, "virex_loop_atraso_segundos", "histogram", "Atraso do event loop")
+    _linhas_histograma(linhas, "virex_loop_atraso_segundos", _hist_loop)
+
+    _cabecalho(linhas, "virex_saida_esperando", "gauge", "Chamadas REST aguardando orçamento, por prioridade")
+    _cabecalho(linhas, "virex_saida_atendidas_total", "counter", "Chamadas REST liberadas pelo agendador, por prioridade")
+    _cabecalho(linhas, "virex_saida_descartadas_total", "counter", "Chamadas REST descartadas pelo agendador, por prioridade")
+    for nome, info in estatisticas_saida().items():
+        linhas.append(f"virex_saida_esperando{{{_rotulos(prioridade=nome)}}} {info['esperando']}")
+        linhas.append(f"virex_saida_atendidas_total{{{_rotulos(prioridade=nome)}}} {info['atendidas']}")
+        linhas.append(f"virex_saida_descartadas_total{{{_rotulos(prioridade=nome)}}} {info['descartadas']}")
+
+    filas = estatisticas_logs().values()
+    medidas = (
+        ("virex_fila_logs_pendentes", "gauge", "Embeds de log aguardando envio", sum(f['pendentes'] for f in filas)),
+        ("virex_fila_logs_descartados_total", "counter", "Embeds de log descartados por backpressure", sum(f['descartados'] for f in filas)),
+        ("virex_persistencia_pendentes", "gauge", "Arquivos sujos aguardando o flush", len(_arquivos_sujos)),
+        ("virex_pool_canais", "gauge", "Canais de carrinho prontos no pool", sum(len(pool) for pool in _pool_carrinhos.values())),
+        ("virex_carrinhos_abertos", "gauge", "Carrinhos registrados", len(carrinhos)),
+        ("virex_carrinhos_prazos", "gauge", "Prazos na heap de expiração (inclui entradas antigas)", len(_prazos_carrinhos)),
+        ("virex_render_cache_hits_total", "counter", "Renderizações servidas pelo cache (painéis, carrinhos, listas)", estatisticas_render()['hits']),
+        ("virex_render_cache_misses_total", "counter", "Renderizações reconstruídas (item novo ou alterado)", estatisticas_render()['misses']),
+        ("virex_render_cache_entradas", "gauge", "Entradas no cache de renderização", estatisticas_render()['entradas']),
+        ("virex_voz_sessoes_ativas", "gauge", "Sessões de voz abertas", len(_sessoes_voz)),
+        ("virex_voz_segundos_total", "counter", "Tempo em call somado das sessões encerradas", f"{sum(e['segundos'] for e in _estatisticas_voz.values()):.0f}"),
+        ("virex_conteudo_mensagens", "gauge", "Mensagens no armazém de conteúdo", sum(a['mensagens'] for a in estatisticas_conteudo().values())),
+        ("virex_conteudo_bytes", "gauge", "Bytes estimados do armazém de conteúdo", sum(a['bytes'] for a in estatisticas_conteudo().values())),
+        ("virex_loop_tarefas", "gauge", "Tarefas asyncio vivas", len(asyncio.all_tasks())),
+    )
+    for nome, tipo, ajuda, valor in medidas:
+        _cabecalho(linhas, nome, tipo, ajuda)
+        linhas.append(f"{nome} {valor}")
+
+    return '\n'.join(linhas) + '\n'
+
+async def iniciar_metricas():
+    global _metricas_runner
+    if not METRICAS_ATIVAS or _metricas_runner is not None:
+        return
+    from aiohttp import web
+
+    async def metricas_handler(request):
+        return web.Response(text=exportar_metricas(), content_type='text/plain', charset='utf-8')
+
+    _instrumentar_http()
+    _instrumentar_comandos()
+    bot.add_listener(contar_evento_gateway, 'on_socket_event_type')
+    _metricas_tasks.append(asyncio.create_task(_loop_atraso()))
+
+    app = web.Application()
+    app.router.add_get('/metrics', metricas_handler)
+    _metricas_runner = web.AppRunner(app, access_log=None)
+    await _metricas_runner.setup()
+    await web.TCPSite(_metricas_runner, METRICAS_HOST, METRICAS_PORTA).start()
+    print(f"📈 Métricas em http://{METRICAS_HOST}:{METRICAS_PORTA}/metrics")
+
+async def parar_metricas():
+    global _metricas_runner
+    for task in _metricas_tasks:
+        task.cancel()
+    _metricas_tasks.clear()
+    if _metricas_runner is not None:
+        await _metricas_runner.cleanup()
+        _metricas_runner = None
 
 # ==========================================
 # FUNÇÕES DE CONFIGURAÇÃO - LOGS
@@ -37,282 +612,1486 @@ def load_logs_config():
         return json.load(f)
 
 def save_logs_config(data):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    # Raro (só /setuplogs): grava na hora, mas de forma atômica
+    escrever_arquivo_atomico(CONFIG_FILE, json.dumps(data, indent=4))
 
-def get_log_channel(guild_id, log_type):
+# Tabela de roteamento em memória: guild_id -> tipo de log -> canal
+# Evita reler e parsear o logs_config.json a cada evento do gateway
+LOGS_CONFIG_CHECK_INTERVAL = 5  # segundos entre verificações do arquivo em disco
+
+_logs_rotas = {}      # guild_id -> {tipo: channel_id}
+_logs_canais = {}     # guild_id -> {tipo: canal já resolvido}
+_logs_mtime = None
+_logs_ultima_verificacao = 0.0
+
+def _mtime_logs_config():
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def recarregar_rotas_logs():
+    global _logs_mtime
+    _logs_mtime = _mtime_logs_config()
     data = load_logs_config()
-    guild_data = data.get(str(guild_id), {})
-    channel_id = guild_data.get(log_type)
-    if channel_id:
-        return bot.get_channel(channel_id)
-    return None
+    _logs_rotas.clear()
+    _logs_canais.clear()
+    for guild_id, tipos in data.items():
+        _logs_rotas[int(guild_id)] = dict(tipos)
+
+def _verificar_logs_config():
+    # Invalida o cache se o arquivo foi alterado fora do bot (no máximo um stat por intervalo)
+    global _logs_ultima_verificacao
+    agora = time.monotonic()
+    if agora - _logs_ultima_verificacao < LOGS_CONFIG_CHECK_INTERVAL:
+        return
+    _logs_ultima_verificacao = agora
+    if _mtime_logs_config() != _logs_mtime:
+        recarregar_rotas_logs()
+
+def set_log_channel(guild_id, log_type, canal):
+    global _logs_mtime
+    # Relê o arquivo antes de gravar: em cluster, outro processo pode ter alterado outra guild
+    recarregar_rotas_logs()
+    _logs_rotas.setdefault(guild_id, {})[log_type] = canal.id
+    _logs_canais.setdefault(guild_id, {})[log_type] = canal
+    save_logs_config({str(gid): tipos for gid, tipos in _logs_rotas.items()})
+    _logs_mtime = _mtime_logs_config()
+
+def esquecer_canal_log(channel_id):
+    # Remove um canal apagado do cache (a rota em disco continua e volta a resolver se o ID existir)
+    for canais in _logs_canais.values():
+        for tipo, canal in list(canais.items()):
+            if canal.id == channel_id:
+                del canais[tipo]
+
+def get_log_channel(guild_id, log_type):
+    _verificar_logs_config()
+    canal = _logs_canais.get(guild_id, {}).get(log_type)
+    if canal is not None:
+        return canal
+    channel_id = _logs_rotas.get(guild_id, {}).get(log_type)
+    if not channel_id:
+        return None
+    canal = bot.get_channel(channel_id)
+    if canal is not None:
+        _logs_canais.setdefault(guild_id, {})[log_type] = canal
+    return canal
+
+recarregar_rotas_logs()
 
 def now():
     return datetime.now(TIMEZONE)
 
 # ==========================================
-# FUNÇÕES DE CONFIGURAÇÃO - VENDAS
+# ARMAZENAMENTO SQLITE (OPCIONAL)
 # ==========================================
 
-def load_vendas_config():
-    if os.path.exists(VENDAS_CONFIG_FILE):
-        with open(VENDAS_CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {
-        'categoria_id': None,
-        'pix_info': 'Configure seu PIX com o comando /setup',
-        'contador_carrinhos': {},
-        'bot_voz_channel': None
-    }
+# Cada produto, painel drop, opção e contador é uma linha indexada:
+# uma alteração custa uma escrita de linha, não a regravação do catálogo inteiro.
+# Todo acesso em tempo de execução passa por um executor de thread única.
 
-def save_vendas_config(config):
-    with open(VENDAS_CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
+SCHEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS produtos (
+    id TEXT PRIMARY KEY,
+    titulo TEXT NOT NULL,
+    descricao TEXT,
+    preco TEXT,
+    imagem_url TEXT,
+    tipo_imagem TEXT,
+    criado_em TEXT
+);
+CREATE TABLE IF NOT EXISTS drops (
+    id TEXT PRIMARY KEY,
+    titulo_painel TEXT NOT NULL,
+    descricao_painel TEXT,
+    emoji_painel TEXT,
+    imagem_url TEXT,
+    tipo_imagem TEXT,
+    criado_em TEXT
+);
+CREATE TABLE IF NOT EXISTS drop_opcoes (
+    drop_id TEXT NOT NULL REFERENCES drops(id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    nome TEXT NOT NULL,
+    descricao TEXT,
+    preco TEXT,
+    emoji TEXT,
+    PRIMARY KEY (drop_id, posicao)
+);
+CREATE TABLE IF NOT EXISTS contadores (
+    guild_id TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS carrinhos (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    produto_id TEXT,
+    comprador_id INTEGER NOT NULL,
+    preco TEXT,
+    criado_em TEXT,
+    status TEXT NOT NULL,
+    tipo TEXT NOT NULL DEFAULT 'canal',
+    expira_em REAL,
+    avisado INTEGER NOT NULL DEFAULT 0,
+    valor_centavos INTEGER
+);
+CREATE TABLE IF NOT EXISTS vendas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    evento TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER,
+    produto_id TEXT,
+    comprador_id INTEGER,
+    valor_centavos INTEGER
+);
+CREATE TABLE IF NOT EXISTS vendas_resumo (
+    guild_id INTEGER NOT NULL,
+    dimensao TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    abertos INTEGER NOT NULL DEFAULT 0,
+    aprovados INTEGER NOT NULL DEFAULT 0,
+    expirados INTEGER NOT NULL DEFAULT 0,
+    receita_centavos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, dimensao, chave)
+);
+CREATE INDEX IF NOT EXISTS idx_carrinhos_guild ON carrinhos (guild_id, status);
+"""
 
-def load_produtos():
-    if os.path.exists(PRODUTOS_FILE):
-        with open(PRODUTOS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+CAMPOS_PRODUTO = ('titulo', 'descricao', 'preco', 'imagem_url', 'tipo_imagem', 'criado_em')
+CAMPOS_DROP = ('titulo_painel', 'descricao_painel', 'emoji_painel', 'imagem_url', 'tipo_imagem', 'criado_em')
+CAMPOS_OPCAO = ('nome', 'descricao', 'preco', 'emoji')
+CAMPOS_CARRINHO = ('guild_id', 'produto_id', 'comprador_id', 'preco', 'criado_em', 'status', 'tipo', 'expira_em', 'avisado', 'valor_centavos')
+CAMPOS_VENDA = ('ts', 'evento', 'guild_id', 'channel_id', 'produto_id', 'comprador_id', 'valor_centavos')
+COLUNAS_RESUMO = ('abertos', 'aprovados', 'expirados', 'receita_centavos')
 
-def save_produtos(produtos):
-    with open(PRODUTOS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(produtos, f, indent=4, ensure_ascii=False)
+# Colunas criadas depois da primeira versão do schema: (tabela, coluna, definição)
+COLUNAS_ADICIONADAS = (
+    ('carrinhos', 'expira_em', 'REAL'),
+    ('carrinhos', 'avisado', 'INTEGER NOT NULL DEFAULT 0'),
+    ('carrinhos', 'valor_centavos', 'INTEGER'),
+)
 
-def load_produtos_drop():
-    if os.path.exists(PRODUTOS_DROP_FILE):
-        with open(PRODUTOS_DROP_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+_db = None
+_db_executor = None
 
-def save_produtos_drop(produtos_drop):
-    with open(PRODUTOS_DROP_FILE, 'w', encoding='utf-8') as f:
-        json.dump(produtos_drop, f, indent=4, ensure_ascii=False)
+def usando_sqlite():
+    return STORAGE_BACKEND == "sqlite"
 
-vendas_config = load_vendas_config()
-produtos = load_produtos()
-produtos_drop = load_produtos_drop()
+def conectar_db():
+    global _db, _db_executor
+    if _db is None:
+        _db = sqlite3.connect(SQLITE_FILE, check_same_thread=False, isolation_level=None)
+        _db.row_factory = sqlite3.Row
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("PRAGMA synchronous=NORMAL")
+        _db.execute("PRAGMA foreign_keys=ON")
+        _db.executescript(SCHEMA_SQLITE)
+        _db_migrar(_db)
+        _db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="virex-sqlite")
+    return _db
 
-# ==========================================
-# EVENTO ON_READY
-# ==========================================
+def _db_migrar(db):
+    for tabela, coluna, definicao in COLUNAS_ADICIONADAS:
+        if coluna not in {row['name'] for row in db.execute(f"PRAGMA table_info({tabela})")}:
+            db.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
 
-@bot.event
-async def on_ready():
-    await bot.tree.sync()
-    print(f"╔══════════════════════════════════════╗")
-    print(f"║   🤖 VIREX STORE BOT ONLINE!        ║")
-    print(f"║   Bot: {bot.user.name:<25} ║")
-    print(f"║   ID: {bot.user.id:<26} ║")
-    print(f"╚══════════════════════════════════════╝")
-    
-    await bot.change_presence(
-        activity=discord.Activity(
-            type=discord.ActivityType.watching,
-            name="vendas | /ajudavirexstore"
-        )
-    )
+def fechar_db():
+    global _db, _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+        _db_executor = None
+    if _db is not None:
+        _db.close()
+        _db = None
 
-# ==========================================
-# COMANDO: /AJUDAVIREXSTORE
-# ==========================================
+async def executar_db(func, *args):
+    db = conectar_db()
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, func, db, *args)
 
-@bot.tree.command(name="ajudavirexstore", description="📋 Ver todos os comandos disponíveis do VIREX STORE")
-async def ajudavirexstore(interaction: discord.Interaction):
-    embed = discord.Embed(
-        title="📋 VIREX STORE - Comandos Disponíveis",
-        description="Sistema completo de vendas e logs para Discord",
-        color=discord.Color.blue()
-    )
-    
-    # Comandos de Vendas
-    embed.add_field(
-        name="💰 **SISTEMA DE VENDAS**",
-        value=(
-            "`/setup` - Painel principal de configuração\n"
-            "`/enviarproduto` - Enviar painel de produto\n"
-            "`/enviardrop` - Enviar painel dropdown"
-        ),
-        inline=False
+def _db_carregar_produtos(db):
+    return {
+        row['id']: {campo: row[campo] for campo in CAMPOS_PRODUTO}
+        for row in db.execute("SELECT * FROM produtos ORDER BY rowid")
+    }
+
+def _db_carregar_produtos_drop(db):
+    drops = {}
+    for row in db.execute("SELECT * FROM drops ORDER BY rowid"):
+        drops[row['id']] = {campo: row[campo] for campo in CAMPOS_DROP}
+        drops[row['id']]['opcoes'] = []
+    for row in db.execute("SELECT * FROM drop_opcoes ORDER BY drop_id, posicao"):
+        if row['drop_id'] in drops:
+            drops[row['drop_id']]['opcoes'].append({campo: row[campo] for campo in CAMPOS_OPCAO})
+    return drops
+
+def _db_salvar_produto(db, prod_id, produto):
+    db.execute(
+        f"INSERT OR REPLACE INTO produtos (id, {', '.join(CAMPOS_PRODUTO)}) VALUES (?{', ?' * len(CAMPOS_PRODUTO)})",
+        (prod_id, *(produto.get(campo) for campo in CAMPOS_PRODUTO))
     )
-    
-    # Comandos de Logs
-    embed.add_field(
-        name="📊 **SISTEMA DE LOGS**",
-        value=(
-            "`/setuplogs` - Configurar canais de logs\n"
-            "• Entradas, Saídas, Mensagens\n"
-            "• Edições, Deleções, Bans\n"
-            "• Cargos, Canais, Voz"
-        ),
-        inline=False
+    _db_marcar_catalogo(db)
+
+def _db_salvar_produto_drop(db, drop_id, drop):
+    with db:
+        db.execute("BEGIN")
+        db.execute(
+            f"INSERT OR REPLACE INTO drops (id, {', '.join(CAMPOS_DROP)}) VALUES (?{', ?' * len(CAMPOS_DROP)})",
+            (drop_id, *(drop.get(campo) for campo in CAMPOS_DROP))
+        )
+        db.execute("DELETE FROM drop_opcoes WHERE drop_id = ?", (drop_id,))
+        db.executemany(
+            f"INSERT INTO drop_opcoes (drop_id, posicao, {', '.join(CAMPOS_OPCAO)}) VALUES (?, ?{', ?' * len(CAMPOS_OPCAO)})",
+            [(drop_id, i, *(opcao.get(campo) for campo in CAMPOS_OPCAO)) for i, opcao in enumerate(drop['opcoes'])]
+        )
+        _db_marcar_catalogo(db)
+
+def _db_carregar_carrinhos(db):
+    return {
+        row['channel_id']: {campo: row[campo] for campo in CAMPOS_CARRINHO}
+        for row in db.execute("SELECT * FROM carrinhos")
+    }
+
+def _db_salvar_carrinho(db, channel_id, registro):
+    db.execute(
+        f"INSERT OR REPLACE INTO carrinhos (channel_id, {', '.join(CAMPOS_CARRINHO)}) VALUES (?{', ?' * len(CAMPOS_CARRINHO)})",
+        (channel_id, *(registro.get(campo) for campo in CAMPOS_CARRINHO))
     )
-    
-    # Comandos de Utilidades
-    embed.add_field(
-        name="🛠️ **UTILIDADES**",
-        value=(
-            "`/botvoz` - Bot entra em canal de voz\n"
-            "`/banfake` - Simula um ban (brincadeira)"
-        ),
-        inline=False
+
+def _db_remover_carrinho(db, channel_id):
+    db.execute("DELETE FROM carrinhos WHERE channel_id = ?", (channel_id,))
+
+def _db_registrar_venda(db, linha, chaves, deltas):
+    # Linha do livro e totais na mesma transação
+    with db:
+        db.execute("BEGIN")
+        _db_inserir_venda(db, linha, chaves, deltas)
+
+def _db_inserir_venda(db, linha, chaves, deltas):
+    db.execute(
+        f"INSERT INTO vendas ({', '.join(CAMPOS_VENDA)}) VALUES (?{', ?' * (len(CAMPOS_VENDA) - 1)})",
+        tuple(linha[campo] for campo in CAMPOS_VENDA)
     )
-    
-    embed.add_field(
-        name="👑 **PERMISSÕES**",
-        value="Comandos de configuração requerem:\n• Dono do Servidor\n• Administrador",
-        inline=False
+    if deltas is None:
+        return
+    db.executemany(
+        f"INSERT INTO vendas_resumo (guild_id, dimensao, chave, {', '.join(COLUNAS_RESUMO)}) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        f"ON CONFLICT(guild_id, dimensao, chave) DO UPDATE SET "
+        + ", ".join(f"{coluna} = {coluna} + excluded.{coluna}" for coluna in COLUNAS_RESUMO),
+        [(linha['guild_id'], dimensao, chave, *deltas) for dimensao, chave in chaves]
     )
-    
-    embed.set_footer(
-        text=f"Solicitado por: {interaction.user.name} | VIREX STORE",
-        icon_url=interaction.user.display_avatar.url
+
+def _db_resumo_vendas(db, guild_id, dia_inicial):
+    return {
+        (row['dimensao'], row['chave']): [row[coluna] for coluna in COLUNAS_RESUMO]
+        for row in db.execute(
+            "SELECT * FROM vendas_resumo WHERE guild_id = ? AND (dimensao != 'dia' OR chave >= ?)",
+            (guild_id, dia_inicial)
+        )
+    }
+
+def _db_proximo_contador(db, guild_id):
+    # Incremento atômico: devolve o valor anterior, como o contador em JSON fazia
+    row = db.execute(
+        "INSERT INTO contadores (guild_id, valor) VALUES (?, 1) "
+        "ON CONFLICT(guild_id) DO UPDATE SET valor = valor + 1 "
+        "RETURNING valor - 1",
+        (str(guild_id),)
+    ).fetchone()
+    return row[0]
+
+# Chaves de catálogo na tabela de contadores (ao lado dos contadores por guild):
+# a versão do catálogo avisa os outros processos do cluster que algo mudou, e
+# os IDs novos são reservados atomicamente para dois processos não criarem o mesmo
+CHAVE_VERSAO_CATALOGO = "catalogo:versao"
+
+def _db_marcar_catalogo(db):
+    db.execute(
+        "INSERT INTO contadores (guild_id, valor) VALUES (?, 1) "
+        "ON CONFLICT(guild_id) DO UPDATE SET valor = valor + 1",
+        (CHAVE_VERSAO_CATALOGO,)
     )
-    
-    embed.set_thumbnail(url=bot.user.display_avatar.url)
-    
-    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-# ==========================================
-# COMANDO: /SETUPLOGS
-# ==========================================
+def _db_versao_catalogo(db):
+    row = db.execute("SELECT valor FROM contadores WHERE guild_id = ?", (CHAVE_VERSAO_CATALOGO,)).fetchone()
+    return row[0] if row else 0
 
-@bot.tree.command(name="setuplogs", description="⚙️ Configurar canal de logs")
-@app_commands.describe(
-    tipo="Tipo de log",
-    canal="Canal para enviar os logs"
-)
-@app_commands.choices(tipo=[
-    app_commands.Choice(name="📥 Entradas", value="join"),
-    app_commands.Choice(name="📤 Saídas", value="leave"),
-    app_commands.Choice(name="💬 Mensagens", value="message"),
-    app_commands.Choice(name="✏️ Edição", value="edit"),
-    app_commands.Choice(name="🗑️ Delete", value="delete"),
-    app_commands.Choice(name="🔨 Ban", value="ban"),
-    app_commands.Choice(name="🎭 Cargos", value="role"),
-    app_commands.Choice(name="📁 Canais", value="channel"),
-    app_commands.Choice(name="🔊 Voz", value="voice"),
-])
-async def setuplogs(interaction: discord.Interaction, tipo: app_commands.Choice[str], canal: discord.TextChannel):
-    if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
-        return
+def _db_carregar_catalogo(db):
+    return _db_versao_catalogo(db), _db_carregar_produtos(db), _db_carregar_produtos_drop(db)
 
-    data = load_logs_config()
-    guild_id = str(interaction.guild.id)
+def _db_proximo_id_catalogo(db, chave, minimo):
+    # Nunca abaixo do tamanho atual do catálogo (IDs antigos eram "tamanho + 1")
+    row = db.execute(
+        "INSERT INTO contadores (guild_id, valor) VALUES (?, ?) "
+        "ON CONFLICT(guild_id) DO UPDATE SET valor = max(valor, excluded.valor - 1) + 1 "
+        "RETURNING valor",
+        (chave, minimo + 1)
+    ).fetchone()
+    return row[0]
 
-    if guild_id not in data:
-        data[guild_id] = {}
+def migrar_json_para_sqlite():
+    # Migração única: importa os JSON atuais para o banco (pode ser repetida sem duplicar)
+    db = conectar_db()
+    produtos_json = load_json_file(PRODUTOS_FILE, {})
+    drops_json = load_json_file(PRODUTOS_DROP_FILE, {})
+    contadores = contadores_json()
+    carrinhos_json = load_json_file(CARRINHOS_FILE, {})
 
-    data[guild_id][tipo.value] = canal.id
-    save_logs_config(data)
+    for prod_id, produto in produtos_json.items():
+        _db_salvar_produto(db, prod_id, produto)
+    for drop_id, drop in drops_json.items():
+        _db_salvar_produto_drop(db, drop_id, drop)
+    for guild_id, valor in contadores.items():
+        db.execute(
+            "INSERT INTO contadores (guild_id, valor) VALUES (?, ?) "
+            "ON CONFLICT(guild_id) DO UPDATE SET valor = MAX(valor, excluded.valor)",
+            (str(guild_id), int(valor))
+        )
+    for channel_id, registro in carrinhos_json.items():
+        _db_salvar_carrinho(db, int(channel_id), registro)
 
-    await interaction.response.send_message(
-        f"✅ Log **{tipo.name}** configurado em {canal.mention}",
-        ephemeral=True
-    )
+    # O livro só é importado em um banco ainda sem vendas (não duplica)
+    vendas_importadas = 0
+    if os.path.exists(VENDAS_LIVRO_FILE) and db.execute("SELECT 1 FROM vendas LIMIT 1").fetchone() is None:
+        with db:
+            db.execute("BEGIN")
+            for linha in ler_livro_vendas(0)[0]:
+                _db_inserir_venda(db, linha, chaves_resumo(linha), deltas_venda(linha['evento'], linha['valor_centavos']))
+                vendas_importadas += 1
+
+    print(f"✅ Migração concluída: {len(produtos_json)} produtos, {len(drops_json)} drops, "
+          f"{len(contadores)} contadores, "
+          f"{len(carrinhos_json)} carrinhos, {vendas_importadas} registros de vendas → {SQLITE_FILE}")
 
 # ==========================================
-# COMANDO: /BOTVOZ
+# FUNÇÕES DE CONFIGURAÇÃO - VENDAS
 # ==========================================
 
-@bot.tree.command(name="botvoz", description="🔊 Bot entra em um canal de voz (mutado e sem ouvir)")
-@app_commands.describe(
-    canal="Canal de voz onde o bot entrará",
-    imagem="URL da imagem para o bot mostrar (opcional)"
-)
-async def botvoz(interaction: discord.Interaction, canal: discord.VoiceChannel, imagem: str = None):
-    if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
+def load_json_file(caminho, padrao):
+    if os.path.exists(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return padrao
+
+# Config de vendas por guild: um arquivo por guild em configs/, carregado
+# sob demanda e mantido num cache LRU (guilds inativas saem da memória)
+GUILD_CONFIG_CACHE_MAX = int(os.getenv("GUILD_CONFIG_CACHE_MAX", "256"))
+PIX_PADRAO = 'Configure seu PIX com o comando /setup'
+
+os.makedirs(GUILD_CONFIG_DIR, exist_ok=True)
+
+_vendas_config_legado = load_json_file(VENDAS_CONFIG_FILE, {})
+_guild_configs = OrderedDict()  # guild_id -> config (mais recente no fim)
+
+def config_padrao():
+    return {
+        'categoria_id': None,
+        'pix_info': PIX_PADRAO,
+        'contador_carrinhos': 0,
+        'bot_voz_channel': None,
+        'modo_carrinho': CARRINHO_MODO_CANAL,
+        'canal_vendas_id': None,
+        'notificadores': {'cargo': None, 'membros': []},
+        'raid_limite': None,  # None = RAID_LIMITE_PADRAO; 0 = nunca agregar
+        'carrinho_expira_horas': None,  # None = CARRINHO_EXPIRA_HORAS; 0 = nunca expira
+        'canal_arquivo_id': None  # transcrições dos carrinhos fechados
+    }
+
+def _caminho_guild_config(guild_id):
+    return os.path.join(GUILD_CONFIG_DIR, f"{guild_id}.json")
+
+def _config_legada(guild_id):
+    # O config.json antigo era global: contadores e notificadores já eram por guild,
+    # os demais campos só são herdados pela guild dona da categoria antiga
+    legado = _vendas_config_legado
+    chave = str(guild_id)
+    config = {'contador_carrinhos': legado.get('contador_carrinhos', {}).get(chave, 0)}
+    if chave in legado.get('notificadores', {}):
+        config['notificadores'] = legado['notificadores'][chave]
+
+    categoria = bot.get_channel(legado.get('categoria_id') or 0)
+    if categoria is not None:
+        dona = categoria.guild.id == guild_id
+    else:
+        dona = chave in legado.get('contador_carrinhos', {})
+
+    if dona:
+        config.update({
+            campo: legado[campo]
+            for campo in ('categoria_id', 'pix_info', 'bot_voz_channel', 'modo_carrinho', 'canal_vendas_id')
+            if campo in legado
+        })
+    return config
+
+def load_guild_config(guild_id):
+    caminho = _caminho_guild_config(guild_id)
+    config = config_padrao()
+
+    if caminho in _arquivos_sujos:
+        # Ainda não está no disco (aguardando ou no meio do flush): a versão
+        # em memória é a mais nova
+        return _arquivos_sujos[caminho]()
+    if os.path.exists(caminho):
+        config.update(load_json_file(caminho, {}))
+    else:
+        config.update(_config_legada(guild_id))
+    return config
+
+def save_guild_config(guild_id, config):
+    _lembrar_categoria(guild_id, config)
+    marcar_sujo(_caminho_guild_config(guild_id), lambda: config)
+
+def config_da_guild(guild_id):
+    config = _guild_configs.get(guild_id)
+    if config is None:
+        config = _guild_configs[guild_id] = load_guild_config(guild_id)
+        _lembrar_categoria(guild_id, config)
+        if len(_guild_configs) > GUILD_CONFIG_CACHE_MAX:
+            _despejar_configs(guild_id)
+    else:
+        _guild_configs.move_to_end(guild_id)
+    return config
+
+def _despejar_configs(guild_id):
+    # Remove as menos usadas, mas nunca uma config que ainda não chegou ao disco:
+    # recarregada do arquivo, voltaria à versão antiga (contador repetido, PIX perdido).
+    # Se todas estiverem sujas o cache passa do limite até o próximo flush.
+    for antiga_id in list(_guild_configs):
+        if len(_guild_configs) <= GUILD_CONFIG_CACHE_MAX:
+            break
+        if antiga_id != guild_id and _caminho_guild_config(antiga_id) not in _arquivos_sujos:
+            del _guild_configs[antiga_id]
+
+def salvar_config_da_guild(guild_id):
+    save_guild_config(guild_id, config_da_guild(guild_id))
+
+# guild_id -> (categoria_id, modo_carrinho) de toda guild com categoria de carrinhos,
+# inclusive as que saíram do cache LRU: é daqui que o pool de canais sai
+_categorias_carrinho = {}
+
+def _lembrar_categoria(guild_id, config):
+    if config.get('categoria_id'):
+        _categorias_carrinho[guild_id] = (config['categoria_id'], config.get('modo_carrinho', CARRINHO_MODO_CANAL))
+    else:
+        _categorias_carrinho.pop(guild_id, None)
+
+def _ler_categorias_salvas(guild_ids):
+    # Roda no executor: lê só os arquivos das guilds deste processo
+    categorias = {}
+    for guild_id in guild_ids:
+        caminho = _caminho_guild_config(guild_id)
+        if os.path.exists(caminho):
+            categorias[guild_id] = load_json_file(caminho, {})
+    return categorias
+
+async def carregar_categorias_carrinho():
+    # No início, antes de qualquer compra: sem isso o pool só aqueceria depois
+    # que cada guild passasse pelo caminho frio uma vez
+    salvas = await asyncio.get_running_loop().run_in_executor(
+        None, _ler_categorias_salvas, [guild.id for guild in bot.guilds]
+    )
+    for guild_id, config in salvas.items():
+        if _caminho_guild_config(guild_id) not in _arquivos_sujos:
+            _lembrar_categoria(guild_id, config)
+    categoria_legada = bot.get_channel(_vendas_config_legado.get('categoria_id') or 0)
+    if categoria_legada is not None and categoria_legada.guild.id not in salvas:
+        _lembrar_categoria(categoria_legada.guild.id, config_da_guild(categoria_legada.guild.id))
+
+def contadores_json():
+    # Contadores de carrinho de todas as guilds (legado + arquivos por guild)
+    contadores = {
+        str(guild_id): int(valor)
+        for guild_id, valor in _vendas_config_legado.get('contador_carrinhos', {}).items()
+    }
+    for nome in os.listdir(GUILD_CONFIG_DIR):
+        if nome.endswith('.json'):
+            guild_id = nome[:-len('.json')]
+            valor = load_json_file(os.path.join(GUILD_CONFIG_DIR, nome), {}).get('contador_carrinhos', 0)
+            contadores[guild_id] = max(contadores.get(guild_id, 0), int(valor))
+    return contadores
+
+def load_produtos():
+    if usando_sqlite():
+        return _db_carregar_produtos(conectar_db())
+    return load_json_file(PRODUTOS_FILE, {})
+
+def save_produtos(produtos):
+    marcar_sujo(PRODUTOS_FILE, lambda: produtos)
+
+def load_produtos_drop():
+    if usando_sqlite():
+        return _db_carregar_produtos_drop(conectar_db())
+    return load_json_file(PRODUTOS_DROP_FILE, {})
+
+def save_produtos_drop(produtos_drop):
+    marcar_sujo(PRODUTOS_DROP_FILE, lambda: produtos_drop)
+
+async def salvar_produto(prod_id):
+    # Grava só a linha alterada no SQLite; no JSON marca o arquivo como sujo
+    invalidar_render(prod_id, LISTA_PRODUTOS)
+    indexar_item(LISTA_PRODUTOS, prod_id)
+    if usando_sqlite():
+        await executar_db(_db_salvar_produto, prod_id, produtos[prod_id])
+    else:
+        save_produtos(produtos)
+
+async def salvar_produto_drop(drop_id):
+    invalidar_render(drop_id, LISTA_DROPS)
+    indexar_item(LISTA_DROPS, drop_id)
+    if usando_sqlite():
+        await executar_db(_db_salvar_produto_drop, drop_id, produtos_drop[drop_id])
+    else:
+        save_produtos_drop(produtos_drop)
+
+async def novo_id_catalogo(prefixo, catalogo):
+    if usando_sqlite():
+        numero = await executar_db(_db_proximo_id_catalogo, f"catalogo:{prefixo}", len(catalogo))
+    else:
+        numero = len(catalogo) + 1
+    return f"{prefixo}_{numero}"
+
+async def proximo_numero_carrinho(guild_id):
+    if usando_sqlite():
+        return await executar_db(_db_proximo_contador, guild_id)
+
+    config = config_da_guild(guild_id)
+    numero = config['contador_carrinhos']
+    config['contador_carrinhos'] = numero + 1
+    save_guild_config(guild_id, config)
+    return numero
+
+produtos = load_produtos()
+produtos_drop = load_produtos_drop()
+
+# ==========================================
+# REGISTRO DE CARRINHOS
+# ==========================================
+
+# channel_id -> registro do carrinho (produto, comprador, preço, criação, status).
+# Persistido e recarregado no início: é a fonte de verdade sobre quais canais são carrinhos.
+CARRINHO_ABERTO = "aberto"
+CARRINHO_APROVADO = "aprovado"
+CARRINHO_FECHANDO = "fechando"
+
+CARRINHO_MODO_CANAL = "canal"
+CARRINHO_MODO_THREAD = "thread"
+
+def load_carrinhos():
+    if usando_sqlite():
+        return _db_carregar_carrinhos(conectar_db())
+    return {int(channel_id): registro for channel_id, registro in load_json_file(CARRINHOS_FILE, {}).items()}
+
+def save_carrinhos(carrinhos):
+    marcar_sujo(CARRINHOS_FILE, lambda: {str(channel_id): registro for channel_id, registro in carrinhos.items()})
+
+carrinhos = load_carrinhos()
+
+def carrinho_do_canal(channel_id):
+    return carrinhos.get(channel_id)
+
+async def _persistir_carrinho(channel_id):
+    if usando_sqlite():
+        if channel_id in carrinhos:
+            await executar_db(_db_salvar_carrinho, channel_id, carrinhos[channel_id])
+        else:
+            await executar_db(_db_remover_carrinho, channel_id)
+    else:
+        save_carrinhos(carrinhos)
+
+async def registrar_carrinho(canal, user, prod_id, produto):
+    carrinhos[canal.id] = {
+        'guild_id': canal.guild.id,
+        'produto_id': prod_id,
+        'comprador_id': user.id,
+        'preco': produto['preco'],
+        'criado_em': datetime.now().isoformat(),
+        'status': CARRINHO_ABERTO,
+        'tipo': CARRINHO_MODO_THREAD if isinstance(canal, discord.Thread) else CARRINHO_MODO_CANAL,
+        'expira_em': prazo_inatividade(canal.guild.id),
+        'avisado': False,
+        'valor_centavos': preco_em_centavos(produto['preco'])
+    }
+    await _persistir_carrinho(canal.id)
+    agendar_carrinho(canal.id)
+    await registrar_venda(VENDA_ABERTA, canal.id, carrinhos[canal.id])
+    return carrinhos[canal.id]
+
+async def atualizar_carrinho(channel_id, **campos):
+    if channel_id not in carrinhos:
+        return None
+    carrinhos[channel_id].update(campos)
+    await _persistir_carrinho(channel_id)
+    return carrinhos[channel_id]
+
+async def remover_carrinho(channel_id):
+    if carrinhos.pop(channel_id, None) is not None:
+        await _persistir_carrinho(channel_id)
+
+async def reconciliar_carrinhos():
+    # Remove registros de canais apagados enquanto o bot estava offline
+    # (threads arquivadas saem do cache, então só canais são verificados aqui)
+    for channel_id, registro in list(carrinhos.items()):
+        if registro.get('tipo') == CARRINHO_MODO_THREAD:
+            continue
+        guild = bot.get_guild(registro['guild_id'])
+        if guild is not None and guild.get_channel(channel_id) is None:
+            await remover_carrinho(channel_id)
+
+# ==========================================
+# LIVRO DE VENDAS
+# ==========================================
+
+# Abertura, aprovação e fechamento de cada carrinho viram uma linha só
+# acrescentada (vendas.jsonl, ou a tabela vendas no SQLite). Os totais por
+# guild, produto e dia são somados junto com cada linha, então o /relatorio
+# nunca relê o histórico. No JSON os totais vão para vendas_resumo.json com a
+# posição do livro já somada; no início só o trecho depois dela é relido.
+VENDA_ABERTA = "aberto"
+VENDA_APROVADA = "aprovado"
+VENDA_FECHADA = "fechado"
+VENDA_EXPIRADA = "expirado"
+
+_livro_vendas = None   # arquivo do livro aberto para acréscimo (modo JSON)
+_resumo_vendas = {}    # guild_id -> {(dimensão, chave): [abertos, aprovados, expirados, receita]}
+_posicao_livro = 0     # bytes do livro já somados em _resumo_vendas
+
+def preco_em_centavos(preco):
+    # "29.90", "R$ 29,90", "1.299,90", "1,299.90", "30" -> centavos (None se ilegível)
+    texto = re.sub(r"[^\d,.]", "", str(preco or ""))
+    if not re.search(r"\d", texto):
+        return None
+    separadores = [i for i, c in enumerate(texto) if c in ",."]
+    if separadores:
+        ultimo = separadores[-1]
+        decimais = texto[ultimo + 1:]
+        # Um único separador seguido de 3 dígitos é de milhar ("1.299")
+        if len(decimais) == 3 and texto.count(texto[ultimo]) == len(separadores):
+            inteiro, decimais = texto.replace(texto[ultimo], ""), ""
+        else:
+            inteiro = re.sub(r"[,.]", "", texto[:ultimo])
+    else:
+        inteiro, decimais = texto, ""
+    return int(inteiro or 0) * 100 + int((decimais + "00")[:2])
+
+def formatar_reais(centavos):
+    return "R$ " + f"{centavos / 100:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+def deltas_venda(evento, valor):
+    if evento == VENDA_ABERTA:
+        return (1, 0, 0, 0)
+    if evento == VENDA_APROVADA:
+        return (0, 1, 0, valor or 0)
+    if evento == VENDA_EXPIRADA:
+        return (0, 0, 1, 0)
+    return None  # fechamento pelo admin: só fica no livro
+
+def chaves_resumo(linha):
+    dia = datetime.fromtimestamp(linha['ts'], TIMEZONE).strftime('%Y-%m-%d')
+    return (('total', ''), ('produto', linha['produto_id'] or '?'), ('dia', dia))
+
+def _somar_resumo(linha):
+    deltas = deltas_venda(linha['evento'], linha['valor_centavos'])
+    if deltas is None:
+        return
+    totais = _resumo_vendas.setdefault(linha['guild_id'], {})
+    for chave in chaves_resumo(linha):
+        atual = totais.setdefault(chave, [0] * len(COLUNAS_RESUMO))
+        for i, delta in enumerate(deltas):
+            atual[i] += delta
+
+def ler_livro_vendas(posicao):
+    # Linhas completas a partir de 'posicao' e a posição depois da última delas
+    linhas = []
+    with open(VENDAS_LIVRO_FILE, 'rb') as f:
+        f.seek(posicao)
+        for bruta in f:
+            if not bruta.endswith(b"\n"):
+                break  # escrita interrompida: a linha incompleta é descartada
+            posicao += len(bruta)
+            try:
+                linhas.append(json.loads(bruta))
+            except ValueError:
+                print(f"⚠️ Linha inválida em {VENDAS_LIVRO_FILE} ignorada (byte {posicao - len(bruta)})")
+    return linhas, posicao
+
+def _dados_resumo_vendas():
+    return {
+        'posicao': _posicao_livro,
+        'guilds': {
+            str(guild_id): {f"{dimensao}:{chave}": valores for (dimensao, chave), valores in totais.items()}
+            for guild_id, totais in _resumo_vendas.items()
+        }
+    }
+
+def carregar_livro_vendas():
+    global _livro_vendas, _posicao_livro
+    if usando_sqlite():
+        return
+    salvo = load_json_file(VENDAS_RESUMO_FILE, {'posicao': 0, 'guilds': {}})
+    for guild_id, totais in salvo['guilds'].items():
+        _resumo_vendas[int(guild_id)] = {tuple(chave.split(":", 1)): valores for chave, valores in totais.items()}
+    _posicao_livro = salvo['posicao']
+
+    if os.path.exists(VENDAS_LIVRO_FILE):
+        if os.path.getsize(VENDAS_LIVRO_FILE) < _posicao_livro:
+            print("⚠️ vendas.jsonl menor que o resumo salvo: totais recalculados do zero")
+            _resumo_vendas.clear()
+            _posicao_livro = 0
+        linhas, fim = ler_livro_vendas(_posicao_livro)
+        for linha in linhas:
+            _somar_resumo(linha)
+        if linhas:
+            print(f"📒 {len(linhas)} registros de vendas somados ao resumo")
+        with open(VENDAS_LIVRO_FILE, 'r+b') as f:
+            f.truncate(fim)
+        _posicao_livro = fim
+        marcar_sujo(VENDAS_RESUMO_FILE, _dados_resumo_vendas)
+    _livro_vendas = open(VENDAS_LIVRO_FILE, 'ab')
+
+async def registrar_venda(evento, channel_id, registro, valor=None):
+    global _posicao_livro
+    linha = {
+        'ts': time.time(),
+        'evento': evento,
+        'guild_id': registro['guild_id'],
+        'channel_id': channel_id,
+        'produto_id': registro.get('produto_id'),
+        'comprador_id': registro.get('comprador_id'),
+        'valor_centavos': valor,
+    }
+    if usando_sqlite():
+        await executar_db(_db_registrar_venda, linha, chaves_resumo(linha), deltas_venda(evento, valor))
+        return
+    _livro_vendas.write(json.dumps(linha, ensure_ascii=False).encode('utf-8') + b"\n")
+    _livro_vendas.flush()
+    _posicao_livro = _livro_vendas.tell()
+    _somar_resumo(linha)
+    marcar_sujo(VENDAS_RESUMO_FILE, _dados_resumo_vendas)
+
+async def resumo_vendas(guild_id, dia_inicial):
+    # Totais gerais e por produto, e os dias a partir de dia_inicial ('AAAA-MM-DD')
+    if usando_sqlite():
+        return await executar_db(_db_resumo_vendas, guild_id, dia_inicial)
+    return {
+        chave: list(valores) for chave, valores in _resumo_vendas.get(guild_id, {}).items()
+        if chave[0] != 'dia' or chave[1] >= dia_inicial
+    }
+
+carregar_livro_vendas()
+
+# ==========================================
+# SINCRONIZAÇÃO DOS COMANDOS
+# ==========================================
+
+# A árvore de comandos só é enviada ao Discord quando a impressão digital
+# dos comandos registrados muda; roda uma vez por processo (setup_hook),
+# nunca em reconexões do gateway
+DEV_GUILD_ID = int(os.getenv("DEV_GUILD_ID", "0"))  # sync por guild (instantâneo) para desenvolvimento
+FORCE_SYNC = os.getenv("VIREX_FORCE_SYNC") == "1"
+
+_estado_inicializacao = {'sync': None}
+
+def impressao_digital_comandos(guild=None):
+    comandos = sorted((cmd.to_dict() for cmd in bot.tree.get_commands(guild=guild)), key=lambda cmd: cmd['name'])
+    conteudo = json.dumps(comandos, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+async def sincronizar_comandos():
+    inicio = time.monotonic()
+    if MODO_CLUSTER and 0 not in SHARD_IDS:
+        # Os comandos são globais: só o processo do shard 0 sincroniza
+        _estado_inicializacao['sync'] = "pulado (feito pelo processo do shard 0)"
+        return
+    estado = load_json_file(COMMAND_SYNC_FILE, {})
+    guild = discord.Object(id=DEV_GUILD_ID) if DEV_GUILD_ID else None
+    chave = str(DEV_GUILD_ID) if guild else "global"
+
+    if guild:
+        bot.tree.copy_global_to(guild=guild)
+
+    impressao = impressao_digital_comandos(guild)
+    if not FORCE_SYNC and estado.get(chave) == impressao:
+        _estado_inicializacao['sync'] = "pulado (comandos inalterados)"
         return
 
     try:
-        # Verificar se já está conectado
-        if interaction.guild.voice_client:
-            await interaction.guild.voice_client.disconnect()
-        
-        # Conectar ao canal
-        vc = await canal.connect()
-        
-        # Mutar e desmutar áudio (surdo)
-        await vc.guild.change_voice_state(channel=canal, self_mute=True, self_deaf=True)
-        
-        # Salvar configuração
-        vendas_config['bot_voz_channel'] = canal.id
-        save_vendas_config(vendas_config)
-        
-        embed = discord.Embed(
-            title="✅ Bot Conectado em Voz!",
-            description=f"🔊 Conectado em: {canal.mention}\n🔇 Status: Mutado e Surdo",
-            color=discord.Color.green()
-        )
-        
-        if imagem:
-            embed.set_image(url=imagem)
-        
-        embed.set_footer(text=f"Bot permanecerá no canal até ser desconectado manualmente")
-        
-        await interaction.response.send_message(embed=embed)
-        
-    except Exception as e:
-        await interaction.response.send_message(
-            f"❌ Erro ao conectar: {str(e)}\n\n💡 **Nota:** Para usar áudio, instale: `pip install PyNaCl`",
-            ephemeral=True
-        )
+        await bot.tree.sync(guild=guild)
+    except discord.HTTPException as e:
+        _estado_inicializacao['sync'] = f"falhou ({e})"
+        return
+
+    estado[chave] = impressao
+    escrever_arquivo_atomico(COMMAND_SYNC_FILE, json.dumps(estado, indent=4))
+    _estado_inicializacao['sync'] = f"{chave} em {time.monotonic() - inicio:.2f}s"
 
 # ==========================================
-# COMANDO: /BANFAKE
+# SHARDS E CLUSTER MULTIPROCESSO
 # ==========================================
 
-@bot.tree.command(name="banfake", description="🔨 Simula um ban falso (brincadeira)")
-@app_commands.describe(membro="Membro para 'banir' (fake)")
-async def banfake(interaction: discord.Interaction, membro: discord.Member):
-    embed = discord.Embed(
-        title="🔨 Você foi banido!",
-        description=f"{membro.mention} foi banido do servidor por violação das regras.",
-        color=discord.Color.dark_red()
+# Cada processo do cluster roda uma faixa de shards; cada guild vive em um único
+# shard, então configs por guild, carrinhos e contadores não se cruzam. O que é
+# compartilhado (catálogo) passa pelo SQLite e é recarregado quando a versão muda.
+SHARD_STATS_INTERVAL = int(os.getenv("VIREX_SHARD_STATS_INTERVAL", "60"))  # 0 desliga o relatório
+CATALOGO_SYNC_INTERVAL = 5  # segundos entre verificações da versão do catálogo (só em cluster)
+CLUSTER_RESTART_DELAY = 5   # espera antes de reerguer um worker que caiu
+IDENTIFY_INTERVALO = 5      # o Discord aceita um IDENTIFY a cada 5s por bucket
+
+_eventos_por_shard = {}     # shard_id -> eventos do gateway recebidos
+_versao_catalogo = None
+_monitor_task = None
+
+def _instrumentar_ws(ws):
+    # Conta eventos por shard no despacho do websocket (um incremento por evento)
+    if ws is None or getattr(ws, '_virex_contador', False):
+        return
+    despachar = ws._dispatch
+    shard_id = ws.shard_id or 0
+
+    def contar(evento, *args):
+        if evento == 'socket_event_type':
+            _eventos_por_shard[shard_id] = _eventos_por_shard.get(shard_id, 0) + 1
+        despachar(evento, *args)
+
+    ws._dispatch = contar
+    ws._virex_contador = True
+
+@bot.listen('on_connect')
+@bot.listen('on_resumed')
+async def instrumentar_gateway():
+    # Cada reconexão cria um websocket novo
+    if MODO_SHARDED:
+        for info in bot.shards.values():
+            _instrumentar_ws(info._parent.ws)
+    else:
+        _instrumentar_ws(bot.ws)
+
+def estatisticas_shards(leitura=None):
+    # 'leitura' (shard_id -> (contagem, instante)) é do chamador: cada consumidor
+    # mede eventos/s desde a sua própria última leitura. Sem ela, só os totais
+    latencias = bot.latencies if MODO_SHARDED else [(bot.shard_id or 0, bot.latency)]
+    guilds_por_shard = {}
+    for guild in bot.guilds:
+        guilds_por_shard[guild.shard_id] = guilds_por_shard.get(guild.shard_id, 0) + 1
+
+    agora = time.monotonic()
+    estatisticas = []
+    for shard_id, latencia in latencias:
+        total = _eventos_por_shard.get(shard_id, 0)
+        eventos_s = None
+        if leitura is not None:
+            anterior, instante = leitura.get(shard_id, (0, INICIO_PROCESSO))
+            leitura[shard_id] = (total, agora)
+            eventos_s = (total - anterior) / max(agora - instante, 1e-9)
+        estatisticas.append({
+            'shard': shard_id,
+            'latencia_ms': latencia * 1000 if latencia == latencia else None,  # NaN antes do 1º heartbeat
+            'eventos_s': eventos_s,
+            'eventos': total,
+            'guilds': guilds_por_shard.get(shard_id, 0),
+        })
+    return estatisticas
+
+def _aplicar_catalogo(catalogo, novo, lista):
+    # Atualiza no lugar (o dict é referenciado no módulo todo) e invalida só o que mudou
+    for item_id in [item_id for item_id in catalogo if item_id not in novo]:
+        del catalogo[item_id]
+        invalidar_render(item_id, lista)
+        indexar_item(lista, item_id)
+    for item_id, item in novo.items():
+        if catalogo.get(item_id) != item:
+            catalogo[item_id] = item
+            invalidar_render(item_id, lista)
+            indexar_item(lista, item_id)
+
+async def no_catalogo(item_id, catalogo):
+    # Em cluster, um ID desconhecido pode ter sido criado por outro processo agora há pouco
+    if item_id not in catalogo and MODO_CLUSTER:
+        await sincronizar_catalogo()
+    return item_id in catalogo
+
+async def sincronizar_catalogo():
+    # Traz produtos/drops criados ou editados por outro processo do cluster
+    global _versao_catalogo
+    if not usando_sqlite():
+        return False
+    versao = await executar_db(_db_versao_catalogo)
+    if versao == _versao_catalogo:
+        return False
+    versao, novos_produtos, novos_drops = await executar_db(_db_carregar_catalogo)
+    _versao_catalogo = versao
+    _aplicar_catalogo(produtos, novos_produtos, LISTA_PRODUTOS)
+    _aplicar_catalogo(produtos_drop, novos_drops, LISTA_DROPS)
+    return True
+
+async def _loop_monitor_shards():
+    ultimo_relatorio = time.monotonic()
+    leitura = {}
+    while True:
+        await asyncio.sleep(CATALOGO_SYNC_INTERVAL if MODO_CLUSTER else SHARD_STATS_INTERVAL)
+        if MODO_CLUSTER:
+            try:
+                await sincronizar_catalogo()
+            except sqlite3.Error as e:
+                print(f"⚠️ Falha ao sincronizar o catálogo: {e}")
+
+        if SHARD_STATS_INTERVAL and time.monotonic() - ultimo_relatorio >= SHARD_STATS_INTERVAL:
+            ultimo_relatorio = time.monotonic()
+            for info in estatisticas_shards(leitura):
+                latencia = f"{info['latencia_ms']:.0f} ms" if info['latencia_ms'] is not None else "-"
+                print(f"📡 Shard {info['shard']}: {latencia} | {info['eventos_s']:.1f} eventos/s | {info['guilds']} guilds")
+
+def iniciar_monitor_shards():
+    global _monitor_task
+    if _monitor_task is None and (MODO_CLUSTER or (MODO_SHARDED and SHARD_STATS_INTERVAL)):
+        _monitor_task = asyncio.create_task(_loop_monitor_shards())
+
+def shards_recomendados():
+    # GET /gateway/bot: quantidade de shards e concorrência de IDENTIFY
+    import urllib.request
+    requisicao = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={'Authorization': f"Bot {TOKEN}", 'User-Agent': "DiscordBot (virex-store, 1.0)"}
     )
+    with urllib.request.urlopen(requisicao, timeout=15) as resposta:
+        dados = json.load(resposta)
+    return dados['shards'], dados.get('session_start_limit', {}).get('max_concurrency', 1)
+
+def dividir_shards(total, processos):
+    # Faixas contíguas e equilibradas: 10 shards em 3 processos -> 0-3, 4-6, 7-9
+    base, extra = divmod(total, processos)
+    faixas, inicio = [], 0
+    for i in range(processos):
+        tamanho = base + (1 if i < extra else 0)
+        faixas.append(range(inicio, inicio + tamanho))
+        inicio += tamanho
+    return faixas
+
+def executar_cluster():
+    # Lançador: distribui as faixas de shards entre VIREX_PROCESSOS workers e
+    # reergue quem cair. O estado compartilhado exige o backend SQLite.
+    import subprocess
+
+    concorrencia = 1
+    if SHARD_COUNT:
+        total = SHARD_COUNT
+    else:
+        total, concorrencia = shards_recomendados()
+    processos = max(1, min(CLUSTER_PROCESSOS, total))
+    faixas = dividir_shards(total, processos)
+
+    if not os.path.exists(SQLITE_FILE):
+        subprocess.run([sys.executable, os.path.abspath(__file__), "migrar-sqlite"],
+                       env=dict(os.environ, VIREX_STORAGE="sqlite"), check=True)
+
+    def iniciar(i):
+        faixa = faixas[i]
+        env = dict(
+            os.environ,
+            VIREX_STORAGE="sqlite",
+            VIREX_SHARDS=str(total),
+            VIREX_SHARD_IDS=f"{faixa.start}-{faixa.stop - 1}",
+            VIREX_HTTP_RPS=str(SAIDA_POR_SEGUNDO / processos),
+        )
+        print(f"🚀 Worker {i}: shards {faixa.start}-{faixa.stop - 1} de {total}")
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+
+    encerrando = False
+
+    def encerrar(*_):
+        nonlocal encerrando
+        encerrando = True
+
+    signal.signal(signal.SIGTERM, encerrar)
+    signal.signal(signal.SIGINT, encerrar)
+
+    workers = {}
+    for i, faixa in enumerate(faixas):
+        if encerrando:
+            break
+        workers[i] = iniciar(i)
+        # Escalona os IDENTIFY entre processos (cada worker já espaça os próprios shards)
+        time.sleep(IDENTIFY_INTERVALO * len(faixa) / concorrencia)
+
+    quedas = {}
+    while not encerrando:
+        time.sleep(1)
+        for i, worker in workers.items():
+            if worker.poll() is None:
+                continue
+            quedas.setdefault(i, time.monotonic())
+            if time.monotonic() - quedas[i] >= CLUSTER_RESTART_DELAY:
+                print(f"⚠️ Worker {i} saiu com código {worker.returncode}, reiniciando...")
+                del quedas[i]
+                workers[i] = iniciar(i)
+
+    for worker in workers.values():
+        if worker.poll() is None:
+            worker.terminate()
+    for worker in workers.values():
+        try:
+            worker.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+# ==========================================
+# EVENTO ON_READY
+# ==========================================
+
+@bot.event
+async def on_ready():
+    await reconciliar_carrinhos()
+    await iniciar_expiracao_carrinhos()
+    await carregar_categorias_carrinho()
+    iniciar_pool_carrinhos()
+    iniciar_monitor_shards()
+    # Monta os índices do autocomplete antes da primeira tecla
+    indice_busca(LISTA_PRODUTOS)
+    indice_busca(LISTA_DROPS)
+    retomar_sessoes_voz()
+    print(f"╔══════════════════════════════════════╗")
+    print(f"║   🤖 VIREX STORE BOT ONLINE!        ║")
+    print(f"║   Bot: {bot.user.name:<25} ║")
+    print(f"║   ID: {bot.user.id:<26} ║")
+    print(f"╚══════════════════════════════════════╝")
     
-    embed.add_field(name="Motivo", value="Comportamento inadequado", inline=False)
-    embed.add_field(name="Duração", value="Permanente", inline=False)
-    
-    embed.set_footer(text="⚠️ ISTO É UMA BRINCADEIRA - Nenhuma ação real foi tomada")
+    if _estado_inicializacao.get('pronto_em') is None:
+        _estado_inicializacao['pronto_em'] = time.monotonic() - INICIO_PROCESSO
+        print(f"⏱️ Pronto em {_estado_inicializacao['pronto_em']:.2f}s | sync de comandos: {_estado_inicializacao['sync']}")
     
-    await interaction.response.send_message(embed=embed)
+    await bot.change_presence(
+        activity=discord.Activity(
+            type=discord.ActivityType.watching,
+            name="vendas | /ajudavirexstore"
+        )
+    )
 
 # ==========================================
-# COMANDO: /SETUP (Sistema de Vendas)
+# COMANDO: /AJUDAVIREXSTORE
 # ==========================================
 
-@bot.tree.command(name="setup", description="⚙️ Painel de configuração do sistema de vendas")
-async def setup(interaction: discord.Interaction):
-    if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
-        return
-    
+@bot.tree.command(name="ajudavirexstore", description="📋 Ver todos os comandos disponíveis do VIREX STORE")
+async def ajudavirexstore(interaction: discord.Interaction):
     embed = discord.Embed(
-        title="⚙️ VIREX STORE - Painel de Configuração",
-        description="**Bem-vindo ao sistema de vendas!**\n\nEscolha uma opção abaixo para configurar seu bot:",
+        title="📋 VIREX STORE - Comandos Disponíveis",
+        description="Sistema completo de vendas e logs para Discord",
         color=discord.Color.blue()
     )
     
-    categoria_status = "✅ Configurada" if vendas_config.get('categoria_id') else "❌ Não configurada"
-    pix_status = "✅ Configurado" if vendas_config.get('pix_info') != 'Configure seu PIX com o comando /setup' else "❌ Não configurado"
-    produtos_count = len(produtos)
-    produtos_drop_count = len(produtos_drop)
+    # Comandos de Vendas
+    embed.add_field(
+        name="💰 **SISTEMA DE VENDAS**",
+        value=(
+            "`/setup` - Painel principal de configuração\n"
+            "`/enviarproduto` - Enviar painel de produto\n"
+            "`/enviardrop` - Enviar painel dropdown\n"
+            "`/setupcarrinho` - Carrinho em canal ou thread privada\n"
+            "`/setupnotificador` - Quem é avisado dos comprovantes\n"
+            "`/relatorio` - Vendas e receita por produto e dia"
+        ),
+        inline=False
+    )
     
-    embed.add_field(name="📁 Categoria", value=categoria_status, inline=True)
-    embed.add_field(name="💳 PIX", value=pix_status, inline=True)
-    embed.add_field(name="📦 Produtos", value=f"{produtos_count} cadastrados", inline=True)
-    embed.add_field(name="📋 Produtos Drop", value=f"{produtos_drop_count} cadastrados", inline=True)
+    # Comandos de Logs
+    embed.add_field(
+        name="📊 **SISTEMA DE LOGS**",
+        value=(
+            "`/setuplogs` - Configurar canais de logs\n"
+            "`/setupraid` - Resumo de entradas/saídas em raids\n"
+            "• Entradas, Saídas, Mensagens\n"
+            "• Edições, Deleções, Bans\n"
+            "• Cargos, Canais, Voz"
+        ),
+        inline=False
+    )
     
-    embed.set_footer(text=f"Comando usado por: {interaction.user.name}")
-    embed.set_thumbnail(url=bot.user.display_avatar.url)
+    # Comandos de Utilidades
+    embed.add_field(
+        name="🛠️ **UTILIDADES**",
+        value=(
+            "`/botvoz` - Bot entra em canal de voz\n"
+            "`/estatisticasvoz` - Minutos em call do servidor\n"
+            "`/banfake` - Simula um ban (brincadeira)"
+        ),
+        inline=False
+    )
     
-    # Criar botões
-    btn_categoria = Button(label="📁 Categoria", style=discord.ButtonStyle.primary, row=0)
-    btn_pix = Button(label="💳 PIX", style=discord.ButtonStyle.primary, row=0)
+    embed.add_field(
+        name="👑 **PERMISSÕES**",
+        value="Comandos de configuração requerem:\n• Dono do Servidor\n• Administrador",
+        inline=False
+    )
+    
+    embed.set_footer(
+        text=f"Solicitado por: {interaction.user.name} | VIREX STORE",
+        icon_url=interaction.user.display_avatar.url
+    )
+    
+    embed.set_thumbnail(url=bot.user.display_avatar.url)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ==========================================
+# COMANDO: /SETUPLOGS
+# ==========================================
+
+@bot.tree.command(name="setuplogs", description="⚙️ Configurar canal de logs")
+@app_commands.describe(
+    tipo="Tipo de log",
+    canal="Canal para enviar os logs"
+)
+@app_commands.choices(tipo=[
+    app_commands.Choice(name="📥 Entradas", value="join"),
+    app_commands.Choice(name="📤 Saídas", value="leave"),
+    app_commands.Choice(name="💬 Mensagens", value="message"),
+    app_commands.Choice(name="✏️ Edição", value="edit"),
+    app_commands.Choice(name="🗑️ Delete", value="delete"),
+    app_commands.Choice(name="🔨 Ban", value="ban"),
+    app_commands.Choice(name="🎭 Cargos", value="role"),
+    app_commands.Choice(name="📁 Canais", value="channel"),
+    app_commands.Choice(name="🔊 Voz", value="voice"),
+])
+async def setuplogs(interaction: discord.Interaction, tipo: app_commands.Choice[str], canal: discord.TextChannel):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
+        return
+
+    set_log_channel(interaction.guild.id, tipo.value, canal)
+
+    await interaction.response.send_message(
+        f"✅ Log **{tipo.name}** configurado em {canal.mention}",
+        ephemeral=True
+    )
+
+# ==========================================
+# COMANDO: /SETUPCARRINHO
+# ==========================================
+
+@bot.tree.command(name="setupcarrinho", description="🛒 Escolher se os carrinhos abrem como canal ou thread privada")
+@app_commands.describe(
+    modo="Onde os carrinhos serão abertos",
+    canal="Canal de vendas onde as threads privadas serão criadas (modo thread)",
+    expira_horas="Horas sem mensagens até fechar um carrinho não aprovado (0 nunca fecha)",
+    arquivo="Canal que recebe a transcrição de cada carrinho fechado"
+)
+@app_commands.choices(modo=[
+    app_commands.Choice(name="📁 Canal na categoria", value=CARRINHO_MODO_CANAL),
+    app_commands.Choice(name="🧵 Thread privada", value=CARRINHO_MODO_THREAD),
+])
+async def setupcarrinho(interaction: discord.Interaction, modo: app_commands.Choice[str], canal: discord.TextChannel = None,
+                        expira_horas: app_commands.Range[int, 0, 720] = None, arquivo: discord.TextChannel = None):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
+        return
+
+    config = config_da_guild(interaction.guild.id)
+
+    if modo.value == CARRINHO_MODO_THREAD:
+        canal = canal or interaction.guild.get_channel(config['canal_vendas_id'] or 0)
+        if not canal:
+            await interaction.response.send_message("❌ Informe o canal de vendas para as threads.", ephemeral=True)
+            return
+        config['canal_vendas_id'] = canal.id
+
+    config['modo_carrinho'] = modo.value
+    if expira_horas is not None:
+        config['carrinho_expira_horas'] = expira_horas
+    if arquivo is not None:
+        config['canal_arquivo_id'] = arquivo.id
+    save_guild_config(interaction.guild.id, config)
+
+    destino = f" em {canal.mention}" if modo.value == CARRINHO_MODO_THREAD else ""
+    horas = horas_expiracao(interaction.guild.id)
+    expiracao = f"fechados após {horas}h sem atividade" if horas else "sem fechamento automático"
+    if config.get('canal_arquivo_id'):
+        expiracao += f", transcrições em <#{config['canal_arquivo_id']}>"
+    await interaction.response.send_message(f"✅ Carrinhos serão abertos como **{modo.name}**{destino} ({expiracao})", ephemeral=True)
+
+# ==========================================
+# COMANDO: /SETUPNOTIFICADOR
+# ==========================================
+
+@bot.tree.command(name="setupnotificador", description="📸 Definir quem é avisado quando um comprovante é enviado")
+@app_commands.describe(
+    cargo="Cargo a ser mencionado nos comprovantes",
+    membro="Membro a adicionar/remover da lista de notificados",
+    remover="Remover em vez de adicionar"
+)
+async def setupnotificador(interaction: discord.Interaction, cargo: discord.Role = None, membro: discord.Member = None, remover: bool = False):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
+        return
+
+    guild_config = config_da_guild(interaction.guild.id)
+    config = guild_config['notificadores']
+
+    if cargo:
+        config['cargo'] = None if remover else cargo.id
+    if membro:
+        if remover and membro.id in config['membros']:
+            config['membros'].remove(membro.id)
+        elif not remover and membro.id not in config['membros']:
+            config['membros'].append(membro.id)
+    save_guild_config(interaction.guild.id, guild_config)
+
+    destino = [f"<@&{config['cargo']}>"] if config['cargo'] else []
+    destino += [f"<@{uid}>" for uid in config['membros']]
+    await interaction.response.send_message(
+        f"✅ Comprovantes serão notificados para: {' '.join(destino) or 'administradores (padrão)'}",
+        ephemeral=True
+    )
+
+# ==========================================
+# COMANDOS: /ENVIARPRODUTO E /ENVIARDROP
+# ==========================================
+
+def pode_enviar_painel(interaction):
+    return (interaction.user.id == interaction.guild.owner_id or interaction.user.guild_permissions.administrator)
+
+@bot.tree.command(name="enviarproduto", description="📤 Enviar painel de produto neste canal")
+@app_commands.describe(produto="Produto a enviar (digite para buscar pelo nome ou ID)")
+async def enviarproduto(interaction: discord.Interaction, produto: str):
+    if not pode_enviar_painel(interaction):
+        await interaction.response.send_message("❌ Sem permissão!", ephemeral=True)
+        return
+    
+    if not await no_catalogo(produto, produtos):
+        await interaction.response.send_message("❌ Produto não encontrado!", ephemeral=True)
+        return
+    
+    embed_produto, view_produto = montar_painel_produto(produto)
+    await interaction.channel.send(embed=embed_produto, view=view_produto)
+    await interaction.response.send_message("✅ Painel enviado!", ephemeral=True)
+
+@enviarproduto.autocomplete('produto')
+async def enviarproduto_autocomplete(interaction: discord.Interaction, atual: str):
+    return escolhas_autocomplete(LISTA_PRODUTOS, atual)
+
+@bot.tree.command(name="enviardrop", description="📤 Enviar painel dropdown neste canal")
+@app_commands.describe(drop="Dropdown a enviar (digite para buscar pelo nome ou ID)")
+async def enviardrop(interaction: discord.Interaction, drop: str):
+    if not pode_enviar_painel(interaction):
+        await interaction.response.send_message("❌ Sem permissão!", ephemeral=True)
+        return
+    
+    if not await no_catalogo(drop, produtos_drop):
+        await interaction.response.send_message("❌ Dropdown não encontrado!", ephemeral=True)
+        return
+    
+    embed_painel, view_painel = montar_painel_drop(drop)
+    await interaction.channel.send(embed=embed_painel, view=view_painel)
+    await interaction.response.send_message("✅ Dropdown enviado!", ephemeral=True)
+
+@enviardrop.autocomplete('drop')
+async def enviardrop_autocomplete(interaction: discord.Interaction, atual: str):
+    return escolhas_autocomplete(LISTA_DROPS, atual)
+
+# ==========================================
+# COMANDO: /SETUPRAID
+# ==========================================
+
+@bot.tree.command(name="setupraid", description="🚨 Definir a partir de quantas entradas/saídas os logs viram resumo")
+@app_commands.describe(limite="Entradas ou saídas por janela que ativam o modo raid (0 desliga, vazio = padrão)")
+async def setupraid(interaction: discord.Interaction, limite: app_commands.Range[int, 0, 10000] = None):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
+        return
+
+    config = config_da_guild(interaction.guild.id)
+    config['raid_limite'] = limite
+    save_guild_config(interaction.guild.id, config)
+
+    efetivo = limite_raid(interaction.guild.id)
+    if efetivo:
+        mensagem = f"✅ Modo raid ativa com **{efetivo}** entradas ou saídas em {int(RAID_JANELA)}s"
+    else:
+        mensagem = "✅ Modo raid desligado: toda entrada/saída gera um log individual"
+    await interaction.response.send_message(mensagem, ephemeral=True)
+
+# ==========================================
+# COMANDO: /RELATORIO
+# ==========================================
+
+RELATORIO_TOP_PRODUTOS = 10
+RELATORIO_DIAS_LISTADOS = 7
+
+@bot.tree.command(name="relatorio", description="📈 Vendas e receita do servidor")
+@app_commands.describe(dias="Período considerado nos totais diários (padrão 30)")
+async def relatorio(interaction: discord.Interaction, dias: app_commands.Range[int, 1, 365] = 30):
+    if not pode_gerenciar(interaction.user, interaction.guild):
+        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
+        return
+
+    hoje = now().date()
+    dia_inicial = (hoje - timedelta(days=dias - 1)).isoformat()
+    totais = await resumo_vendas(interaction.guild.id, dia_inicial)
+
+    vazio = [0] * len(COLUNAS_RESUMO)
+    abertos, aprovados, expirados, receita = totais.get(('total', ''), vazio)
+    por_dia = sorted(((chave, valores) for (dimensao, chave), valores in totais.items() if dimensao == 'dia'), reverse=True)
+    produtos_vendidos = sorted(
+        ((valores[3], valores[1], chave) for (dimensao, chave), valores in totais.items() if dimensao == 'produto' and valores[1]),
+        reverse=True
+    )
+
+    embed = discord.Embed(title="📈 Relatório de vendas", color=discord.Color.green(), timestamp=now())
+    conversao = f"{aprovados / abertos * 100:.1f}%" if abertos else "-"
+    embed.add_field(
+        name="Desde o início",
+        value=f"💰 {formatar_reais(receita)}\n🛒 {abertos} carrinhos · ✅ {aprovados} aprovados ({conversao}) · ⌛ {expirados} expirados",
+        inline=False
+    )
+    embed.add_field(
+        name=f"Últimos {dias} dias",
+        value=f"💰 {formatar_reais(sum(v[3] for _, v in por_dia))} · ✅ {sum(v[1] for _, v in por_dia)} aprovados",
+        inline=False
+    )
+    if por_dia:
+        embed.add_field(
+            name="Por dia",
+            value="\n".join(
+                f"`{dia[8:10]}/{dia[5:7]}` {formatar_reais(valores[3])} ({valores[1]}/{valores[0]})"
+                for dia, valores in por_dia[:RELATORIO_DIAS_LISTADOS]
+            ),
+            inline=False
+        )
+    if produtos_vendidos:
+        linhas = []
+        for receita_produto, vendidos, prod_id in produtos_vendidos[:RELATORIO_TOP_PRODUTOS]:
+            produto = resolver_produto(prod_id)
+            nome = produto['titulo'] if produto else prod_id
+            linhas.append(f"**{nome}**: {formatar_reais(receita_produto)} ({vendidos}x)")
+        embed.add_field(name="Produtos mais vendidos", value=limitar_campo("\n".join(linhas), "-"), inline=False)
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ==========================================
+# COMANDO: /BOTVOZ
+# ==========================================
+
+@bot.tree.command(name="botvoz", description="🔊 Bot entra em um canal de voz (mutado e sem ouvir)")
+@app_commands.describe(
+    canal="Canal de voz onde o bot entrará",
+    imagem="URL da imagem para o bot mostrar (opcional)"
+)
+async def botvoz(interaction: discord.Interaction, canal: discord.VoiceChannel, imagem: str = None):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
+        return
+
+    try:
+        # Verificar se já está conectado
+        if interaction.guild.voice_client:
+            await interaction.guild.voice_client.disconnect()
+        
+        # Conectar ao canal
+        vc = await canal.connect()
+        
+        # Mutar e desmutar áudio (surdo)
+        await vc.guild.change_voice_state(channel=canal, self_mute=True, self_deaf=True)
+        
+        # Salvar configuração
+        config = config_da_guild(interaction.guild.id)
+        config['bot_voz_channel'] = canal.id
+        save_guild_config(interaction.guild.id, config)
+        
+        embed = discord.Embed(
+            title="✅ Bot Conectado em Voz!",
+            description=f"🔊 Conectado em: {canal.mention}\n🔇 Status: Mutado e Surdo",
+            color=discord.Color.green()
+        )
+        
+        if imagem:
+            embed.set_image(url=imagem)
+        
+        embed.set_footer(text=f"Bot permanecerá no canal até ser desconectado manualmente")
+        
+        await interaction.response.send_message(embed=embed)
+        
+    except Exception as e:
+        await interaction.response.send_message(
+            f"❌ Erro ao conectar: {str(e)}\n\n💡 **Nota:** Para usar áudio, instale: `pip install PyNaCl`",
+            ephemeral=True
+        )
+
+# ==========================================
+# COMANDO: /ESTATISTICASVOZ
+# ==========================================
+
+@bot.tree.command(name="estatisticasvoz", description="🎙️ Minutos em call do servidor desde que o bot iniciou")
+async def estatisticasvoz(interaction: discord.Interaction):
+    stats = estatisticas_voz(interaction.guild.id)
+
+    embed = discord.Embed(
+        title="🎙️ Voz no servidor",
+        description=f"Desde <t:{int(INICIO_ESTATISTICAS_VOZ.timestamp())}:R>",
+        color=discord.Color.blurple()
+    )
+    embed.add_field(name="Minutos em call", value=f"{stats['minutos']:.0f}")
+    embed.add_field(name="Sessões", value=str(stats['sessoes']))
+    embed.add_field(name="Em call agora", value=str(stats['ativos']))
+    if stats['top']:
+        embed.add_field(
+            name="Quem mais ficou em call",
+            value="\n".join(f"<@{member_id}>: {minutos:.0f} min" for member_id, minutos in stats['top']),
+            inline=False
+        )
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ==========================================
+# COMANDO: /BANFAKE
+# ==========================================
+
+@bot.tree.command(name="banfake", description="🔨 Simula um ban falso (brincadeira)")
+@app_commands.describe(membro="Membro para 'banir' (fake)")
+async def banfake(interaction: discord.Interaction, membro: discord.Member):
+    embed = discord.Embed(
+        title="🔨 Você foi banido!",
+        description=f"{membro.mention} foi banido do servidor por violação das regras.",
+        color=discord.Color.dark_red()
+    )
+    
+    embed.add_field(name="Motivo", value="Comportamento inadequado", inline=False)
+    embed.add_field(name="Duração", value="Permanente", inline=False)
+    
+    embed.set_footer(text="⚠️ ISTO É UMA BRINCADEIRA - Nenhuma ação real foi tomada")
+    
+    await interaction.response.send_message(embed=embed)
+
+# ==========================================
+# COMANDO: /SETUP (Sistema de Vendas)
+# ==========================================
+
+@bot.tree.command(name="setup", description="⚙️ Painel de configuração do sistema de vendas")
+async def setup(interaction: discord.Interaction):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores podem usar este comando.", ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title="⚙️ VIREX STORE - Painel de Configuração",
+        description="**Bem-vindo ao sistema de vendas!**\n\nEscolha uma opção abaixo para configurar seu bot:",
+        color=discord.Color.blue()
+    )
+    
+    config = config_da_guild(interaction.guild.id)
+    categoria_status = "✅ Configurada" if config['categoria_id'] else "❌ Não configurada"
+    pix_status = "✅ Configurado" if config['pix_info'] != PIX_PADRAO else "❌ Não configurado"
+    produtos_count = len(produtos)
+    produtos_drop_count = len(produtos_drop)
+    
+    embed.add_field(name="📁 Categoria", value=categoria_status, inline=True)
+    embed.add_field(name="💳 PIX", value=pix_status, inline=True)
+    embed.add_field(name="📦 Produtos", value=f"{produtos_count} cadastrados", inline=True)
+    embed.add_field(name="📋 Produtos Drop", value=f"{produtos_drop_count} cadastrados", inline=True)
+    
+    embed.set_footer(text=f"Comando usado por: {interaction.user.name}")
+    embed.set_thumbnail(url=bot.user.display_avatar.url)
+    
+    # Criar botões
+    btn_categoria = Button(label="📁 Categoria", style=discord.ButtonStyle.primary, row=0)
+    btn_pix = Button(label="💳 PIX", style=discord.ButtonStyle.primary, row=0)
     
     btn_criar_produto = Button(label="➕ Produto", style=discord.ButtonStyle.success, row=1)
     btn_criar_drop = Button(label="📋 Dropdown", style=discord.ButtonStyle.success, row=1)
@@ -348,8 +2127,8 @@ async def setup(interaction: discord.Interaction):
                 await sel_inter.response.send_message("❌ Sem permissão!", ephemeral=True)
                 return
             
-            vendas_config['categoria_id'] = int(select.values[0])
-            save_vendas_config(vendas_config)
+            config_da_guild(sel_inter.guild.id)['categoria_id'] = int(select.values[0])
+            salvar_config_da_guild(sel_inter.guild.id)
             await sel_inter.response.send_message("✅ Categoria configurada!", ephemeral=True)
         
         select.callback = select_callback
@@ -369,13 +2148,13 @@ async def setup(interaction: discord.Interaction):
             placeholder="Ex: Chave PIX: seuemail@exemplo.com",
             style=discord.TextStyle.paragraph,
             max_length=500,
-            default=vendas_config.get('pix_info', '')
+            default=config_da_guild(inter.guild.id)['pix_info']
         )
         modal.add_item(pix_input)
         
         async def on_submit(modal_inter):
-            vendas_config['pix_info'] = pix_input.value
-            save_vendas_config(vendas_config)
+            config_da_guild(modal_inter.guild.id)['pix_info'] = pix_input.value
+            salvar_config_da_guild(modal_inter.guild.id)
             await modal_inter.response.send_message("✅ PIX configurado!", ephemeral=True)
         
         modal.on_submit = on_submit
@@ -404,12 +2183,7 @@ async def setup(interaction: discord.Interaction):
             await inter.response.send_message("❌ Nenhum produto cadastrado!", ephemeral=True)
             return
         
-        options = [
-            discord.SelectOption(label=prod['titulo'], value=prod_id, description=f"R$ {prod['preco']}")
-            for prod_id, prod in produtos.items()
-        ]
-        
-        select = Select(placeholder="Escolha o produto...", options=options[:25])
+        select = Select(placeholder="Escolha o produto...", options=opcoes_produtos()[:25])
         
         async def select_callback(sel_inter):
             if not check_permissions(sel_inter):
@@ -417,28 +2191,7 @@ async def setup(interaction: discord.Interaction):
                 return
             
             prod_id = select.values[0]
-            produto = produtos[prod_id]
-            
-            embed_produto = discord.Embed(
-                title=produto['titulo'],
-                description=produto['descricao'],
-                color=discord.Color.gold()
-            )
-            embed_produto.add_field(name="💰 Preço", value=f"R$ {produto['preco']}", inline=True)
-            
-            if produto.get('imagem_url'):
-                embed_produto.set_image(url=produto['imagem_url'])
-            
-            embed_produto.set_footer(text="Clique em 'Comprar' para iniciar sua compra!")
-            
-            button = Button(label="🛒 Comprar", style=discord.ButtonStyle.success)
-            
-            async def comprar_callback(btn_inter):
-                await criar_carrinho(btn_inter, produto, prod_id)
-            
-            button.callback = comprar_callback
-            view_produto = View(timeout=None)
-            view_produto.add_item(button)
+            embed_produto, view_produto = montar_painel_produto(prod_id)
             
             await sel_inter.channel.send(embed=embed_produto, view=view_produto)
             await sel_inter.response.send_message("✅ Painel enviado!", ephemeral=True)
@@ -458,17 +2211,7 @@ async def setup(interaction: discord.Interaction):
             await inter.response.send_message("❌ Nenhum dropdown cadastrado!", ephemeral=True)
             return
         
-        options = [
-            discord.SelectOption(
-                label=drop['titulo_painel'],
-                value=drop_id,
-                description=f"{len(drop['opcoes'])} opções",
-                emoji=drop['emoji_painel']
-            )
-            for drop_id, drop in produtos_drop.items()
-        ]
-        
-        select = Select(placeholder="Escolha o dropdown...", options=options[:25])
+        select = Select(placeholder="Escolha o dropdown...", options=opcoes_drops()[:25])
         
         async def select_callback(sel_inter):
             if not check_permissions(sel_inter):
@@ -476,49 +2219,7 @@ async def setup(interaction: discord.Interaction):
                 return
             
             drop_id = select.values[0]
-            painel = produtos_drop[drop_id]
-            
-            embed_painel = discord.Embed(
-                title=f"{painel['emoji_painel']} {painel['titulo_painel']}",
-                description=painel['descricao_painel'],
-                color=discord.Color.gold()
-            )
-            
-            if painel.get('imagem_url'):
-                embed_painel.set_image(url=painel['imagem_url'])
-            
-            embed_painel.set_footer(text="Selecione uma opção no menu abaixo!")
-            
-            opcoes_select = []
-            for i, opcao in enumerate(painel['opcoes'][:25]):
-                opcoes_select.append(
-                    discord.SelectOption(
-                        label=opcao['nome'],
-                        value=str(i),
-                        description=opcao['descricao'],
-                        emoji=opcao['emoji']
-                    )
-                )
-            
-            produto_select = Select(placeholder="Selecione uma opção", options=opcoes_select)
-            
-            async def produto_select_callback(prod_inter):
-                opcao_index = int(produto_select.values[0])
-                opcao_selecionada = painel['opcoes'][opcao_index]
-                
-                produto_temp = {
-                    'titulo': f"{painel['titulo_painel']} - {opcao_selecionada['nome']}",
-                    'descricao': f"{painel['descricao_painel']}\n\n**Opção:** {opcao_selecionada['nome']}",
-                    'preco': opcao_selecionada['preco'],
-                    'imagem_url': painel.get('imagem_url'),
-                    'tipo_imagem': painel.get('tipo_imagem', 'gif')
-                }
-                
-                await criar_carrinho(prod_inter, produto_temp, f"{drop_id}_{opcao_index}")
-            
-            produto_select.callback = produto_select_callback
-            view_painel = View(timeout=None)
-            view_painel.add_item(produto_select)
+            embed_painel, view_painel = montar_painel_drop(drop_id)
             
             await sel_inter.channel.send(embed=embed_painel, view=view_painel)
             await sel_inter.response.send_message("✅ Dropdown enviado!", ephemeral=True)
@@ -553,13 +2254,13 @@ async def setup(interaction: discord.Interaction):
         await inter.response.send_message(embed=embed_lista, ephemeral=True)
     
     # Atribuir callbacks
-    btn_categoria.callback = categoria_callback
-    btn_pix.callback = pix_callback
-    btn_criar_produto.callback = criar_produto_callback
-    btn_criar_drop.callback = criar_drop_callback
-    btn_enviar_painel.callback = enviar_painel_callback
-    btn_enviar_drop.callback = enviar_drop_callback
-    btn_listar.callback = listar_callback
+    btn_categoria.callback = medido(categoria_callback, "setup.categoria")
+    btn_pix.callback = medido(pix_callback, "setup.pix")
+    btn_criar_produto.callback = medido(criar_produto_callback, "setup.criar_produto")
+    btn_criar_drop.callback = medido(criar_drop_callback, "setup.criar_drop")
+    btn_enviar_painel.callback = medido(enviar_painel_callback, "setup.enviar_painel")
+    btn_enviar_drop.callback = medido(enviar_drop_callback, "setup.enviar_drop")
+    btn_listar.callback = medido(listar_callback, "setup.listar")
     
     # Criar view
     view = View(timeout=300)
@@ -592,7 +2293,7 @@ class CriarProdutoModal(Modal):
         self.add_item(self.imagem_url)
     
     async def on_submit(self, interaction: discord.Interaction):
-        produto_id = f"prod_{len(produtos) + 1}"
+        produto_id = await novo_id_catalogo("prod", produtos)
         
         produtos[produto_id] = {
             'titulo': self.titulo.value,
@@ -603,7 +2304,7 @@ class CriarProdutoModal(Modal):
             'criado_em': datetime.now().isoformat()
         }
         
-        save_produtos(produtos)
+        await salvar_produto(produto_id)
         
         embed = discord.Embed(
             title="✅ Produto Criado!",
@@ -641,183 +2342,1574 @@ class CriarProdutoDropModal1(Modal):
             'tipo_imagem': 'gif',
             'opcoes': []
         }
-        
-        button_add = Button(label="➕ Adicionar Opção", style=discord.ButtonStyle.success)
-        button_finish = Button(label="✅ Finalizar", style=discord.ButtonStyle.primary)
-        
-        async def add_option_callback(btn_inter):
-            modal = CriarOpcaoDropModal(temp_id)
-            await btn_inter.response.send_modal(modal)
-        
-        async def finish_callback(btn_inter):
-            if len(bot.temp_produtos_drop[temp_id]['opcoes']) == 0:
-                await btn_inter.response.send_message("❌ Adicione pelo menos uma opção!", ephemeral=True)
-                return
-            
-            drop_id = f"drop_{len(produtos_drop) + 1}"
-            produtos_drop[drop_id] = bot.temp_produtos_drop[temp_id]
-            produtos_drop[drop_id]['criado_em'] = datetime.now().isoformat()
-            save_produtos_drop(produtos_drop)
-            
-            del bot.temp_produtos_drop[temp_id]
-            
+        
+        button_add = Button(label="➕ Adicionar Opção", style=discord.ButtonStyle.success)
+        button_finish = Button(label="✅ Finalizar", style=discord.ButtonStyle.primary)
+        
+        async def add_option_callback(btn_inter):
+            modal = CriarOpcaoDropModal(temp_id)
+            await btn_inter.response.send_modal(modal)
+        
+        async def finish_callback(btn_inter):
+            if len(bot.temp_produtos_drop[temp_id]['opcoes']) == 0:
+                await btn_inter.response.send_message("❌ Adicione pelo menos uma opção!", ephemeral=True)
+                return
+            
+            drop_id = await novo_id_catalogo("drop", produtos_drop)
+            produtos_drop[drop_id] = bot.temp_produtos_drop[temp_id]
+            produtos_drop[drop_id]['criado_em'] = datetime.now().isoformat()
+            await salvar_produto_drop(drop_id)
+            
+            del bot.temp_produtos_drop[temp_id]
+            
+            embed = discord.Embed(
+                title="✅ Dropdown Criado!",
+                description=f"**ID:** {drop_id}\n**Opções:** {len(produtos_drop[drop_id]['opcoes'])}",
+                color=discord.Color.green()
+            )
+            
+            await btn_inter.response.send_message(embed=embed, ephemeral=True)
+        
+        button_add.callback = add_option_callback
+        button_finish.callback = finish_callback
+        
+        view = View(timeout=300)
+        view.add_item(button_add)
+        view.add_item(button_finish)
+        
+        embed = discord.Embed(
+            title="➕ Adicionar Opções",
+            description=f"**Painel:** {self.titulo_painel.value}\n\nClique em 'Adicionar Opção' para cada produto.",
+            color=discord.Color.blue()
+        )
+        
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+class CriarOpcaoDropModal(Modal):
+    def __init__(self, temp_id):
+        super().__init__(title="Adicionar Opção")
+        self.temp_id = temp_id
+        
+        self.nome_opcao = TextInput(label="Nome", placeholder="Ex: 10 SALAS", max_length=100)
+        self.descricao_opcao = TextInput(label="Descrição", placeholder="Ex: Valor: 2.90", max_length=100, required=False)
+        self.preco = TextInput(label="Preço (R$)", placeholder="Ex: 2.90", max_length=10)
+        self.emoji_opcao = TextInput(label="Emoji (opcional)", placeholder="Ex: 💰", required=False, max_length=10)
+        
+        self.add_item(self.nome_opcao)
+        self.add_item(self.descricao_opcao)
+        self.add_item(self.preco)
+        self.add_item(self.emoji_opcao)
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        if self.temp_id not in bot.temp_produtos_drop:
+            await interaction.response.send_message("❌ Erro: dados não encontrados!", ephemeral=True)
+            return
+        
+        opcao = {
+            'nome': self.nome_opcao.value,
+            'descricao': self.descricao_opcao.value if self.descricao_opcao.value else f"Valor: {self.preco.value}",
+            'preco': self.preco.value,
+            'emoji': self.emoji_opcao.value if self.emoji_opcao.value else '💎'
+        }
+        
+        bot.temp_produtos_drop[self.temp_id]['opcoes'].append(opcao)
+        
+        embed = discord.Embed(
+            title="✅ Opção Adicionada!",
+            description=f"**Nome:** {opcao['nome']}\n**Preço:** R$ {opcao['preco']}",
+            color=discord.Color.green()
+        )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ==========================================
+# POOL DE CANAIS DE CARRINHO
+# ==========================================
+
+# Canais ocultos criados de antemão na categoria de carrinhos: uma compra
+# pega um pronto (só renomeia e troca as permissões) e a reposição roda
+# em segundo plano, fora do caminho da interação
+CART_POOL_SIZE = int(os.getenv("CART_POOL_SIZE", "0"))  # 0 desativa
+CART_POOL_INTERVAL = 30  # segundos entre verificações da reposição
+POOL_NOME_CANAL = "reserva-carrinho"
+
+_pool_carrinhos = {}  # categoria_id -> deque de canais prontos
+_pool_repor = None
+_pool_task = None
+
+def _overwrites_pool(guild):
+    return {
+        guild.default_role: discord.PermissionOverwrite(read_messages=False),
+        guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+    }
+
+def _categorias_pool():
+    categorias = []
+    for guild_id, (categoria_id, modo) in list(_categorias_carrinho.items()):
+        guild = bot.get_guild(guild_id)
+        categoria = guild.get_channel(categoria_id) if guild else None
+        if isinstance(categoria, discord.CategoryChannel) and modo == CARRINHO_MODO_CANAL:
+            categorias.append(categoria)
+    return categorias
+
+def _adotar_canais_pool(categoria):
+    # Reaproveita canais de reserva que sobraram de uma execução anterior
+    pool = _pool_carrinhos[categoria.id] = deque(
+        canal for canal in categoria.text_channels
+        if canal.name == POOL_NOME_CANAL and canal.id not in carrinhos
+    )
+    return pool
+
+async def repor_pool(categoria):
+    pool = _pool_carrinhos.get(categoria.id)
+    if pool is None:
+        pool = _adotar_canais_pool(categoria)
+
+    while len(pool) < CART_POOL_SIZE:
+        try:
+            canal = await categoria.create_text_channel(name=POOL_NOME_CANAL, overwrites=_overwrites_pool(categoria.guild))
+        except discord.HTTPException as e:
+            print(f"❌ Erro ao repor pool de carrinhos em {categoria.name}: {e}")
+            return
+        pool.append(canal)
+
+async def _loop_pool():
+    while True:
+        for categoria in _categorias_pool():
+            await repor_pool(categoria)
+        try:
+            await asyncio.wait_for(_pool_repor.wait(), CART_POOL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _pool_repor.clear()
+
+def iniciar_pool_carrinhos():
+    global _pool_task, _pool_repor
+    if CART_POOL_SIZE > 0 and _pool_task is None:
+        _pool_repor = asyncio.Event()
+        _pool_task = asyncio.create_task(_loop_pool())
+
+def retirar_canal_pool(categoria):
+    pool = _pool_carrinhos.get(categoria.id)
+    if _pool_repor is not None:
+        _pool_repor.set()
+
+    while pool:
+        canal = pool.popleft()
+        if categoria.guild.get_channel(canal.id) is not None and canal.category_id == categoria.id:
+            return canal
+    return None
+
+# ==========================================
+# FUNÇÃO CRIAR CARRINHO
+# ==========================================
+
+@medido
+@com_prioridade(PRIORIDADE_CARRINHO)
+async def criar_carrinho(interaction, produto, prod_id):
+    guild = interaction.guild
+    user = interaction.user
+    config = config_da_guild(guild.id)
+    modo_thread = config['modo_carrinho'] == CARRINHO_MODO_THREAD
+    
+    if modo_thread:
+        canal_vendas = guild.get_channel(config['canal_vendas_id'] or 0)
+        
+        if not canal_vendas:
+            await interaction.response.send_message("❌ Canal de vendas não configurado! Use /setupcarrinho", ephemeral=True)
+            return
+    else:
+        if not config['categoria_id']:
+            await interaction.response.send_message("❌ Categoria não configurada! Use /setup", ephemeral=True)
+            return
+        
+        categoria = guild.get_channel(config['categoria_id'])
+        
+        if not categoria:
+            await interaction.response.send_message("❌ Categoria não encontrada!", ephemeral=True)
+            return
+    
+    # Criar a thread, editar o canal do pool ou criar um canal passam por bucket
+    # com rate limit e pelo agendador de saída: segura o prazo da interação antes
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    
+    numero = await proximo_numero_carrinho(guild.id)
+    nome_canal = f"🛒{user.name}-{numero}"
+    
+    if modo_thread:
+        # Thread privada: não conta no limite de canais e o comprador entra
+        # ao ser mencionado na primeira mensagem (sem chamada extra de add_user)
+        canal = await canal_vendas.create_thread(
+            name=nome_canal,
+            type=discord.ChannelType.private_thread,
+            invitable=False,
+            auto_archive_duration=10080
+        )
+    else:
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+            guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+        }
+        
+        canal = retirar_canal_pool(categoria)
+        
+        if canal is not None:
+            # Canal do pool: uma única edição em vez de criar do zero
+            await canal.edit(name=nome_canal, overwrites=overwrites)
+        else:
+            canal = await categoria.create_text_channel(name=nome_canal, overwrites=overwrites)
+    
+    embed_cart = embed_carrinho(produto, prod_id, user)
+    
+    view = view_persistente(
+        Button(label="💳 Ver PIX", style=discord.ButtonStyle.primary, custom_id=custom_id_componente('pix', prod_id)),
+        Button(label="✅ Aprovar", style=discord.ButtonStyle.success, custom_id=custom_id_componente('aprovar', user.id)),
+        Button(label="🔒 Fechar", style=discord.ButtonStyle.danger, custom_id=custom_id_componente('fechar'))
+    )
+    
+    await registrar_carrinho(canal, user, prod_id, produto)
+    await canal.send(f"{user.mention}", embed=embed_cart, view=view)
+    
+    if interaction.response.is_done():
+        await interaction.followup.send(f"✅ Carrinho criado! {canal.mention}", ephemeral=True)
+    else:
+        await interaction.response.send_message(f"✅ Carrinho criado! {canal.mention}", ephemeral=True)
+
+# ==========================================
+# CACHE DE RENDERIZAÇÃO
+# ==========================================
+
+# Embeds (como dict) e listas de SelectOption prontos por produto/drop,
+# carimbados com a versão do item: salvar_produto/salvar_produto_drop
+# incrementam a versão e a próxima renderização reconstrói só aquele item
+LISTA_PRODUTOS = "__produtos__"
+LISTA_DROPS = "__drops__"
+
+_versoes_render = {}  # item_id (ou lista) -> versão
+_render_cache = {}    # (tipo, ref) -> (versão, payload)
+_render_stats = {'hits': 0, 'misses': 0}
+
+def invalidar_render(item_id, lista):
+    _versoes_render[item_id] = _versoes_render.get(item_id, 0) + 1
+    _versoes_render[lista] = _versoes_render.get(lista, 0) + 1
+
+def _renderizar(tipo, ref, item_id, construir):
+    versao = _versoes_render.get(item_id, 0)
+    entrada = _render_cache.get((tipo, ref))
+    if entrada is not None and entrada[0] == versao:
+        _render_stats['hits'] += 1
+        return entrada[1]
+
+    _render_stats['misses'] += 1
+    payload = construir()
+    _render_cache[(tipo, ref)] = (versao, payload)
+    return payload
+
+def estatisticas_render():
+    return dict(_render_stats, entradas=len(_render_cache))
+
+def _item_do_produto(prod_id):
+    # Opções de drop ("drop_N_<índice>") seguem a versão do painel
+    return prod_id if prod_id in produtos else prod_id.rpartition('_')[0]
+
+def _embed_painel_produto(produto):
+    embed_produto = discord.Embed(
+        title=produto['titulo'],
+        description=produto['descricao'],
+        color=discord.Color.gold()
+    )
+    embed_produto.add_field(name="💰 Preço", value=f"R$ {produto['preco']}", inline=True)
+    
+    if produto.get('imagem_url'):
+        embed_produto.set_image(url=produto['imagem_url'])
+    
+    embed_produto.set_footer(text="Clique em 'Comprar' para iniciar sua compra!")
+    return embed_produto.to_dict()
+
+def _render_painel_drop(painel):
+    embed_painel = discord.Embed(
+        title=f"{painel['emoji_painel']} {painel['titulo_painel']}",
+        description=painel['descricao_painel'],
+        color=discord.Color.gold()
+    )
+    
+    if painel.get('imagem_url'):
+        embed_painel.set_image(url=painel['imagem_url'])
+    
+    embed_painel.set_footer(text="Selecione uma opção no menu abaixo!")
+    
+    opcoes_select = [
+        discord.SelectOption(
+            label=opcao['nome'],
+            value=str(i),
+            description=opcao['descricao'],
+            emoji=opcao['emoji']
+        )
+        for i, opcao in enumerate(painel['opcoes'][:25])
+    ]
+    return embed_painel.to_dict(), opcoes_select
+
+def _embed_carrinho_base(produto):
+    # Sem o campo do cliente, que muda a cada carrinho
+    embed_carrinho = discord.Embed(
+        title=f"🛒 Carrinho - {produto['titulo']}",
+        description=produto['descricao'],
+        color=discord.Color.blue()
+    )
+    
+    embed_carrinho.add_field(name="💰 Valor", value=f"R$ {produto['preco']}", inline=True)
+    
+    if produto.get('imagem_url'):
+        embed_carrinho.set_image(url=produto['imagem_url'])
+    
+    embed_carrinho.set_footer(text="Use os botões abaixo para gerenciar o pagamento")
+    return embed_carrinho.to_dict()
+
+def embed_carrinho(produto, prod_id, user):
+    payload = _renderizar('carrinho', prod_id, _item_do_produto(prod_id), lambda: _embed_carrinho_base(produto))
+    embed = discord.Embed.from_dict(payload)
+    embed.insert_field_at(1, name="👤 Cliente", value=user.mention, inline=True)
+    return embed
+
+def opcoes_produtos():
+    return _renderizar('opcoes', LISTA_PRODUTOS, LISTA_PRODUTOS, lambda: [
+        discord.SelectOption(label=prod['titulo'], value=prod_id, description=f"R$ {prod['preco']}")
+        for prod_id, prod in produtos.items()
+    ])
+
+def opcoes_drops():
+    return _renderizar('opcoes', LISTA_DROPS, LISTA_DROPS, lambda: [
+        discord.SelectOption(
+            label=drop['titulo_painel'],
+            value=drop_id,
+            description=f"{len(drop['opcoes'])} opções",
+            emoji=drop['emoji_painel']
+        )
+        for drop_id, drop in produtos_drop.items()
+    ])
+
+# ==========================================
+# ÍNDICE DE BUSCA (AUTOCOMPLETE)
+# ==========================================
+
+# Lista ordenada de (token, item_id) com os tokens do título e do ID de cada
+# item: uma busca por prefixo vira duas buscas binárias, sem varrer o catálogo
+AUTOCOMPLETE_MAX = 25
+
+def normalizar_busca(texto):
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+def tokens_busca(item_id, titulo):
+    tokens = set(re.findall(r'\w+', normalizar_busca(titulo)))
+    tokens.update(re.findall(r'[a-z0-9]+', normalizar_busca(item_id)))
+    tokens.add(normalizar_busca(item_id))
+    return tokens
+
+class IndiceBusca:
+    def __init__(self):
+        self.entradas = []  # (token, item_id), ordenada
+        self.tokens = {}    # item_id -> tokens indexados
+        self.titulos = {}   # item_id -> título exibido
+
+    def adicionar(self, item_id, titulo):
+        self.remover(item_id)
+        tokens = tokens_busca(item_id, titulo)
+        for token in tokens:
+            bisect.insort(self.entradas, (token, item_id))
+        self.tokens[item_id] = tokens
+        self.titulos[item_id] = titulo
+
+    def carregar(self, itens):
+        # Montagem inicial em lote: um único sort em vez de um insort por token
+        for item_id, titulo in itens:
+            tokens = tokens_busca(item_id, titulo)
+            self.entradas.extend((token, item_id) for token in tokens)
+            self.tokens[item_id] = tokens
+            self.titulos[item_id] = titulo
+        self.entradas.sort()
+
+    def remover(self, item_id):
+        for token in self.tokens.pop(item_id, ()):
+            i = bisect.bisect_left(self.entradas, (token, item_id))
+            if i < len(self.entradas) and self.entradas[i] == (token, item_id):
+                del self.entradas[i]
+        self.titulos.pop(item_id, None)
+
+    def _faixa(self, prefixo):
+        inicio = bisect.bisect_left(self.entradas, (prefixo,))
+        fim = bisect.bisect_left(self.entradas, (prefixo + '\U0010ffff',), inicio)
+        return inicio, fim
+
+    def buscar(self, consulta, limite=AUTOCOMPLETE_MAX):
+        termos = re.findall(r'\w+', normalizar_busca(consulta))
+        if not termos:
+            return list(itertools.islice(self.titulos.items(), limite))
+
+        # Percorre só a faixa do termo mais seletivo e confere os demais
+        faixas = sorted(((self._faixa(termo), termo) for termo in termos), key=lambda f: f[0][1] - f[0][0])
+        (inicio, fim), _ = faixas[0]
+        outros = [termo for _, termo in faixas[1:]]
+
+        resultado = {}
+        for i in range(inicio, fim):
+            item_id = self.entradas[i][1]
+            if item_id in resultado:
+                continue
+            tokens = self.tokens[item_id]
+            if all(any(t.startswith(termo) for t in tokens) for termo in outros):
+                resultado[item_id] = self.titulos[item_id]
+                if len(resultado) >= limite:
+                    break
+        return list(resultado.items())
+
+_indices_busca = {}
+
+def _titulo_indexado(lista, item_id):
+    if lista == LISTA_PRODUTOS:
+        return produtos[item_id]['titulo']
+    return produtos_drop[item_id]['titulo_painel']
+
+def indice_busca(lista):
+    # Montado na primeira busca; depois só recebe atualizações incrementais
+    indice = _indices_busca.get(lista)
+    if indice is None:
+        indice = _indices_busca[lista] = IndiceBusca()
+        catalogo = produtos if lista == LISTA_PRODUTOS else produtos_drop
+        indice.carregar((item_id, _titulo_indexado(lista, item_id)) for item_id in catalogo)
+    return indice
+
+def indexar_item(lista, item_id):
+    indice = _indices_busca.get(lista)
+    if indice is None:
+        return
+    catalogo = produtos if lista == LISTA_PRODUTOS else produtos_drop
+    if item_id in catalogo:
+        indice.adicionar(item_id, _titulo_indexado(lista, item_id))
+    else:
+        indice.remover(item_id)
+
+def escolhas_autocomplete(lista, atual):
+    return [
+        app_commands.Choice(name=f"{titulo} ({item_id})"[:100], value=item_id)
+        for item_id, titulo in indice_busca(lista).buscar(atual)
+    ]
+
+# ==========================================
+# COMPONENTES PERSISTENTES (CUSTOM_ID)
+# ==========================================
+
+# Botões e menus de painéis e carrinhos não guardam closures: o custom_id
+# carrega os IDs ("virex:<ação>:<arg>...") e um único roteador, registrado
+# uma vez, despacha pela tabela de rotas. Continuam funcionando após reinícios.
+COMPONENTE_PREFIXO = "virex"
+
+_rotas_componentes = {}  # ação -> handler(interaction, *args)
+
+def rota_componente(acao):
+    def decorator(func):
+        _rotas_componentes[acao] = medido(func, f"componente.{acao}")
+        return func
+    return decorator
+
+def custom_id_componente(acao, *args):
+    return ":".join((COMPONENTE_PREFIXO, acao, *map(str, args)))
+
+def view_persistente(*itens):
+    # A View só serializa os componentes; é parada antes do envio para não
+    # ficar presa no ViewStore (os cliques chegam pelo roteador)
+    view = View(timeout=None)
+    for item in itens:
+        view.add_item(item)
+    view.stop()
+    return view
+
+@bot.listen('on_interaction')
+async def roteador_componentes(interaction):
+    if interaction.type is not discord.InteractionType.component:
+        return
+
+    partes = interaction.data.get('custom_id', '').split(':')
+    if partes[0] != COMPONENTE_PREFIXO or len(partes) < 2:
+        return
+
+    handler = _rotas_componentes.get(partes[1])
+    if handler:
+        with prioridade_saida(PRIORIDADE_INTERACAO):
+            await handler(interaction, *partes[2:])
+
+def pode_gerenciar(member, guild):
+    return member.id == guild.owner_id or member.guild_permissions.administrator
+
+def produto_da_opcao_drop(drop_id, opcao_index):
+    painel = produtos_drop[drop_id]
+    opcao = painel['opcoes'][opcao_index]
+    return {
+        'titulo': f"{painel['titulo_painel']} - {opcao['nome']}",
+        'descricao': f"{painel['descricao_painel']}\n\n**Opção:** {opcao['nome']}",
+        'preco': opcao['preco'],
+        'imagem_url': painel.get('imagem_url'),
+        'tipo_imagem': painel.get('tipo_imagem', 'gif')
+    }
+
+def resolver_produto(prod_id):
+    # prod_id é um produto ("prod_N") ou uma opção de drop ("drop_N_<índice>")
+    if prod_id in produtos:
+        return produtos[prod_id]
+    drop_id, _, opcao_index = prod_id.rpartition('_')
+    if drop_id in produtos_drop and opcao_index.isdigit() and int(opcao_index) < len(produtos_drop[drop_id]['opcoes']):
+        return produto_da_opcao_drop(drop_id, int(opcao_index))
+    return None
+
+def montar_painel_produto(prod_id):
+    embed_produto = discord.Embed.from_dict(
+        _renderizar('painel', prod_id, prod_id, lambda: _embed_painel_produto(produtos[prod_id]))
+    )
+    
+    view_produto = view_persistente(
+        Button(label="🛒 Comprar", style=discord.ButtonStyle.success, custom_id=custom_id_componente('comprar', prod_id))
+    )
+    return embed_produto, view_produto
+
+def montar_painel_drop(drop_id):
+    embed_payload, opcoes_select = _renderizar('painel', drop_id, drop_id, lambda: _render_painel_drop(produtos_drop[drop_id]))
+    embed_painel = discord.Embed.from_dict(embed_payload)
+    
+    view_painel = view_persistente(
+        Select(placeholder="Selecione uma opção", options=list(opcoes_select), custom_id=custom_id_componente('drop', drop_id))
+    )
+    return embed_painel, view_painel
+
+@rota_componente('comprar')
+async def comprar_componente(interaction, prod_id):
+    if not await no_catalogo(prod_id, produtos):
+        await interaction.response.send_message("❌ Produto não encontrado!", ephemeral=True)
+        return
+    await criar_carrinho(interaction, produtos[prod_id], prod_id)
+
+@rota_componente('drop')
+async def drop_componente(interaction, drop_id):
+    opcao_index = int(interaction.data['values'][0])
+    if not await no_catalogo(drop_id, produtos_drop) or opcao_index >= len(produtos_drop[drop_id]['opcoes']):
+        await interaction.response.send_message("❌ Opção não encontrada!", ephemeral=True)
+        return
+    await criar_carrinho(interaction, produto_da_opcao_drop(drop_id, opcao_index), f"{drop_id}_{opcao_index}")
+
+@rota_componente('pix')
+@com_prioridade(PRIORIDADE_CARRINHO)
+async def pix_componente(interaction, prod_id):
+    produto = resolver_produto(prod_id)
+    embed_pix = discord.Embed(
+        title="💳 Informações PIX",
+        description=config_da_guild(interaction.guild.id)['pix_info'],
+        color=discord.Color.gold()
+    )
+    if produto:
+        embed_pix.add_field(name="💰 Valor", value=f"R$ {produto['preco']}", inline=False)
+    await interaction.response.send_message(embed=embed_pix, ephemeral=True)
+
+@rota_componente('aprovar')
+@com_prioridade(PRIORIDADE_CARRINHO)
+async def aprovar_componente(interaction, user_id):
+    if not pode_gerenciar(interaction.user, interaction.guild):
+        await interaction.response.send_message("❌ Apenas admins podem aprovar!", ephemeral=True)
+        return
+    
+    registro = carrinho_do_canal(interaction.channel.id)
+    if registro is not None and registro['status'] == CARRINHO_FECHANDO:
+        # Aprovar agora tiraria o carrinho do agendador e o fechamento se perderia
+        await interaction.response.send_message("❌ Este carrinho já está sendo fechado!", ephemeral=True)
+        return
+    ja_aprovado = registro is not None and registro['status'] == CARRINHO_APROVADO
+    await atualizar_carrinho(interaction.channel.id, status=CARRINHO_APROVADO)
+    await interaction.response.send_message(f"✅ Pagamento aprovado! <@{user_id}>, obrigado! 🎉")
+    if registro is not None and not ja_aprovado:
+        # Carrinhos de antes do livro não têm o valor já convertido
+        valor = registro.get('valor_centavos')
+        await registrar_venda(VENDA_APROVADA, interaction.channel.id, registro,
+                              valor if valor is not None else preco_em_centavos(registro.get('preco')))
+
+@rota_componente('fechar')
+@com_prioridade(PRIORIDADE_CARRINHO)
+async def fechar_componente(interaction):
+    if not pode_gerenciar(interaction.user, interaction.guild):
+        await interaction.response.send_message("❌ Apenas admins podem fechar!", ephemeral=True)
+        return
+    
+    # O fechamento fica com o agendador: nenhuma corrotina presa esperando
+    registro = await atualizar_carrinho(interaction.channel.id, status=CARRINHO_FECHANDO, expira_em=time.time() + CARRINHO_ATRASO_FECHAR)
+    if registro is None:
+        # Canal fora do registro (carrinho antigo): fecha na hora
+        await interaction.response.send_message("🔒 Fechando...")
+        try:
+            await arquivar_transcricao(interaction.channel, None)
+        except discord.HTTPException as e:
+            print(f"❌ Erro ao arquivar carrinho {interaction.channel.id}: {e}")
+        await fechar_canal_carrinho(interaction.channel)
+        return
+    agendar_carrinho(interaction.channel.id)
+    await interaction.response.send_message(f"🔒 Fechando em {CARRINHO_ATRASO_FECHAR} segundos...")
+
+# ==========================================
+# EXPIRAÇÃO E FECHAMENTO DE CARRINHOS
+# ==========================================
+
+# Cada carrinho tem um prazo absoluto ('expira_em', epoch) salvo no registro,
+# então sobrevive a reinícios. Um único loop dorme até o prazo mais próximo de
+# uma heap (entradas velhas são ignoradas ao sair dela). Carrinho aberto sem
+# mensagens recebe um aviso CARRINHO_AVISO_MIN antes do prazo e é fechado ao
+# vencer; "Fechar" só agenda o fechamento para daqui a CARRINHO_ATRASO_FECHAR.
+CARRINHO_EXPIRA_HORAS = int(os.getenv("VIREX_CARRINHO_EXPIRA_HORAS", "24"))
+CARRINHO_AVISO_MIN = int(os.getenv("VIREX_CARRINHO_AVISO_MIN", "60"))
+CARRINHO_ATRASO_FECHAR = 5
+CARRINHO_FECHAMENTOS_SIMULTANEOS = 4
+CARRINHO_TOQUE_MIN = 300  # atividade só regrava o prazo se ele andar mais que isso
+CARRINHO_TENTATIVAS_TRANSCRICAO = 5  # depois disso o carrinho fecha sem transcrição
+CARRINHO_RETENTAR_FECHAR = 60
+
+_prazos_carrinhos = []  # heap de (momento, channel_id)
+_acordar_expiracao = None
+_task_expiracao = None
+_limite_fechamentos = None
+_falhas_transcricao = {}  # channel_id -> envios de transcrição que falharam
+
+def horas_expiracao(guild_id):
+    horas = config_da_guild(guild_id).get('carrinho_expira_horas')
+    return CARRINHO_EXPIRA_HORAS if horas is None else horas
+
+def prazo_inatividade(guild_id):
+    horas = horas_expiracao(guild_id)
+    return time.time() + horas * 3600 if horas else None
+
+def _momento_acao(registro):
+    # Quando o agendador precisa agir neste carrinho (None: nada a fazer)
+    prazo = registro.get('expira_em')
+    if prazo is None or registro['status'] == CARRINHO_APROVADO:
+        return None
+    if registro['status'] == CARRINHO_ABERTO and not registro.get('avisado'):
+        horas = horas_expiracao(registro['guild_id'])
+        return prazo - min(CARRINHO_AVISO_MIN * 60, horas * 3600 / 2)
+    return prazo
+
+def agendar_carrinho(channel_id):
+    registro = carrinhos.get(channel_id)
+    momento = _momento_acao(registro) if registro else None
+    if momento is None:
+        return
+    if not _prazos_carrinhos or momento < _prazos_carrinhos[0][0]:
+        if _acordar_expiracao is not None:
+            _acordar_expiracao.set()
+    heapq.heappush(_prazos_carrinhos, (momento, channel_id))
+
+async def tocar_carrinho(channel_id):
+    # Mensagem no carrinho: empurra o prazo e cancela o aviso
+    registro = carrinhos.get(channel_id)
+    if registro is None or registro['status'] != CARRINHO_ABERTO:
+        return
+    prazo = prazo_inatividade(registro['guild_id'])
+    if prazo is None:
+        return
+    if registro.get('avisado') or prazo - (registro.get('expira_em') or 0) > CARRINHO_TOQUE_MIN:
+        await atualizar_carrinho(channel_id, expira_em=prazo, avisado=False)
+        agendar_carrinho(channel_id)
+
+async def _loop_expiracao():
+    global _acordar_expiracao
+    _acordar_expiracao = asyncio.Event()
+    while True:
+        _acordar_expiracao.clear()
+        agora = time.time()
+        while _prazos_carrinhos and _prazos_carrinhos[0][0] <= agora:
+            momento, channel_id = heapq.heappop(_prazos_carrinhos)
+            registro = carrinhos.get(channel_id)
+            if registro is None or _momento_acao(registro) != momento:
+                continue  # entrada antiga: carrinho removido, aprovado ou com prazo novo
+            if registro['status'] == CARRINHO_ABERTO and not registro.get('avisado'):
+                asyncio.create_task(_avisar_carrinho(channel_id, registro))
+            else:
+                asyncio.create_task(_fechar_carrinho_agendado(channel_id, registro))
+
+        espera = _prazos_carrinhos[0][0] - agora if _prazos_carrinhos else None
+        try:
+            await asyncio.wait_for(_acordar_expiracao.wait(), timeout=espera)
+        except asyncio.TimeoutError:
+            pass
+
+async def _canal_carrinho(channel_id):
+    canal = bot.get_channel(channel_id)
+    if canal is None:
+        try:
+            canal = await bot.fetch_channel(channel_id)  # threads arquivadas saem do cache
+        except discord.NotFound:
+            return None
+    return canal
+
+async def _avisar_carrinho(channel_id, registro):
+    await atualizar_carrinho(channel_id, avisado=True)
+    agendar_carrinho(channel_id)
+    canal = await _canal_carrinho(channel_id)
+    if canal is None:
+        await remover_carrinho(channel_id)
+        return
+    try:
+        await canal.send(
+            f"⏰ <@{registro['comprador_id']}>, este carrinho está sem atividade e será fechado "
+            f"<t:{int(registro['expira_em'])}:R>. Envie uma mensagem para mantê-lo aberto."
+        )
+    except discord.HTTPException as e:
+        print(f"❌ Erro ao avisar carrinho {channel_id}: {e}")
+
+async def fechar_canal_carrinho(canal, motivo=None):
+    if isinstance(canal, discord.Thread):
+        # Thread é arquivada e trancada em vez de apagada
+        if motivo:
+            await canal.send(motivo)
+        await canal.edit(archived=True, locked=True)
+    else:
+        await canal.delete()
+
+async def _fechar_carrinho_agendado(channel_id, registro):
+    async with _limite_fechamentos:
+        # Pode ter mudado enquanto esperava a vez (mensagem nova, aprovação)
+        momento = _momento_acao(registro)
+        if carrinhos.get(channel_id) is not registro or momento is None or momento > time.time():
+            if carrinhos.get(channel_id) is not registro:
+                _falhas_transcricao.pop(channel_id, None)
+            return
+        canal = await _canal_carrinho(channel_id)
+        try:
+            if canal is not None:
+                try:
+                    await arquivar_transcricao(canal, registro)
+                except discord.NotFound:
+                    pass  # canal de arquivo apagado ou carrinho já sumiu: o fechamento decide
+                except discord.HTTPException as e:
+                    falhas = _falhas_transcricao.get(channel_id, 0) + 1
+                    if falhas < CARRINHO_TENTATIVAS_TRANSCRICAO:
+                        _falhas_transcricao[channel_id] = falhas
+                        raise
+                    print(f"⚠️ Transcrição do carrinho {channel_id} falhou {falhas} vezes ({e}): fechando sem transcrição")
+                motivo = "🔒 Carrinho fechado por inatividade." if registro['status'] == CARRINHO_ABERTO else None
+                await fechar_canal_carrinho(canal, motivo)
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            # Tenta de novo mais tarde em vez de perder o fechamento
+            print(f"❌ Erro ao fechar carrinho {channel_id}: {e}")
+            await atualizar_carrinho(channel_id, expira_em=time.time() + CARRINHO_RETENTAR_FECHAR, avisado=True)
+            agendar_carrinho(channel_id)
+            return
+        _falhas_transcricao.pop(channel_id, None)
+        await remover_carrinho(channel_id)
+        await registrar_venda(VENDA_EXPIRADA if registro['status'] == CARRINHO_ABERTO else VENDA_FECHADA, channel_id, registro)
+
+async def iniciar_expiracao_carrinhos():
+    global _task_expiracao, _limite_fechamentos
+    if _task_expiracao is not None:
+        return
+    _limite_fechamentos = asyncio.Semaphore(CARRINHO_FECHAMENTOS_SIMULTANEOS)
+    for channel_id, registro in list(carrinhos.items()):
+        if bot.get_guild(registro['guild_id']) is None:
+            continue  # guild de outro processo do cluster
+        if registro.get('expira_em') is None:
+            # Carrinhos de antes da expiração: prazo conta a partir de agora
+            if registro['status'] == CARRINHO_FECHANDO:
+                await atualizar_carrinho(channel_id, expira_em=time.time())
+            elif registro['status'] == CARRINHO_ABERTO and prazo_inatividade(registro['guild_id']):
+                await atualizar_carrinho(channel_id, expira_em=prazo_inatividade(registro['guild_id']))
+        agendar_carrinho(channel_id)
+    _task_expiracao = asyncio.create_task(_loop_expiracao())
+
+# ==========================================
+# TRANSCRIÇÃO DOS CARRINHOS
+# ==========================================
+
+# Antes de apagar um carrinho, o histórico é paginado com async for (a API
+# entrega 100 mensagens por página) e cada mensagem vira uma linha JSON num
+# gzip sobre arquivo temporário: a memória fica em uma página e um anexo por
+# vez. Os anexos (comprovantes) vão dentro da transcrição em base64, já que os
+# links do CDN deixam de valer; perto do limite de upload da guild, só o link.
+TRANSCRICAO_MEMORIA = 2 * 1024 * 1024   # acima disso o arquivo temporário vai para o disco
+TRANSCRICAO_ANEXO_MAX = 8 * 1024 * 1024
+TRANSCRICAO_FOLGA = 0.8                 # fração do limite de upload usada antes de parar de embutir anexos
+TRANSCRICOES_SIMULTANEAS = 2
+
+_limite_transcricoes = None
+
+def _linha_transcricao(dados):
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b"\n"
+
+async def escrever_transcricao(canal, registro, destino, limite_bytes):
+    # Grava a transcrição em 'destino' (binário) e devolve (mensagens, anexos embutidos)
+    mensagens = anexos_embutidos = 0
+    with gzip.GzipFile(fileobj=destino, mode='wb') as gz:
+        gz.write(_linha_transcricao({
+            'tipo': 'carrinho',
+            'channel_id': canal.id,
+            'canal': canal.name,
+            'guild_id': canal.guild.id,
+            'registro': registro,
+            'exportado_em': now().isoformat(),
+        }))
+        async for message in canal.history(limit=None, oldest_first=True):
+            anexos = []
+            for anexo in message.attachments:
+                dados = {'nome': anexo.filename, 'url': anexo.url, 'tamanho': anexo.size, 'tipo': anexo.content_type}
+                if anexo.size <= TRANSCRICAO_ANEXO_MAX and destino.tell() + anexo.size * 4 // 3 < limite_bytes:
+                    try:
+                        dados['base64'] = base64.b64encode(await anexo.read()).decode('ascii')
+                        anexos_embutidos += 1
+                    except discord.HTTPException:
+                        pass  # fica só o link
+                anexos.append(dados)
+            gz.write(_linha_transcricao({
+                'id': message.id,
+                'em': message.created_at.isoformat(),
+                'autor_id': message.author.id,
+                'autor': str(message.author),
+                'conteudo': message.content,
+                'embeds': [embed.to_dict() for embed in message.embeds],
+                'anexos': anexos,
+            }))
+            mensagens += 1
+    return mensagens, anexos_embutidos
+
+async def arquivar_transcricao(canal, registro):
+    global _limite_transcricoes
+    config = config_da_guild(canal.guild.id)
+    arquivo_canal = canal.guild.get_channel(config.get('canal_arquivo_id') or 0)
+    if arquivo_canal is None:
+        return
+
+    if _limite_transcricoes is None:
+        _limite_transcricoes = asyncio.Semaphore(TRANSCRICOES_SIMULTANEAS)
+    async with _limite_transcricoes:
+        limite_bytes = int(canal.guild.filesize_limit * TRANSCRICAO_FOLGA)
+        with tempfile.SpooledTemporaryFile(max_size=TRANSCRICAO_MEMORIA) as destino:
+            try:
+                mensagens, anexos = await escrever_transcricao(canal, registro, destino, limite_bytes)
+            except discord.Forbidden:
+                print(f"⚠️ Sem permissão para ler o histórico de #{canal}: carrinho fechado sem transcrição")
+                return
+            tamanho = destino.tell()
+            destino.seek(0)
+
+            embed = discord.Embed(
+                title=f"🗂️ Transcrição de #{canal.name}",
+                color=discord.Color.dark_grey(),
+                timestamp=now()
+            )
+            if registro:
+                embed.add_field(name="Comprador", value=f"<@{registro['comprador_id']}>")
+                embed.add_field(name="Produto", value=str(registro.get('produto_id')))
+                embed.add_field(name="Status", value=registro['status'])
+            embed.add_field(name="Mensagens", value=str(mensagens))
+            embed.add_field(name="Anexos salvos", value=str(anexos))
+            embed.set_footer(text=f"{tamanho / 1024:.0f} KB (JSONL gzip)")
+
+            try:
+                await arquivo_canal.send(embed=embed, file=discord.File(destino, filename=f"carrinho-{canal.id}.jsonl.gz"))
+            except discord.Forbidden:
+                print(f"⚠️ Sem permissão para enviar em #{arquivo_canal}: carrinho fechado sem transcrição")
+
+# ==========================================
+# ENVIO DE LOGS EM LOTE
+# ==========================================
+
+# Cada canal de log tem sua fila: até 10 embeds viram uma única mensagem,
+# enviada quando o lote enche ou o intervalo vence
+LOG_BATCH_MAX_EMBEDS = 10
+LOG_BATCH_MAX_CHARS = 6000  # limite do Discord somando todos os embeds da mensagem
+LOG_BATCH_INTERVAL = float(os.getenv("LOG_BATCH_INTERVAL", "2"))
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "500"))
+LOG_BACKPRESSURE_TIMEOUT = 0.5  # quanto um handler espera por espaço antes de descartar
+
+class FilaLogs:
+    def __init__(self, canal):
+        self.canal = canal
+        self.fila = asyncio.Queue(maxsize=LOG_QUEUE_MAX)
+        self.sobra = None
+        self.lote = []
+        self.fechada = False
+        self.enviados = 0
+        self.mensagens = 0
+        self.descartados = 0
+        self.descartados_avisados = 0
+        self.task = asyncio.create_task(self._worker())
+
+    async def adicionar(self, embed):
+        try:
+            self.fila.put_nowait(embed)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self.fila.put(embed), LOG_BACKPRESSURE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.descartados += 1
+
+    async def _proximo(self, timeout):
+        if self.sobra is not None:
+            embed, self.sobra = self.sobra, None
+            return embed
+        if timeout is None:
+            return await self.fila.get()
+        if timeout <= 0:
+            return self.fila.get_nowait()
+        return await asyncio.wait_for(self.fila.get(), timeout)
+
+    async def _montar_lote(self, prazo):
+        # O lote em montagem fica na instância para não se perder se o worker for cancelado
+        loop = asyncio.get_running_loop()
+        if not self.lote:
+            self.lote.append(await self._proximo(None))
+        tamanho = sum(len(embed) for embed in self.lote)
+
+        while len(self.lote) < LOG_BATCH_MAX_EMBEDS:
+            try:
+                # Fechada (drenando): só o que já está na fila, sem esperar
+                embed = await self._proximo(0 if self.fechada else max(prazo - loop.time(), 0))
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if tamanho + len(embed) > LOG_BATCH_MAX_CHARS:
+                self.sobra = embed
+                break
+            self.lote.append(embed)
+            tamanho += len(embed)
+
+        lote, self.lote = self.lote, []
+        return lote
+
+    async def _enviar(self, lote):
+        aviso = None
+        if self.descartados > self.descartados_avisados:
+            aviso = f"⚠️ {self.descartados - self.descartados_avisados} logs descartados por excesso de volume"
+            self.descartados_avisados = self.descartados
+
+        try:
+            with prioridade_saida(PRIORIDADE_LOG):
+                await self.canal.send(content=aviso, embeds=lote)
+            self.enviados += len(lote)
+            self.mensagens += 1
+        except SaidaDescartada:
+            # Sem orçamento para logs agora: o lote é o primeiro a ser sacrificado
+            self.descartados += len(lote)
+        except discord.HTTPException as e:
+            self.descartados += len(lote)
+            print(f"❌ Erro ao enviar logs em #{self.canal}: {e}")
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while not self.fechada:
+            lote = await self._montar_lote(loop.time() + LOG_BATCH_INTERVAL)
+            await self._enviar(lote)
+
+    def pendentes(self):
+        return self.fila.qsize() + len(self.lote) + (self.sobra is not None)
+
+    async def drenar(self):
+        # wait_for (3.11) pode engolir o cancelamento, então a flag também encerra o worker
+        self.fechada = True
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        while self.pendentes():
+            await self._enviar(await self._montar_lote(asyncio.get_running_loop().time()))
+
+_filas_logs = {}  # channel_id -> FilaLogs
+
+async def enviar_log(canal, embed):
+    fila = _filas_logs.get(canal.id)
+    if fila is None:
+        fila = _filas_logs[canal.id] = FilaLogs(canal)
+    await fila.adicionar(embed)
+
+def descartar_fila_logs(channel_id):
+    fila = _filas_logs.pop(channel_id, None)
+    if fila is not None:
+        fila.task.cancel()
+
+def estatisticas_logs():
+    return {
+        channel_id: {
+            'pendentes': fila.pendentes(),
+            'enviados': fila.enviados,
+            'mensagens': fila.mensagens,
+            'descartados': fila.descartados
+        }
+        for channel_id, fila in _filas_logs.items()
+    }
+
+async def drenar_filas_logs(timeout=10):
+    filas = list(_filas_logs.values())
+    _filas_logs.clear()
+    try:
+        await asyncio.wait_for(asyncio.gather(*(fila.drenar() for fila in filas)), timeout)
+    except asyncio.TimeoutError:
+        print("⚠️ Nem todos os logs pendentes foram enviados antes de desligar")
+
+# ==========================================
+# ÍNDICE DE ADMINISTRADORES
+# ==========================================
+
+# guild_id -> IDs dos administradores humanos; montado uma vez por guild
+# e mantido pelos eventos de membro/cargo, para o aviso de comprovante
+# não percorrer a lista inteira de membros.
+# No modo enxuto não há cache de membros (nem on_member_update): o índice
+# vem de um chunk sob demanda, sem cache, e expira após ADMIN_INDEX_TTL.
+ADMIN_INDEX_TTL = 600
+
+_admins_por_guild = {}
+_admins_montado_em = {}
+_admins_montando = {}  # guild_id -> task do chunk em andamento
+
+def _eh_admin(member):
+    return member.guild_permissions.administrator and not member.bot
+
+async def _montar_admins(guild):
+    membros = await guild.chunk(cache=False) if MODO_ENXUTO else guild.members
+    _admins_por_guild[guild.id] = {m.id for m in membros if _eh_admin(m)}
+    _admins_montado_em[guild.id] = time.monotonic()
+    return _admins_por_guild[guild.id]
+
+async def admins_da_guild(guild):
+    admins = _admins_por_guild.get(guild.id)
+    expirado = MODO_ENXUTO and time.monotonic() - _admins_montado_em.get(guild.id, 0) > ADMIN_INDEX_TTL
+    if admins is not None and not expirado:
+        return admins
+
+    # Vários comprovantes ao mesmo tempo compartilham o mesmo chunk
+    task = _admins_montando.get(guild.id)
+    if task is None:
+        task = _admins_montando[guild.id] = asyncio.create_task(_montar_admins(guild))
+        task.add_done_callback(lambda _: _admins_montando.pop(guild.id, None))
+    return await task
+
+def atualizar_admin(member):
+    admins = _admins_por_guild.get(member.guild.id)
+    if admins is None:
+        return
+    if _eh_admin(member):
+        admins.add(member.id)
+    else:
+        admins.discard(member.id)
+
+def invalidar_admins(guild):
+    # Mudança de permissão em cargo: reconstrói na próxima consulta
+    _admins_por_guild.pop(guild.id, None)
+    _admins_montado_em.pop(guild.id, None)
+
+async def mencoes_comprovante(guild):
+    mencoes = [f"<@{guild.owner_id}>"]
+    config = config_da_guild(guild.id)['notificadores']
+
+    if config.get('cargo') or config.get('membros'):
+        if config.get('cargo'):
+            mencoes.append(f"<@&{config['cargo']}>")
+        mencoes += [f"<@{uid}>" for uid in config.get('membros', []) if uid != guild.owner_id]
+    else:
+        admins = [uid for uid in await admins_da_guild(guild) if uid != guild.owner_id]
+        mencoes += [f"<@{uid}>" for uid in admins[:3]]
+
+    return " ".join(mencoes)
+
+@bot.event
+async def on_member_update(before, after):
+    if before.roles != after.roles:
+        atualizar_admin(after)
+
+@bot.listen('on_raw_member_remove')
+async def remover_admin_indice(payload):
+    admins = _admins_por_guild.get(payload.guild_id)
+    if admins is not None:
+        admins.discard(payload.user.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.permissions.administrator != after.permissions.administrator:
+        invalidar_admins(after.guild)
+
+@bot.event
+async def on_guild_role_delete(role):
+    if role.permissions.administrator:
+        invalidar_admins(role.guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    invalidar_admins(guild)
+    descartar_raid(guild.id)
+    _armazens_conteudo.pop(guild.id, None)
+    descartar_sessoes_voz(guild.id)
+    _categorias_carrinho.pop(guild.id, None)
+
+# ==========================================
+# MODO RAID (ENTRADAS E SAÍDAS)
+# ==========================================
+
+# Acima do limite de eventos por janela, entradas/saídas deixam de gerar um
+# embed cada: viram um resumo por intervalo (contagem, idade das contas,
+# amostra de menções) com a lista completa em anexo. O modo desliga sozinho
+# quando o ritmo cai abaixo da metade do limite.
+RAID_LIMITE_PADRAO = int(os.getenv("VIREX_RAID_LIMITE", "10"))
+RAID_JANELA = 10.0              # segundos considerados no ritmo
+RAID_RESUMO_INTERVALO = 15.0    # segundos entre resumos enquanto o modo está ativo
+RAID_AMOSTRA_MENCOES = 20
+RAID_MAX_MEMBROS_RESUMO = 20000  # acima disso, o resumo só conta
+
+FAIXAS_IDADE_CONTA = (
+    (3600, "< 1 hora"),
+    (86400, "< 1 dia"),
+    (7 * 86400, "< 7 dias"),
+    (30 * 86400, "< 30 dias"),
+    (365 * 86400, "< 1 ano"),
+    (None, "≥ 1 ano"),
+)
+
+TITULOS_RAID = {'join': "🚨 Modo raid: entradas", 'leave': "🚨 Modo raid: saídas"}
+
+def limite_raid(guild_id):
+    limite = config_da_guild(guild_id).get('raid_limite')
+    return RAID_LIMITE_PADRAO if limite is None else limite
+
+class AgregadorRaid:
+    def __init__(self, guild_id, tipo):
+        self.guild_id = guild_id
+        self.tipo = tipo
+        self.recentes = deque()  # instantes dos eventos dentro da janela
+        self.ativo = False
+        self.limite = 0
+        self.membros = []        # (id, nome, criada_em) desde o último resumo
+        self.excedentes = 0
+        self.inicio = None
+        self.task = None
+
+    def _podar(self, agora):
+        while self.recentes and agora - self.recentes[0] > RAID_JANELA:
+            self.recentes.popleft()
+
+    def registrar(self, usuario, limite):
+        # True se o evento foi agregado (o handler não deve logar individualmente)
+        agora = time.monotonic()
+        self.recentes.append(agora)
+        self._podar(agora)
+
+        if not self.ativo:
+            if not limite or len(self.recentes) < limite:
+                return False
+            self.ativo = True
+            self.limite = limite
+            self.inicio = now()
+            self.task = asyncio.create_task(self._loop())
+
+        if len(self.membros) < RAID_MAX_MEMBROS_RESUMO:
+            self.membros.append((usuario.id, str(usuario), usuario.created_at))
+        else:
+            self.excedentes += 1
+        return True
+
+    async def _loop(self):
+        while self.ativo:
+            await asyncio.sleep(RAID_RESUMO_INTERVALO)
+            self._podar(time.monotonic())
+            encerrou = len(self.recentes) < self.limite / 2
+            membros, excedentes = self.membros, self.excedentes
+            self.membros, self.excedentes = [], 0
+            if encerrou:
+                self.ativo = False
+                self.task = None
+            if membros or excedentes or encerrou:
+                await self._enviar_resumo(membros, excedentes, encerrou)
+
+    async def _enviar_resumo(self, membros, excedentes, encerrou):
+        canal = get_log_channel(self.guild_id, self.tipo)
+        if not canal:
+            return
+
+        agora = now()
+        if not membros and not excedentes:
             embed = discord.Embed(
-                title="✅ Dropdown Criado!",
-                description=f"**ID:** {drop_id}\n**Opções:** {len(produtos_drop[drop_id]['opcoes'])}",
-                color=discord.Color.green()
+                title=TITULOS_RAID[self.tipo].replace("🚨", "✅"),
+                description=f"Ritmo normalizado: modo raid encerrado (ativo desde <t:{int(self.inicio.timestamp())}:T>), logs individuais retomados",
+                color=discord.Color.green(),
+                timestamp=agora
             )
-            
-            await btn_inter.response.send_message(embed=embed, ephemeral=True)
-        
-        button_add.callback = add_option_callback
-        button_finish.callback = finish_callback
-        
-        view = View(timeout=300)
-        view.add_item(button_add)
-        view.add_item(button_finish)
-        
-        embed = discord.Embed(
-            title="➕ Adicionar Opções",
-            description=f"**Painel:** {self.titulo_painel.value}\n\nClique em 'Adicionar Opção' para cada produto.",
-            color=discord.Color.blue()
+            arquivo = None
+        else:
+            embed, arquivo = self._montar_resumo(membros, excedentes, encerrou, agora)
+
+        try:
+            with prioridade_saida(PRIORIDADE_LOG):
+                if arquivo is None:
+                    await canal.send(embed=embed)
+                else:
+                    await canal.send(embed=embed, file=arquivo)
+        except SaidaDescartada:
+            pass
+        except discord.HTTPException as e:
+            print(f"❌ Erro ao enviar resumo de raid em #{canal}: {e}")
+
+    def _montar_resumo(self, membros, excedentes, encerrou, agora):
+        faixas = [0] * len(FAIXAS_IDADE_CONTA)
+        for _, _, criada_em in membros:
+            idade = (agora - criada_em).total_seconds()
+            for i, (limite, _) in enumerate(FAIXAS_IDADE_CONTA):
+                if limite is None or idade < limite:
+                    faixas[i] += 1
+                    break
+
+        maior = max(faixas) or 1
+        histograma = "\n".join(
+            f"`{rotulo:<10}` {'█' * max(1, round(12 * n / maior)) if n else '·'} {n}"
+            for (_, rotulo), n in zip(FAIXAS_IDADE_CONTA, faixas)
         )
-        
-        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        total = len(membros) + excedentes
 
-class CriarOpcaoDropModal(Modal):
-    def __init__(self, temp_id):
-        super().__init__(title="Adicionar Opção")
-        self.temp_id = temp_id
-        
-        self.nome_opcao = TextInput(label="Nome", placeholder="Ex: 10 SALAS", max_length=100)
-        self.descricao_opcao = TextInput(label="Descrição", placeholder="Ex: Valor: 2.90", max_length=100, required=False)
-        self.preco = TextInput(label="Preço (R$)", placeholder="Ex: 2.90", max_length=10)
-        self.emoji_opcao = TextInput(label="Emoji (opcional)", placeholder="Ex: 💰", required=False, max_length=10)
-        
-        self.add_item(self.nome_opcao)
-        self.add_item(self.descricao_opcao)
-        self.add_item(self.preco)
-        self.add_item(self.emoji_opcao)
-    
-    async def on_submit(self, interaction: discord.Interaction):
-        if self.temp_id not in bot.temp_produtos_drop:
-            await interaction.response.send_message("❌ Erro: dados não encontrados!", ephemeral=True)
-            return
-        
-        opcao = {
-            'nome': self.nome_opcao.value,
-            'descricao': self.descricao_opcao.value if self.descricao_opcao.value else f"Valor: {self.preco.value}",
-            'preco': self.preco.value,
-            'emoji': self.emoji_opcao.value if self.emoji_opcao.value else '💎'
-        }
-        
-        bot.temp_produtos_drop[self.temp_id]['opcoes'].append(opcao)
-        
         embed = discord.Embed(
-            title="✅ Opção Adicionada!",
-            description=f"**Nome:** {opcao['nome']}\n**Preço:** R$ {opcao['preco']}",
-            color=discord.Color.green()
+            title=f"{TITULOS_RAID[self.tipo]} ({total} em {int(RAID_RESUMO_INTERVALO)}s)",
+            description=f"Modo raid ativo desde <t:{int(self.inicio.timestamp())}:T>",
+            color=discord.Color.dark_orange(),
+            timestamp=agora
         )
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed.add_field(name="Idade das contas", value=histograma, inline=False)
+        amostra = " ".join(f"<@{user_id}>" for user_id, _, _ in membros[:RAID_AMOSTRA_MENCOES])
+        embed.add_field(name=f"Amostra ({min(len(membros), RAID_AMOSTRA_MENCOES)} de {total})", value=amostra or "—", inline=False)
+        if encerrou:
+            embed.set_footer(text="Ritmo normalizado: modo raid encerrado, logs individuais retomados")
+
+        linhas = [f"{user_id}\t{nome}\t{criada_em.isoformat()}" for user_id, nome, criada_em in membros]
+        if excedentes:
+            linhas.append(f"# +{excedentes} eventos não listados")
+        arquivo = discord.File(
+            io.BytesIO(("id\tusuario\tconta_criada_em\n" + "\n".join(linhas) + "\n").encode('utf-8')),
+            filename=f"{self.tipo}-{agora.strftime('%Y%m%d-%H%M%S')}.tsv"
+        )
+        return embed, arquivo
+
+_agregadores_raid = {}  # (guild_id, tipo) -> AgregadorRaid
+
+def agregar_raid(guild_id, tipo, usuario):
+    agregador = _agregadores_raid.get((guild_id, tipo))
+    if agregador is None:
+        agregador = _agregadores_raid[(guild_id, tipo)] = AgregadorRaid(guild_id, tipo)
+    return agregador.registrar(usuario, limite_raid(guild_id))
+
+async def drenar_raids():
+    # Envia os resumos pendentes (desligamento e testes de carga)
+    for agregador in list(_agregadores_raid.values()):
+        if agregador.task is not None:
+            agregador.task.cancel()
+            agregador.task = None
+        membros, excedentes = agregador.membros, agregador.excedentes
+        agregador.membros, agregador.excedentes = [], 0
+        encerrou, agregador.ativo = agregador.ativo, False
+        agregador.recentes.clear()
+        if membros or excedentes:
+            await agregador._enviar_resumo(membros, excedentes, encerrou)
+
+def descartar_raid(guild_id):
+    for tipo in TITULOS_RAID:
+        agregador = _agregadores_raid.pop((guild_id, tipo), None)
+        if agregador is not None and agregador.task is not None:
+            agregador.task.cancel()
 
 # ==========================================
-# FUNÇÃO CRIAR CARRINHO
+# ARMAZÉM DE CONTEÚDO DE MENSAGENS
 # ==========================================
 
-async def criar_carrinho(interaction, produto, prod_id):
-    guild = interaction.guild
-    user = interaction.user
-    
-    if not vendas_config.get('categoria_id'):
-        await interaction.response.send_message("❌ Categoria não configurada! Use /setup", ephemeral=True)
-        return
-    
-    categoria = guild.get_channel(vendas_config['categoria_id'])
-    
-    if not categoria:
-        await interaction.response.send_message("❌ Categoria não encontrada!", ephemeral=True)
-        return
-    
-    if str(guild.id) not in vendas_config['contador_carrinhos']:
-        vendas_config['contador_carrinhos'][str(guild.id)] = 0
-    
-    numero = vendas_config['contador_carrinhos'][str(guild.id)]
-    vendas_config['contador_carrinhos'][str(guild.id)] += 1
-    save_vendas_config(vendas_config)
-    
-    overwrites = {
-        guild.default_role: discord.PermissionOverwrite(read_messages=False),
-        user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-        guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
-    }
-    
-    nome_canal = f"🛒{user.name}-{numero}"
-    canal = await categoria.create_text_channel(name=nome_canal, overwrites=overwrites)
-    
-    embed_carrinho = discord.Embed(
-        title=f"🛒 Carrinho - {produto['titulo']}",
-        description=produto['descricao'],
-        color=discord.Color.blue()
-    )
-    
-    embed_carrinho.add_field(name="💰 Valor", value=f"R$ {produto['preco']}", inline=True)
-    embed_carrinho.add_field(name="👤 Cliente", value=user.mention, inline=True)
-    
-    if produto.get('imagem_url'):
-        embed_carrinho.set_image(url=produto['imagem_url'])
-    
-    embed_carrinho.set_footer(text="Use os botões abaixo para gerenciar o pagamento")
-    
-    pix_btn = Button(label="💳 Ver PIX", style=discord.ButtonStyle.primary)
-    aprovar_btn = Button(label="✅ Aprovar", style=discord.ButtonStyle.success)
-    fechar_btn = Button(label="🔒 Fechar", style=discord.ButtonStyle.danger)
-    
-    async def pix_callback(btn_inter):
-        embed_pix = discord.Embed(
-            title="💳 Informações PIX",
-            description=vendas_config.get('pix_info', 'Configure o PIX com /setup'),
-            color=discord.Color.gold()
-        )
-        embed_pix.add_field(name="💰 Valor", value=f"R$ {produto['preco']}", inline=False)
-        await btn_inter.response.send_message(embed=embed_pix, ephemeral=True)
-    
-    async def aprovar_callback(btn_inter):
-        if btn_inter.user.id != guild.owner_id and not btn_inter.user.guild_permissions.administrator:
-            await btn_inter.response.send_message("❌ Apenas admins podem aprovar!", ephemeral=True)
+# on_message_delete/on_message_edit só disparam para mensagens ainda no cache
+# do discord.py (1000 objetos Message completos). Aqui cada guild com log de
+# apagadas/editadas guarda só o necessário (autor, canal, texto e anexos) num
+# buffer circular limitado em bytes; as mais antigas saem primeiro.
+CONTEUDO_BYTES_GUILD = int(os.getenv("VIREX_CONTEUDO_BYTES", str(2 * 1024 * 1024)))
+CONTEUDO_ZLIB = os.getenv("VIREX_CONTEUDO_ZLIB") == "1"
+CONTEUDO_ZLIB_MIN = 96      # textos menores não compensam a compressão
+CONTEUDO_OVERHEAD = 150     # estimativa por entrada no OrderedDict (chave, nó e objeto bytes)
+CONTEUDO_FRACAO_ENTRADA = 4 # uma entrada ocupa no máximo 1/4 do orçamento; o excesso do texto é cortado
+
+# Cada entrada é um único bytes: cabeçalho (autor, canal, comprimido) + texto
+_CABECALHO_CONTEUDO = struct.Struct('<QQB')
+
+class ArmazemConteudo:
+    __slots__ = ('mensagens', 'bytes', 'limite', 'max_dados', 'descartadas')
+
+    def __init__(self, limite):
+        self.mensagens = OrderedDict()  # message_id -> bytes, da mais antiga para a mais nova
+        self.bytes = 0
+        self.limite = limite
+        self.max_dados = max(0, limite / CONTEUDO_FRACAO_ENTRADA - CONTEUDO_OVERHEAD - _CABECALHO_CONTEUDO.size)
+        self.descartadas = 0
+
+    def _codificar(self, autor_id, canal_id, conteudo, anexos):
+        dados = "\x00".join((conteudo, *anexos)).encode('utf-8')
+        if len(dados) > self.max_dados:
+            # Corta sem deixar caractere UTF-8 pela metade
+            dados = dados[:int(self.max_dados)].decode('utf-8', 'ignore').encode('utf-8')
+        comprimido = False
+        if CONTEUDO_ZLIB and len(dados) >= CONTEUDO_ZLIB_MIN:
+            reduzido = zlib.compress(dados, 6)
+            if len(reduzido) < len(dados):
+                comprimido, dados = True, reduzido
+        return _CABECALHO_CONTEUDO.pack(autor_id, canal_id, comprimido) + dados
+
+    @staticmethod
+    def _decodificar(registro):
+        autor_id, canal_id, comprimido = _CABECALHO_CONTEUDO.unpack_from(registro)
+        dados = registro[_CABECALHO_CONTEUDO.size:]
+        conteudo, *anexos = (zlib.decompress(dados) if comprimido else dados).decode('utf-8').split("\x00")
+        return {'autor_id': autor_id, 'canal_id': canal_id, 'conteudo': conteudo, 'anexos': anexos}
+
+    def guardar(self, message_id, autor_id, canal_id, conteudo, anexos=()):
+        self.remover(message_id)
+        registro = self._codificar(autor_id, canal_id, conteudo, anexos)
+        self.mensagens[message_id] = registro
+        self.bytes += len(registro) + CONTEUDO_OVERHEAD
+        self._despejar(message_id)
+
+    def _despejar(self, manter):
+        # Nunca descarta a entrada que acabou de ser escrita: como ela cabe em
+        # 1/CONTEUDO_FRACAO_ENTRADA do orçamento, as outras cobrem o excesso
+        while self.bytes > self.limite and len(self.mensagens) > 1:
+            antigo_id = next(iter(self.mensagens))
+            if antigo_id == manter:
+                self.mensagens.move_to_end(manter)
+                continue
+            antigo = self.mensagens.pop(antigo_id)
+            self.bytes -= len(antigo) + CONTEUDO_OVERHEAD
+            self.descartadas += 1
+
+    def atualizar(self, message_id, conteudo):
+        # Edição mantém autor, canal, anexos e a posição no buffer
+        registro = self.mensagens.get(message_id)
+        if registro is None:
             return
-        
-        await btn_inter.response.send_message(f"✅ Pagamento aprovado! {user.mention}, obrigado! 🎉")
-    
-    async def fechar_callback(btn_inter):
-        if btn_inter.user.id != guild.owner_id and not btn_inter.user.guild_permissions.administrator:
-            await btn_inter.response.send_message("❌ Apenas admins podem fechar!", ephemeral=True)
+        dados = self._decodificar(registro)
+        novo = self._codificar(dados['autor_id'], dados['canal_id'], conteudo, dados['anexos'])
+        self.mensagens[message_id] = novo
+        self.bytes += len(novo) - len(registro)
+        self._despejar(message_id)  # edição maior pode passar do limite
+
+    def obter(self, message_id):
+        registro = self.mensagens.get(message_id)
+        return self._decodificar(registro) if registro is not None else None
+
+    def remover(self, message_id):
+        registro = self.mensagens.pop(message_id, None)
+        if registro is not None:
+            self.bytes -= len(registro) + CONTEUDO_OVERHEAD
+        return registro
+
+_armazens_conteudo = {}  # guild_id -> ArmazemConteudo
+
+def guardar_conteudo(message):
+    guild_id = message.guild.id
+    armazem = _armazens_conteudo.get(guild_id)
+    if armazem is None:
+        # Só guilds que de fato logam apagadas/editadas gastam memória
+        if not (get_log_channel(guild_id, "delete") or get_log_channel(guild_id, "edit")):
             return
-        
-        await btn_inter.response.send_message("🔒 Fechando em 5 segundos...")
-        await asyncio.sleep(5)
-        await canal.delete()
-    
-    pix_btn.callback = pix_callback
-    aprovar_btn.callback = aprovar_callback
-    fechar_btn.callback = fechar_callback
-    
-    view = View(timeout=None)
-    view.add_item(pix_btn)
-    view.add_item(aprovar_btn)
-    view.add_item(fechar_btn)
-    
-    await canal.send(f"{user.mention}", embed=embed_carrinho, view=view)
-    await interaction.response.send_message(f"✅ Carrinho criado! {canal.mention}", ephemeral=True)
+        armazem = _armazens_conteudo[guild_id] = ArmazemConteudo(CONTEUDO_BYTES_GUILD)
+    anexos = [anexo.url for anexo in message.attachments]
+    if message.content or anexos:
+        armazem.guardar(message.id, message.author.id, message.channel.id, message.content, anexos)
+
+def retirar_conteudo(guild_id, message_id):
+    # Registro da mensagem apagada (e libera o espaço), ou None se não guardada
+    armazem = _armazens_conteudo.get(guild_id)
+    if armazem is None:
+        return None
+    registro = armazem.obter(message_id)
+    armazem.remover(message_id)
+    return registro
+
+def conteudo_guardado(guild_id, message_id):
+    armazem = _armazens_conteudo.get(guild_id)
+    return armazem.obter(message_id) if armazem is not None else None
+
+def atualizar_conteudo(guild_id, message_id, conteudo):
+    armazem = _armazens_conteudo.get(guild_id)
+    if armazem is not None:
+        armazem.atualizar(message_id, conteudo)
+
+def registro_da_mensagem(message):
+    return {
+        'autor_id': message.author.id,
+        'canal_id': message.channel.id,
+        'conteudo': message.content,
+        'anexos': [anexo.url for anexo in message.attachments],
+    }
+
+def estatisticas_conteudo():
+    return {
+        guild_id: {'mensagens': len(a.mensagens), 'bytes': a.bytes, 'descartadas': a.descartadas}
+        for guild_id, a in _armazens_conteudo.items()
+    }
+
+def limitar_campo(texto, vazio):
+    # Campos de embed aceitam no máximo 1024 caracteres
+    if not texto:
+        return vazio
+    return texto if len(texto) <= 1024 else texto[:1021] + "..."
+
+# ==========================================
+# SESSÕES DE VOZ
+# ==========================================
+
+# Em vez de um log por mudança de estado, cada passagem de um membro pela voz
+# vira uma sessão: trocas de canal entram no trajeto e uma saída seguida de
+# volta dentro de VOZ_DEBOUNCE segundos (queda de conexão, troca rápida) não
+# encerra nada. O log sai uma vez, quando a sessão termina de fato.
+VOZ_DEBOUNCE = float(os.getenv("VIREX_VOZ_DEBOUNCE", "30"))
+VOZ_MAX_TRAJETO = 10      # canais listados no log; o resto só entra na contagem
+VOZ_TOP_MEMBROS = 5
+
+INICIO_ESTATISTICAS_VOZ = now()
+
+class SessaoVoz:
+    __slots__ = ('guild_id', 'member_id', 'inicio', 'conectado_desde', 'segundos',
+                 'trajeto', 'movimentos', 'reconexoes', 'retomada', 'encerramento')
+
+    def __init__(self, guild_id, member_id, canal_id, retomada=False):
+        self.guild_id = guild_id
+        self.member_id = member_id
+        self.inicio = now()
+        self.conectado_desde = time.monotonic()
+        self.segundos = 0.0
+        self.trajeto = [canal_id]
+        self.movimentos = 0
+        self.reconexoes = 0
+        self.retomada = retomada   # já estava em call quando o bot iniciou
+        self.encerramento = None   # TimerHandle do debounce da saída
+
+    def mover(self, canal_id):
+        if self.trajeto[-1] == canal_id:
+            return
+        self.movimentos += 1
+        if len(self.trajeto) < VOZ_MAX_TRAJETO:
+            self.trajeto.append(canal_id)
+
+    def sair(self):
+        self.segundos += time.monotonic() - self.conectado_desde
+        self.conectado_desde = None
+
+    def duracao(self):
+        if self.conectado_desde is None:
+            return self.segundos
+        return self.segundos + time.monotonic() - self.conectado_desde
+
+    def voltar(self, canal_id):
+        self.encerramento.cancel()
+        self.encerramento = None
+        self.reconexoes += 1
+        self.conectado_desde = time.monotonic()
+        self.mover(canal_id)
+
+_sessoes_voz = {}       # (guild_id, member_id) -> SessaoVoz
+_estatisticas_voz = {}  # guild_id -> {'segundos', 'sessoes', 'por_membro': Counter}
+
+def registrar_estado_voz(member, before, after):
+    if before.channel == after.channel:
+        return  # mute, deafen, stream etc.
+
+    chave = (member.guild.id, member.id)
+    sessao = _sessoes_voz.get(chave)
+
+    if after.channel is not None:
+        if sessao is None:
+            _sessoes_voz[chave] = SessaoVoz(member.guild.id, member.id, after.channel.id)
+        elif sessao.encerramento is not None:
+            sessao.voltar(after.channel.id)
+        else:
+            sessao.mover(after.channel.id)
+    elif sessao is not None and sessao.encerramento is None:
+        sessao.sair()
+        sessao.encerramento = asyncio.get_running_loop().call_later(VOZ_DEBOUNCE, _encerrar_sessao_voz, chave)
+
+def _encerrar_sessao_voz(chave):
+    sessao = _sessoes_voz.pop(chave, None)
+    if sessao is None:
+        return
+
+    stats = _estatisticas_voz.setdefault(sessao.guild_id, {'segundos': 0.0, 'sessoes': 0, 'por_membro': Counter()})
+    stats['segundos'] += sessao.segundos
+    stats['sessoes'] += 1
+    stats['por_membro'][sessao.member_id] += sessao.segundos
+
+    channel = get_log_channel(sessao.guild_id, "voice")
+    if channel:
+        asyncio.create_task(enviar_log(channel, embed_sessao_voz(sessao)))
+
+def embed_sessao_voz(sessao):
+    minutos, segundos = divmod(int(sessao.segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    duracao = f"{horas}h {minutos:02d}min" if horas else f"{minutos}min {segundos:02d}s"
+
+    trajeto = " → ".join(f"<#{canal_id}>" for canal_id in sessao.trajeto)
+    if sessao.movimentos >= VOZ_MAX_TRAJETO:
+        trajeto += " → …"
+
+    embed = discord.Embed(
+        description=f"🎙️ <@{sessao.member_id}> ficou **{duracao}** em call",
+        color=discord.Color.blurple(),
+        timestamp=now()
+    )
+    embed.add_field(name="Trajeto", value=limitar_campo(trajeto, "-"), inline=False)
+    embed.add_field(name="Entrada", value=f"<t:{int(sessao.inicio.timestamp())}:T>")
+    if sessao.movimentos:
+        embed.add_field(name="Trocas de canal", value=str(sessao.movimentos))
+    if sessao.reconexoes:
+        embed.add_field(name="Reconexões", value=str(sessao.reconexoes))
+    if sessao.retomada:
+        embed.set_footer(text="Já estava em call quando o bot iniciou: duração parcial")
+    return embed
+
+def retomar_sessoes_voz():
+    # Quem já está em call no login ganha uma sessão (sem o tempo anterior)
+    for guild in bot.guilds:
+        for canal in guild.voice_channels + guild.stage_channels:
+            for member_id in canal.voice_states:
+                chave = (guild.id, member_id)
+                if member_id != bot.user.id and chave not in _sessoes_voz:
+                    _sessoes_voz[chave] = SessaoVoz(guild.id, member_id, canal.id, retomada=True)
+
+def descartar_sessoes_voz(guild_id):
+    for chave in [chave for chave in _sessoes_voz if chave[0] == guild_id]:
+        sessao = _sessoes_voz.pop(chave)
+        if sessao.encerramento is not None:
+            sessao.encerramento.cancel()
+    _estatisticas_voz.pop(guild_id, None)
+
+def estatisticas_voz(guild_id):
+    stats = _estatisticas_voz.get(guild_id, {'segundos': 0.0, 'sessoes': 0, 'por_membro': Counter()})
+    # Sessões em andamento entram com o tempo até agora
+    abertas = [sessao for (g, _), sessao in _sessoes_voz.items() if g == guild_id]
+    ativos = sum(1 for sessao in abertas if sessao.encerramento is None)
+    return {
+        'minutos': (stats['segundos'] + sum(sessao.duracao() for sessao in abertas)) / 60,
+        'sessoes': stats['sessoes'],
+        'ativos': ativos,
+        'top': [(member_id, segundos / 60) for member_id, segundos in stats['por_membro'].most_common(VOZ_TOP_MEMBROS)],
+    }
 
 # ==========================================
 # EVENTOS DE LOGS
 # ==========================================
 
 @bot.event
+async def on_guild_channel_delete(channel):
+    esquecer_canal_log(channel.id)
+    descartar_fila_logs(channel.id)
+    await remover_carrinho(channel.id)
+
+@bot.event
+async def on_raw_thread_delete(payload):
+    await remover_carrinho(payload.thread_id)
+
+@bot.event
+@medido
 async def on_member_join(member):
     channel = get_log_channel(member.guild.id, "join")
-    if not channel:
+    if not channel or agregar_raid(member.guild.id, "join", member):
         return
 
     embed = discord.Embed(
@@ -829,12 +3921,14 @@ async def on_member_join(member):
     embed.add_field(name="Usuário", value=member.mention)
     embed.add_field(name="Conta criada", value=f"<t:{int(member.created_at.timestamp())}:R>")
 
-    await channel.send(embed=embed)
+    await enviar_log(channel, embed)
 
 @bot.event
-async def on_member_remove(member):
-    channel = get_log_channel(member.guild.id, "leave")
-    if not channel:
+@medido
+async def on_raw_member_remove(payload):
+    # Versão raw: dispara mesmo se o membro não estiver em cache (modo enxuto)
+    channel = get_log_channel(payload.guild_id, "leave")
+    if not channel or agregar_raid(payload.guild_id, "leave", payload.user):
         return
 
     embed = discord.Embed(
@@ -843,11 +3937,12 @@ async def on_member_remove(member):
         timestamp=now()
     )
 
-    embed.add_field(name="Usuário", value=str(member))
+    embed.add_field(name="Usuário", value=str(payload.user))
 
-    await channel.send(embed=embed)
+    await enviar_log(channel, embed)
 
 @bot.event
+@medido
 async def on_member_ban(guild, user):
     channel = get_log_channel(guild.id, "ban")
     if not channel:
@@ -861,14 +3956,23 @@ async def on_member_ban(guild, user):
 
     embed.add_field(name="Usuário", value=str(user))
 
-    await channel.send(embed=embed)
+    await enviar_log(channel, embed)
 
 @bot.event
-async def on_message_delete(message):
-    if message.author.bot:
+@medido
+async def on_raw_message_delete(payload):
+    if payload.guild_id is None:
+        return
+    registro = retirar_conteudo(payload.guild_id, payload.message_id)
+    if payload.cached_message is not None:
+        if payload.cached_message.author.bot:
+            return
+        registro = registro_da_mensagem(payload.cached_message)
+    if registro is None:
+        # Mensagem de bot, sem texto ou anterior ao armazém
         return
 
-    channel = get_log_channel(message.guild.id, "delete")
+    channel = get_log_channel(payload.guild_id, "delete")
     if not channel:
         return
 
@@ -878,18 +3982,32 @@ async def on_message_delete(message):
         timestamp=now()
     )
 
-    embed.add_field(name="Autor", value=message.author.mention)
-    embed.add_field(name="Canal", value=message.channel.mention)
-    embed.add_field(name="Conteúdo", value=message.content or "Sem texto", inline=False)
+    embed.add_field(name="Autor", value=f"<@{registro['autor_id']}>")
+    embed.add_field(name="Canal", value=f"<#{registro['canal_id']}>")
+    embed.add_field(name="Conteúdo", value=limitar_campo(registro['conteudo'], "Sem texto"), inline=False)
+    if registro['anexos']:
+        embed.add_field(name="Anexos", value=limitar_campo("\n".join(registro['anexos']), "-"), inline=False)
 
-    await channel.send(embed=embed)
+    await enviar_log(channel, embed)
 
 @bot.event
-async def on_message_edit(before, after):
-    if before.author.bot:
+@medido
+async def on_raw_message_edit(payload):
+    # Sem 'content' no payload é só embed/preview atualizado, não edição
+    if payload.guild_id is None or 'content' not in payload.data:
+        return
+    if payload.data.get('author', {}).get('bot'):
         return
 
-    channel = get_log_channel(before.guild.id, "edit")
+    depois = payload.data['content']
+    registro = conteudo_guardado(payload.guild_id, payload.message_id)
+    atualizar_conteudo(payload.guild_id, payload.message_id, depois)
+    if payload.cached_message is not None:
+        registro = registro_da_mensagem(payload.cached_message)
+    if registro is None or registro['conteudo'] == depois:
+        return
+
+    channel = get_log_channel(payload.guild_id, "edit")
     if not channel:
         return
 
@@ -899,37 +4017,99 @@ async def on_message_edit(before, after):
         timestamp=now()
     )
 
-    embed.add_field(name="Autor", value=before.author.mention)
-    embed.add_field(name="Antes", value=before.content or "Vazio", inline=False)
-    embed.add_field(name="Depois", value=after.content or "Vazio", inline=False)
+    embed.add_field(name="Autor", value=f"<@{registro['autor_id']}>")
+    embed.add_field(name="Antes", value=limitar_campo(registro['conteudo'], "Vazio"), inline=False)
+    embed.add_field(name="Depois", value=limitar_campo(depois, "Vazio"), inline=False)
+
+    await enviar_log(channel, embed)
+
+# Purga (até 100 mensagens por chamada da API) vira um único log: um embed de
+# resumo e a transcrição em anexo, escrita linha a linha num arquivo temporário
+PURGA_TRANSCRICAO_MEMORIA = 1024 * 1024  # acima disso o arquivo vai para o disco
+PURGA_TOP_AUTORES = 5
 
-    await channel.send(embed=embed)
+def escrever_transcricao_purga(guild_id, message_ids, cache):
+    arquivo = tempfile.SpooledTemporaryFile(max_size=PURGA_TRANSCRICAO_MEMORIA)
+    autores = Counter()
+    recuperadas = 0
+    arquivo.write(b"message_id\tautor_id\tconteudo\tanexos\n")
+    for message_id in sorted(message_ids):  # IDs crescem com o tempo: ordem cronológica
+        registro = retirar_conteudo(guild_id, message_id)
+        if message_id in cache:
+            registro = registro_da_mensagem(cache[message_id])
+        if registro is None:
+            arquivo.write(f"{message_id}\t-\t(conteúdo não armazenado)\t\n".encode('utf-8'))
+            continue
+        recuperadas += 1
+        autores[registro['autor_id']] += 1
+        conteudo = registro['conteudo'].replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+        arquivo.write(f"{message_id}\t{registro['autor_id']}\t{conteudo}\t{' '.join(registro['anexos'])}\n".encode('utf-8'))
+    arquivo.seek(0)
+    return arquivo, recuperadas, autores
 
 @bot.event
-async def on_voice_state_update(member, before, after):
-    channel = get_log_channel(member.guild.id, "voice")
+@medido
+async def on_raw_bulk_message_delete(payload):
+    if payload.guild_id is None:
+        return
+
+    channel = get_log_channel(payload.guild_id, "delete")
+    cache = {message.id: message for message in payload.cached_messages}
     if not channel:
+        # Mesmo sem log, libera o espaço das mensagens apagadas
+        for message_id in payload.message_ids:
+            retirar_conteudo(payload.guild_id, message_id)
         return
 
-    if before.channel is None and after.channel is not None:
-        await channel.send(f"🔊 {member.mention} entrou em {after.channel.mention}")
-    elif before.channel is not None and after.channel is None:
-        await channel.send(f"🔇 {member.mention} saiu de {before.channel.mention}")
+    arquivo, recuperadas, autores = escrever_transcricao_purga(payload.guild_id, payload.message_ids, cache)
+    total = len(payload.message_ids)
+
+    embed = discord.Embed(
+        title=f"🧹 {total} mensagens apagadas em massa",
+        color=discord.Color.dark_orange(),
+        timestamp=now()
+    )
+    embed.add_field(name="Canal", value=f"<#{payload.channel_id}>")
+    embed.add_field(name="Com conteúdo", value=f"{recuperadas}/{total}")
+    if autores:
+        embed.add_field(
+            name="Autores",
+            value="\n".join(f"<@{autor_id}>: {n}" for autor_id, n in autores.most_common(PURGA_TOP_AUTORES)),
+            inline=False
+        )
+
+    try:
+        with prioridade_saida(PRIORIDADE_LOG):
+            await channel.send(embed=embed, file=discord.File(arquivo, filename=f"purga-{payload.channel_id}.tsv"))
+    except SaidaDescartada:
+        pass
+    except discord.HTTPException as e:
+        print(f"❌ Erro ao enviar log de purga em #{channel}: {e}")
+    finally:
+        arquivo.close()
+
+@bot.event
+@medido
+async def on_voice_state_update(member, before, after):
+    if member.id == bot.user.id:
+        return
+    registrar_estado_voz(member, before, after)
 
 @bot.event
+@medido
 async def on_message(message):
     if message.author.bot:
         return
-    
+
+    if message.guild is not None:
+        guardar_conteudo(message)
+
+    if message.channel.id in carrinhos:
+        await tocar_carrinho(message.channel.id)
+
     # Detectar comprovantes em carrinhos
-    if message.channel.name.startswith('🛒') and message.attachments:
-        owner = message.guild.owner
-        admins = [m for m in message.guild.members if m.guild_permissions.administrator and not m.bot]
-        
-        mentions = f"{owner.mention}"
-        if admins:
-            mentions += " " + " ".join([m.mention for m in admins[:3]])
-        
+    if message.attachments and message.channel.id in carrinhos:
+        mentions = await mencoes_comprovante(message.guild)
         await message.channel.send(f"📸 {mentions}, comprovante enviado por {message.author.mention}!")
     
     await bot.process_commands(message)
@@ -939,9 +4119,15 @@ async def on_message(message):
 # ==========================================
 
 if __name__ == '__main__':
-    if not TOKEN:
+    if sys.argv[1:] == ['migrar-sqlite']:
+        migrar_json_para_sqlite()
+        fechar_db()
+    elif not TOKEN:
         print("❌ ERRO: Variável DISCORD_TOKEN não configurada!")
         print("💡 Configure no Railway: Settings > Variables > DISCORD_TOKEN")
+    elif sys.argv[1:] == ['cluster'] or (CLUSTER_PROCESSOS > 1 and not MODO_CLUSTER):
+        print(f"🚀 Iniciando VIREX STORE em cluster ({CLUSTER_PROCESSOS} processos)...")
+        executar_cluster()
     else:
         print("🚀 Iniciando VIREX STORE...")
 